@@ -0,0 +1,97 @@
+"""
+Compares the per-frame line of sight cost of rebuilding a spatial hashed sprite list
+every frame against the batched occluder index query which the enemy AI runs.
+
+Run this from the repository root with ``python benchmarks/line_of_sight.py``.
+"""
+from __future__ import annotations
+
+# Builtin
+import pathlib
+import sys
+import timeit
+from typing import List
+
+# Make the game modules importable
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.joinpath("game")))
+
+# Pip
+import arcade  # noqa: E402
+import numpy as np  # noqa: E402
+
+# Custom
+from constants import ENEMY_VIEW_DISTANCE, LEVEL_COUNT, SPRITE_SIZE  # noqa: E402
+from levels import levels  # noqa: E402
+from occlusion import OccluderIndex  # noqa: E402
+
+# The amount of frames to simulate for each level
+FRAME_COUNT = 100
+
+
+def legacy_frame(
+    wall_list: arcade.SpriteList,
+    blocker_list: List[arcade.SpriteList],
+    enemy_list: arcade.SpriteList,
+    player: arcade.Sprite,
+) -> None:
+    """Replicates the old per-frame rebuild of the line of sight sprite list."""
+    line_of_sight_list = arcade.SpriteList(use_spatial_hash=True)
+    line_of_sight_list.extend(wall_list)
+    for blocker in blocker_list:
+        line_of_sight_list.extend(blocker)
+    for enemy in enemy_list:
+        arcade.has_line_of_sight(
+            (enemy.center_x, enemy.center_y),
+            (player.center_x, player.center_y),
+            line_of_sight_list,
+            SPRITE_SIZE * ENEMY_VIEW_DISTANCE,
+        )
+
+
+def index_frame(
+    occluders: OccluderIndex, enemy_list: arcade.SpriteList, player: arcade.Sprite
+) -> None:
+    """Queries the persistent occluder index for every enemy in one batch."""
+    occluders.has_line_of_sight_batch(
+        np.array(
+            [(enemy.center_x, enemy.center_y) for enemy in enemy_list], dtype=float
+        ).reshape(-1, 2),
+        (player.center_x, player.center_y),
+        SPRITE_SIZE * ENEMY_VIEW_DISTANCE,
+    )
+
+
+def main() -> None:
+    """Runs the benchmark for every level and prints the results."""
+    print(f"{'Level':<8}{'Legacy (ms)':>14}{'Index (ms)':>14}{'Speedup':>10}")
+    for level in range(1, LEVEL_COUNT + 1):
+        tile_map = levels[level].tilemap
+        wall_list = tile_map.sprite_lists["Platforms"]
+        enemy_list = tile_map.sprite_lists["Enemies"]
+        player = tile_map.sprite_lists["Player"][0]
+        blocker_list = [tile_map.sprite_lists[f"Walls{count+1}"] for count in range(2)]
+
+        # Time both approaches
+        legacy = (
+            timeit.timeit(
+                lambda: legacy_frame(wall_list, blocker_list, enemy_list, player),
+                number=FRAME_COUNT,
+            )
+            / FRAME_COUNT
+        )
+        occluders = OccluderIndex(wall_list, blocker_list)
+        index = (
+            timeit.timeit(
+                lambda: index_frame(occluders, enemy_list, player),
+                number=FRAME_COUNT,
+            )
+            / FRAME_COUNT
+        )
+        print(
+            f"{level:<8}{legacy * 1000:>14.3f}{index * 1000:>14.3f}"
+            f"{legacy / index if index else float('inf'):>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
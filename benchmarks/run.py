@@ -0,0 +1,460 @@
+"""
+Runs the gameplay performance benchmarks for every level and for synthetic scenarios
+with many enemies and bullets. The results are printed as JSON.
+
+Run this from the repository root with ``python benchmarks/run.py``.
+"""
+from __future__ import annotations
+
+# Builtin
+import argparse
+import json
+import pathlib
+import random
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Make the game modules importable
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.joinpath("game")))
+
+# Pip
+import arcade  # noqa: E402
+
+# Custom
+from ai import AIScheduler, EnemyBatch  # noqa: E402
+from constants import (  # noqa: E402
+    ENEMY_ATTACK_COOLDOWN_MAX,
+    ENEMY_ATTACK_COOLDOWN_MIN,
+    ENEMY_BULLET_DAMAGE,
+    FRICTION,
+    LEVEL_COUNT,
+    MASS,
+    SPRITE_SIZE,
+)
+from database import Database, database_path  # noqa: E402
+from entities.enemy import Enemy  # noqa: E402
+from entities.entity import Entity  # noqa: E402
+from headless import HeadlessGame, HeadlessWindow  # noqa: E402
+from levels import load_level  # noqa: E402
+from textures import load_textures, moving_textures  # noqa: E402
+from views.game import Game  # noqa: E402
+
+
+def summarise(samples: List[float]) -> Dict[str, float]:
+    """
+    Summarises a list of durations.
+
+    Parameters
+    ----------
+    samples: List[float]
+        The durations in seconds.
+
+    Returns
+    -------
+    Dict[str, float]
+        The sample count, the p50/p95/p99 in milliseconds and the throughput per
+        second.
+    """
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def percentile(fraction: float) -> float:
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] * 1000
+
+    total = sum(ordered)
+    return {
+        "count": len(ordered),
+        "p50_ms": percentile(0.5),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "throughput_per_second": len(ordered) / total if total else 0,
+    }
+
+
+def time_calls(function: Callable[[], object], repeat: int) -> List[float]:
+    """
+    Times a function multiple times.
+
+    Parameters
+    ----------
+    function: Callable[[], object]
+        The function to time.
+    repeat: int
+        How many times to call the function.
+
+    Returns
+    -------
+    List[float]
+        The duration of each call in seconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+@contextmanager
+def record_method(owner: object, name: str, samples: List[float]) -> Iterator[None]:
+    """
+    Temporarily wraps a method so the duration of every call is recorded.
+
+    Parameters
+    ----------
+    owner: object
+        The class or instance which has the method.
+    name: str
+        The name of the method.
+    samples: List[float]
+        The list to append the durations to.
+    """
+    original = getattr(owner, name)
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = original(*args, **kwargs)
+        samples.append(time.perf_counter() - start)
+        return result
+
+    setattr(owner, name, wrapper)
+    try:
+        yield
+    finally:
+        setattr(owner, name, original)
+
+
+def add_synthetic_load(game: Game, enemy_count: int, bullet_count: int) -> None:
+    """
+    Adds extra enemies and bullets to a game which has already been set up.
+
+    Parameters
+    ----------
+    game: Game
+        The game to add the load to.
+    enemy_count: int
+        How many extra enemies to add.
+    bullet_count: int
+        How many bullets to spawn.
+    """
+    assert game.level_data is not None
+    assert game.physics_engine is not None
+    assert game.projectiles is not None
+    assert game.player is not None
+    rng = random.Random(0)
+    width = game.level_data.tilemap.width * SPRITE_SIZE
+
+    # Drop the enemies in from above the player at random positions
+    for _ in range(enemy_count):
+        enemy = Enemy(
+            rng.uniform(64, width - 64),
+            game.player.center_y + 256,
+            moving_textures["enemy"],
+            10,
+            ENEMY_BULLET_DAMAGE,
+        )
+        enemy.set_cooldown(
+            rng.uniform(ENEMY_ATTACK_COOLDOWN_MIN, ENEMY_ATTACK_COOLDOWN_MAX)
+        )
+        game.enemy_list.append(enemy)
+        game.physics_engine.add_sprite(
+            enemy,
+            mass=MASS,
+            friction=FRICTION,
+            moment_of_inertia=game.physics_engine.MOMENT_INF,
+            collision_type="enemy",
+        )
+    enemies: List[Enemy] = list(game.enemy_list)  # type: ignore
+    if game.boss is not None:
+        enemies.append(game.boss)
+    assert game.ai_scheduler is not None
+    game.enemy_ai = EnemyBatch(enemies)
+    game.ai_scheduler = AIScheduler(
+        game.enemy_ai, fixed_capacity=game.ai_scheduler.fixed_capacity
+    )
+
+    # Spawn the bullets from random enemies
+    game.projectiles.pool_size = max(game.projectiles.pool_size, bullet_count)
+    for _ in range(bullet_count):
+        shooter = rng.choice(enemies)
+        game.projectiles.spawn(
+            shooter.center_x, shooter.center_y, rng.choice((-1, 1)), shooter
+        )
+
+
+def benchmark_gameplay(
+    level: int, ticks: int, enemy_count: int = 0, bullet_count: int = 0
+) -> Dict[str, Dict[str, float]]:
+    """
+    Benchmarks setting up and running a level headlessly.
+
+    Parameters
+    ----------
+    level: int
+        The level to run.
+    ticks: int
+        How many ticks to simulate.
+    enemy_count: int
+        How many extra enemies to add.
+    bullet_count: int
+        How many bullets to spawn.
+
+    Returns
+    -------
+    Dict[str, Dict[str, float]]
+        The summary for each benchmarked function and the AI scheduler's totals.
+    """
+    setup_samples: List[float] = []
+    update_samples: List[float] = []
+    step_samples: List[float] = []
+    moved_samples: List[float] = []
+
+    with record_method(Game, "setup", setup_samples):
+        headless = HeadlessGame(level)
+    add_synthetic_load(headless.game, enemy_count, bullet_count)
+    game = headless.game
+    assert game.physics_engine is not None
+    with record_method(game.physics_engine, "step", step_samples), record_method(
+        Entity, "pymunk_moved", moved_samples
+    ):
+        for _ in range(ticks):
+            if game.level_finished:
+                break
+            start = time.perf_counter()
+            headless.step()
+            update_samples.append(time.perf_counter() - start)
+    assert game.ai_scheduler is not None
+    return {
+        "AIScheduler": {
+            "updated": game.ai_scheduler.total_updated,
+            "deferred": game.ai_scheduler.total_deferred,
+        },
+        "Game.setup": summarise(setup_samples),
+        "Game.on_update": summarise(update_samples),
+        "PhysicsEngine.step": summarise(step_samples),
+        "Entity.pymunk_moved": summarise(moved_samples),
+    }
+
+
+def create_window() -> Optional[arcade.Window]:
+    """
+    Creates a hidden window with the attributes the game views use. The game's own
+    Window isn't used since it opens the scores database and is always visible.
+
+    Returns
+    -------
+    Optional[arcade.Window]
+        The window or None if there is no OpenGL context.
+    """
+    try:
+        window = arcade.Window(visible=False)
+    except Exception:  # noqa
+        return None
+    window.headless = False  # type: ignore
+    window.views = {}  # type: ignore
+    return window
+
+
+def benchmark_draw(window: arcade.Window, level: int, frames: int) -> Dict[str, float]:
+    """
+    Benchmarks drawing a level.
+
+    Parameters
+    ----------
+    window: arcade.Window
+        The window from create_window to draw with.
+    level: int
+        The level to draw.
+    frames: int
+        How many frames to draw.
+
+    Returns
+    -------
+    Dict[str, float]
+        The summary for Game.on_draw.
+    """
+    game = Game(window)
+    game.setup(level)
+    window.views["Game"] = game  # type: ignore
+    samples = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        game.on_draw()
+        window.ctx.finish()
+        samples.append(time.perf_counter() - start)
+    return summarise(samples)
+
+
+def benchmark_static_layers(
+    window: arcade.Window, level: int, frames: int
+) -> Dict[str, float]:
+    """
+    Compares drawing the static layers sprite by sprite with compositing their
+    pre-rendered tiles.
+
+    Parameters
+    ----------
+    window: arcade.Window
+        The window from create_window to draw with.
+    level: int
+        The level to draw.
+    frames: int
+        How many frames to draw with each method.
+
+    Returns
+    -------
+    Dict[str, float]
+        The draw calls, sprites and average GPU time per frame for each method. The
+        draw calls are counted from the geometry renders each method actually issues
+        in one frame.
+    """
+    game = Game(window)
+    game.setup(level)
+    assert game.camera is not None
+    assert game.wall_cache is not None
+    assert game.blocker_cache is not None
+    game.center_camera_on_player()
+    game.camera.use()
+    direct_layers = [game.wall_list, *game.blocker_list]
+    caches = [game.wall_cache, game.blocker_cache]
+
+    def draw_direct() -> None:
+        for layer in direct_layers:
+            layer.draw()
+
+    def draw_cached() -> None:
+        for cache in caches:
+            cache.draw(game.view_region)
+
+    def count_draw_calls(draw: Callable[[], None]) -> int:
+        renders: List[float] = []
+        with record_method(arcade.gl.Geometry, "render", renders):
+            draw()
+        return len(renders)
+
+    def gpu_time(draw: Callable[[], None]) -> float:
+        total = 0
+        for _ in range(frames):
+            query = window.ctx.query()
+            with query:
+                draw()
+            total += query.time_elapsed
+        return total / frames / 1e6
+
+    # Render the tiles first, so only compositing is measured
+    draw_cached()
+    direct_ms = gpu_time(draw_direct)
+    cached_ms = gpu_time(draw_cached)
+    return {
+        "direct_draw_calls": count_draw_calls(draw_direct),
+        "direct_sprites": sum(len(layer) for layer in direct_layers),
+        "direct_gpu_ms": direct_ms,
+        "cached_draw_calls": count_draw_calls(draw_cached),
+        "cached_tiles": sum(len(cache.tiles) for cache in caches),
+        "cached_gpu_ms": cached_ms,
+        "gpu_ms_saved": direct_ms - cached_ms,
+    }
+
+
+def benchmark_database(rows: int) -> Dict[str, Dict[str, float]]:
+    """
+    Benchmarks the database on a temporary copy of the scores database.
+
+    Parameters
+    ----------
+    rows: int
+        How many scores to commit.
+
+    Returns
+    -------
+    Dict[str, Dict[str, float]]
+        The summary for each benchmarked function.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = pathlib.Path(directory).joinpath("scores.db")
+        shutil.copy(database_path, path)
+        database = Database(HeadlessWindow(), path)  # type: ignore
+        rng = random.Random(0)
+        commit = time_calls(
+            lambda: database.commit_score(
+                rng.randint(0, 100),
+                rng.uniform(0, 600),
+                rng.random() < 0.5,
+                rng.randint(1, LEVEL_COUNT),
+            ),
+            rows,
+        )
+        flush = time_calls(database.flush, 1)
+        top_scores = time_calls(
+            lambda: database.get_five_scores(rng.randint(1, LEVEL_COUNT)), rows
+        )
+        database.close()
+    return {
+        "Database.commit_score": summarise(commit),
+        "Database.flush": summarise(flush),
+        "Database.get_five_scores": summarise(top_scores),
+    }
+
+
+def main() -> None:
+    """Runs every benchmark and prints the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ticks", type=int, default=600)
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument(
+        "--enemies", type=int, nargs="+", default=[0, 50, 200], help="Extra enemies"
+    )
+    parser.add_argument(
+        "--bullets", type=int, nargs="+", default=[0, 100, 500], help="Bullets"
+    )
+    parser.add_argument("--output", type=pathlib.Path, help="Write the JSON here")
+    args = parser.parse_args()
+    load_textures()
+
+    # Share one window between the drawing benchmarks, since the loaded levels' sprite
+    # lists stay bound to the context they were first drawn with
+    window = create_window()
+
+    # Benchmark every level
+    results: Dict[str, Dict] = {"levels": {}, "synthetic": {}}
+    for level in range(1, LEVEL_COUNT + 1):
+        level_result = benchmark_gameplay(level, args.ticks)
+        level_result["levels.load_level"] = summarise(
+            time_calls(lambda: load_level(level), 3)
+        )
+        if window is not None:
+            level_result["Game.on_draw"] = benchmark_draw(window, level, args.frames)
+            level_result["StaticLayerCache"] = benchmark_static_layers(
+                window, level, args.frames
+            )
+        results["levels"][str(level)] = level_result
+
+    # Benchmark the synthetic scenarios on level 1
+    for enemy_count in args.enemies:
+        for bullet_count in args.bullets:
+            name = f"enemies={enemy_count},bullets={bullet_count}"
+            results["synthetic"][name] = benchmark_gameplay(
+                1, args.ticks, enemy_count, bullet_count
+            )
+
+    if window is not None:
+        window.close()
+
+    # Benchmark the database
+    results["database"] = benchmark_database(args.rows)
+
+    # Output the results
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output, encoding="utf8")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
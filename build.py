@@ -2,18 +2,36 @@ from __future__ import annotations
 
 # Builtin
 import pathlib
+import sys
 
 # Pip
 import PyInstaller.__main__  # noqa
 
+# Make the game modules importable
+game_path = pathlib.Path(__file__).resolve().parent.joinpath("game")
+sys.path.insert(0, str(game_path))
+
+# Custom
+from atlas import bake_atlas  # noqa: E402
+from level_cache import compile_level  # noqa: E402
+from textures import (  # noqa: E402
+    atlas_image_path,
+    atlas_index_path,
+    texture_filenames,
+    texture_path,
+)
+
 # Get path to the resources folder
 resources_folder_name = "resources"
-resources_path = (
-    pathlib.Path(__file__)
-    .resolve()
-    .parent.joinpath("game")
-    .joinpath(resources_folder_name)
-)
+resources_path = game_path.joinpath(resources_folder_name)
+
+# Compile the level caches, so the bundled game doesn't need to decode the Tiled JSON
+for map_path in resources_path.joinpath("levels").glob("*/map.json"):
+    compile_level(map_path)
+
+# Bake the textures into a single atlas, so the bundled game doesn't need to decode
+# each PNG
+bake_atlas(texture_path, texture_filenames(), atlas_image_path, atlas_index_path)
 
 PyInstaller.__main__.run(
     [
@@ -0,0 +1,389 @@
+from __future__ import annotations
+
+# Builtin
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+# Pip
+import numpy as np
+
+# Custom
+from constants import (
+    AI_BUDGET,
+    AI_BUDGET_GROWTH,
+    AI_BUDGET_SHRINK,
+    AI_BUDGET_TOLERANCE,
+    AI_FAR_INTERVAL,
+    AI_INITIAL_COST,
+    AI_MAX_BUDGET,
+    AI_MIN_BUDGET,
+    AI_NEAR_DISTANCE,
+    AI_TARGET_STEP_TIME,
+    ENEMY_MOVEMENT_FORCE,
+    ENEMY_VIEW_DISTANCE,
+    SPRITE_SIZE,
+)
+
+if TYPE_CHECKING:
+    from entities.enemy import Enemy
+    from entities.player import Player
+    from occlusion import OccluderIndex
+
+
+class EnemyBatch:
+    """
+    Stores the enemy AI state in NumPy arrays so the movement, range and attack
+    decisions for every enemy (including the boss) can be made in one vectorised pass
+    each tick.
+
+    Parameters
+    ----------
+    enemies: List[Enemy]
+        The enemies to control. Their attack cooldowns should already be set.
+
+    Attributes
+    ----------
+    indices: Dict[Enemy, int]
+        Maps each enemy to its row in the arrays.
+    positions: np.ndarray
+        An array of shape (N, 2) containing the position of each enemy.
+    cooldowns: np.ndarray
+        The length of time each enemy has to wait before it can attack again.
+    counters: np.ndarray
+        The counters which check if each enemy's cooldown has passed.
+    alive: np.ndarray
+        Whether each enemy is still in the game or not.
+    """
+
+    def __init__(self, enemies: List[Enemy]) -> None:
+        self.enemies: List[Enemy] = enemies
+        self.indices: Dict[Enemy, int] = {
+            enemy: index for index, enemy in enumerate(enemies)
+        }
+        self.positions: np.ndarray = np.zeros((len(enemies), 2), dtype=float)
+        self.cooldowns: np.ndarray = np.array(
+            [enemy.attack_cooldown for enemy in enemies], dtype=float
+        )
+        self.counters: np.ndarray = np.zeros(len(enemies), dtype=float)
+        self.alive: np.ndarray = np.ones(len(enemies), dtype=bool)
+
+    def __repr__(self) -> str:
+        return f"<EnemyBatch (Enemy count={np.count_nonzero(self.alive)})>"
+
+    def add(self, enemy: Enemy, counter: float = 0) -> int:
+        """
+        Starts processing an enemy. The row of a removed enemy is reused if there is
+        one, otherwise the arrays grow by a row.
+
+        Parameters
+        ----------
+        enemy: Enemy
+            The enemy to add. Its attack cooldown should already be set.
+        counter: float
+            How long it has been since the enemy last attacked.
+
+        Returns
+        -------
+        int
+            The enemy's row in the arrays.
+        """
+        free = np.flatnonzero(~self.alive)
+        if len(free):
+            row = int(free[0])
+            del self.indices[self.enemies[row]]
+            self.enemies[row] = enemy
+        else:
+            row = len(self.enemies)
+            self.enemies.append(enemy)
+            self.positions = np.vstack([self.positions, np.zeros((1, 2))])
+            self.cooldowns = np.append(self.cooldowns, 0.0)
+            self.counters = np.append(self.counters, 0.0)
+            self.alive = np.append(self.alive, False)
+        self.indices[enemy] = row
+        self.positions[row] = enemy.center_x, enemy.center_y
+        self.cooldowns[row] = enemy.attack_cooldown
+        self.counters[row] = counter
+        self.alive[row] = True
+        return row
+
+    def remove(self, enemy: Enemy) -> None:
+        """
+        Stops an enemy from being processed.
+
+        Parameters
+        ----------
+        enemy: Enemy
+            The enemy to remove.
+        """
+        self.alive[self.indices[enemy]] = False
+
+    def sync_positions(self) -> None:
+        """Copies the position of every living enemy into the positions array."""
+        rows = self.alive.nonzero()[0]
+        enemies = self.enemies
+        self.positions[rows] = np.array(
+            [(enemies[row].center_x, enemies[row].center_y) for row in rows],
+            dtype=float,
+        ).reshape(-1, 2)
+
+    def movement_forces(
+        self, player: Player, occluders: OccluderIndex, rows: np.ndarray
+    ) -> np.ndarray:
+        """
+        Works out the movement force for a group of enemies. This assumes the positions
+        array is up to date.
+
+        Parameters
+        ----------
+        player: Player
+            The player entity.
+        occluders: OccluderIndex
+            The index of the tiles which block the enemies' vision.
+        rows: np.ndarray
+            The rows of the enemies to work out the force for.
+
+        Returns
+        -------
+        np.ndarray
+            The horizontal force to apply to each of the enemies.
+        """
+        # Move towards the player if they are within range and can be seen
+        positions = self.positions[rows]
+        can_see = occluders.has_line_of_sight_batch(
+            positions,
+            (player.center_x, player.center_y),
+            SPRITE_SIZE * ENEMY_VIEW_DISTANCE,
+        )
+        return (
+            np.where(positions[:, 0] < player.center_x, 1, -1)
+            * ENEMY_MOVEMENT_FORCE
+            * can_see
+        )
+
+    def ready_attacks(self, delta_time: float) -> np.ndarray:
+        """
+        Advances the attack counters and works out which enemies should attack.
+
+        Parameters
+        ----------
+        delta_time: float
+            Time interval since the last time the function was called.
+
+        Returns
+        -------
+        np.ndarray
+            Whether each enemy should attack this tick.
+        """
+        # Attack if the cooldown has passed
+        self.counters[self.alive] += delta_time
+        attacks = self.alive & (self.counters >= self.cooldowns)
+        self.counters[attacks] = 0
+        return attacks
+
+    def update(
+        self, player: Player, occluders: OccluderIndex, delta_time: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Works out the movement force and whether to attack for every enemy.
+
+        Parameters
+        ----------
+        player: Player
+            The player entity.
+        occluders: OccluderIndex
+            The index of the tiles which block the enemies' vision.
+        delta_time: float
+            Time interval since the last time the function was called.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            The horizontal force to apply to each enemy and whether each enemy should
+            attack this tick.
+        """
+        self.sync_positions()
+        forces = np.zeros(len(self.enemies), dtype=float)
+        rows = self.alive.nonzero()[0]
+        forces[rows] = self.movement_forces(player, occluders, rows)
+        return forces, self.ready_attacks(delta_time)
+
+
+class AIScheduler:
+    """
+    Spreads the enemies' movement decisions across ticks within a time budget. Enemies
+    near the player think every tick while the rest think every few ticks in
+    round-robin order, and any enemy which doesn't fit in the budget keeps its last
+    decision until a later tick. Attack cooldowns are still advanced every tick, so
+    enemies always attack on time.
+
+    Parameters
+    ----------
+    batch: EnemyBatch
+        The batched AI state for the enemies.
+    budget: float
+        The initial time in microseconds which can be spent thinking each tick.
+    fixed_capacity: Optional[int]
+        How many enemies think each tick regardless of the budget. This makes the
+        schedule independent of how fast the machine is, so headless runs and replays
+        play out the same as the recorded game. None uses the budget instead.
+
+    Attributes
+    ----------
+    forces: np.ndarray
+        The last movement force decided for each enemy.
+    ticks_since_think: np.ndarray
+        How many ticks it has been since each enemy last thought.
+    cursor: int
+        The row which the round-robin scan for far enemies starts from.
+    cost: float
+        A moving average of the time in microseconds it takes one enemy to think.
+    updated: int
+        How many enemies thought on the last tick.
+    deferred: int
+        How many enemies were due to think on the last tick but didn't fit in the
+        budget.
+    total_updated: int
+        How many times any enemy has thought.
+    total_deferred: int
+        How many times any enemy has been deferred.
+    """
+
+    def __init__(
+        self,
+        batch: EnemyBatch,
+        budget: float = AI_BUDGET,
+        fixed_capacity: Optional[int] = None,
+    ) -> None:
+        self.batch: EnemyBatch = batch
+        self.budget: float = budget
+        self.fixed_capacity: Optional[int] = fixed_capacity
+        self.forces: np.ndarray = np.zeros(len(batch.enemies), dtype=float)
+        self.ticks_since_think: np.ndarray = np.full(
+            len(batch.enemies), AI_FAR_INTERVAL, dtype=int
+        )
+        self.cursor: int = 0
+        self.cost: float = AI_INITIAL_COST
+        self.updated: int = 0
+        self.deferred: int = 0
+        self.total_updated: int = 0
+        self.total_deferred: int = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"<AIScheduler (Budget={self.budget:.0f}us) (Updated={self.updated})"
+            f" (Deferred={self.deferred})>"
+        )
+
+    def add(self, enemy: Enemy, counter: float = 0) -> None:
+        """
+        Starts scheduling an enemy. It thinks on the next tick.
+
+        Parameters
+        ----------
+        enemy: Enemy
+            The enemy to add. Its attack cooldown should already be set.
+        counter: float
+            How long it has been since the enemy last attacked.
+        """
+        row = self.batch.add(enemy, counter)
+        if row >= len(self.forces):
+            self.forces = np.append(self.forces, 0.0)
+            self.ticks_since_think = np.append(self.ticks_since_think, AI_FAR_INTERVAL)
+        self.forces[row] = 0
+        self.ticks_since_think[row] = AI_FAR_INTERVAL
+
+    @property
+    def capacity(self) -> int:
+        """How many enemies can think within the budget. This is always at least 1."""
+        if self.fixed_capacity is not None:
+            return self.fixed_capacity
+        return max(int(self.budget / self.cost), 1)
+
+    def select(self, player: Player) -> Tuple[np.ndarray, int]:
+        """
+        Chooses which enemies think this tick.
+
+        Parameters
+        ----------
+        player: Player
+            The player entity.
+
+        Returns
+        -------
+        Tuple[np.ndarray, int]
+            The rows of the enemies which think this tick and how many enemies were
+            due but have been deferred.
+        """
+        batch = self.batch
+        offsets = batch.positions - (player.center_x, player.center_y)
+        near = np.hypot(offsets[:, 0], offsets[:, 1]) <= AI_NEAR_DISTANCE * SPRITE_SIZE
+        due = batch.alive & (near | (self.ticks_since_think >= AI_FAR_INTERVAL))
+
+        # Near enemies come first and the far ones follow in round-robin order
+        order = np.roll(np.arange(len(due)), -self.cursor)
+        near_rows = order[(due & near)[order]]
+        far_rows = order[(due & ~near)[order]]
+        rows = np.concatenate([near_rows, far_rows])[: self.capacity]
+
+        # Continue the round robin after the last far enemy which thought
+        taken_far = len(rows) - len(near_rows)
+        if taken_far > 0:
+            self.cursor = int(far_rows[taken_far - 1]) + 1
+        return rows, len(near_rows) + len(far_rows) - len(rows)
+
+    def update(
+        self, player: Player, occluders: OccluderIndex, delta_time: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Lets the scheduled enemies think and works out which enemies should attack.
+
+        Parameters
+        ----------
+        player: Player
+            The player entity.
+        occluders: OccluderIndex
+            The index of the tiles which block the enemies' vision.
+        delta_time: float
+            Time interval since the last time the function was called.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            The horizontal force to apply to each enemy and whether each enemy should
+            attack this tick.
+        """
+        batch = self.batch
+        batch.sync_positions()
+        rows, self.deferred = self.select(player)
+        self.ticks_since_think += 1
+        if len(rows):
+            # Time the thinking, so the budget can be turned into an enemy count
+            start = time.perf_counter()
+            self.forces[rows] = batch.movement_forces(player, occluders, rows)
+            cost = (time.perf_counter() - start) * 1_000_000 / len(rows)
+            self.cost += (cost - self.cost) * 0.1
+            self.ticks_since_think[rows] = 0
+        self.forces[~batch.alive] = 0
+        self.updated = len(rows)
+        self.total_updated += self.updated
+        self.total_deferred += self.deferred
+        return self.forces, batch.ready_attacks(delta_time)
+
+    def adapt(self, step_time: float, target: float = AI_TARGET_STEP_TIME) -> None:
+        """
+        Shrinks the budget when the fixed steps take longer than the target and slowly
+        grows it back when they finish early. Step times within the tolerance band
+        around the target leave the budget alone, so small jitter doesn't move it.
+
+        Parameters
+        ----------
+        step_time: float
+            How long the last fixed steps took to simulate on average in seconds. This
+            should only measure the update work and not any time spent waiting.
+        target: float
+            The target time in seconds for simulating one fixed step.
+        """
+        if step_time > target * (1 + AI_BUDGET_TOLERANCE):
+            self.budget = max(self.budget * AI_BUDGET_SHRINK, AI_MIN_BUDGET)
+        elif step_time < target * (1 - AI_BUDGET_TOLERANCE):
+            self.budget = min(self.budget * AI_BUDGET_GROWTH, AI_MAX_BUDGET)
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+# Builtin
+from typing import Dict, List, Tuple
+
+# Pip
+import arcade
+
+# The animation states in the order they are stored in each table
+ANIMATION_STATES = ("idle", "jump", "fall", "walk")
+IDLE, JUMP, FALL, WALK = range(len(ANIMATION_STATES))
+
+
+class AnimationTable:
+    """
+    A flat table of an entity type's textures indexed by state, frame and facing, so
+    looking up a frame is arithmetic instead of string-keyed dictionary lookups.
+
+    Parameters
+    ----------
+    texture_dict: Dict[str, List[List[arcade.Texture]]]
+        The normal and flipped textures for each frame of each state.
+
+    Attributes
+    ----------
+    frame_counts: Tuple[int, ...]
+        How many frames each state has.
+    offsets: Tuple[int, ...]
+        The index in the table of each state's first frame.
+    textures: List[arcade.Texture]
+        Every texture with the facings of each frame next to each other.
+    """
+
+    def __init__(self, texture_dict: Dict[str, List[List[arcade.Texture]]]) -> None:
+        self.frame_counts: Tuple[int, ...] = tuple(
+            len(texture_dict[state]) for state in ANIMATION_STATES
+        )
+        offsets, offset = [], 0
+        for frame_count in self.frame_counts:
+            offsets.append(offset)
+            offset += frame_count
+        self.offsets: Tuple[int, ...] = tuple(offsets)
+        self.textures: List[arcade.Texture] = [
+            texture
+            for state in ANIMATION_STATES
+            for pair in texture_dict[state]
+            for texture in pair
+        ]
+
+    def __repr__(self) -> str:
+        return f"<AnimationTable (Texture count={len(self.textures)})>"
+
+    def index(self, state: int, frame: int, facing: int) -> int:
+        """
+        Gets the position of a frame in the table.
+
+        Parameters
+        ----------
+        state: int
+            The animation state.
+        frame: int
+            The frame within the state.
+        facing: int
+            The direction the entity is facing.
+
+        Returns
+        -------
+        int
+            The index of the frame's texture.
+        """
+        return (self.offsets[state] + frame) * 2 + facing
+
+
+# The compiled table for each texture dictionary keyed by its id. The dictionary is
+# kept alongside the table, so the id can't be reused
+animation_tables: Dict[int, Tuple[Dict, AnimationTable]] = {}
+
+
+def compile_animations(
+    texture_dict: Dict[str, List[List[arcade.Texture]]]
+) -> AnimationTable:
+    """
+    Gets the animation table for an entity type, compiling it the first time.
+
+    Parameters
+    ----------
+    texture_dict: Dict[str, List[List[arcade.Texture]]]
+        The textures for the entity type.
+
+    Returns
+    -------
+    AnimationTable
+        The compiled animation table.
+    """
+    entry = animation_tables.get(id(texture_dict))
+    if entry is None:
+        entry = texture_dict, AnimationTable(texture_dict)
+        animation_tables[id(texture_dict)] = entry
+    return entry[1]
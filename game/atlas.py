@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+# Builtin
+import json
+import mmap
+import pathlib
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+# Pip
+import arcade
+from PIL import Image
+from pyglet.image.atlas import AllocatorException
+
+# The baked atlas format version (this is bumped when the layout changes)
+ATLAS_VERSION = 2
+
+# The width of the baked atlas (this grows if a texture is wider)
+ATLAS_WIDTH = 1024
+
+# The border of repeated edge pixels around each region, so linear filtering doesn't
+# bleed neighbouring regions into each other
+ATLAS_BORDER = 1
+
+
+def source_manifest(
+    texture_path: pathlib.Path, filenames: List[str]
+) -> Dict[str, List[int]]:
+    """
+    Gets the size and modification time of the source images which make up an atlas.
+    This only needs to stat each file, so checking the atlas is up to date doesn't
+    read the images.
+
+    Parameters
+    ----------
+    texture_path: pathlib.Path
+        The folder containing the source images.
+    filenames: List[str]
+        The filenames of the source images.
+
+    Returns
+    -------
+    Dict[str, List[int]]
+        The size in bytes and modification time in nanoseconds of each source image.
+    """
+    manifest = {}
+    for filename in filenames:
+        stat = texture_path.joinpath(filename).stat()
+        manifest[filename] = [stat.st_size, stat.st_mtime_ns]
+    return manifest
+
+
+def region_name(filename: str, flipped: bool = False) -> str:
+    """
+    Gets the name of the region holding a source image in the baked atlas.
+
+    Parameters
+    ----------
+    filename: str
+        The filename of the source image.
+    flipped: bool
+        Whether the region holds the horizontally flipped image or not.
+
+    Returns
+    -------
+    str
+        The region name.
+    """
+    return f"{filename}:{'flipped' if flipped else 'normal'}"
+
+
+def pack_regions(
+    sizes: Dict[str, Tuple[int, int]]
+) -> Tuple[Tuple[int, int], Dict[str, Tuple[int, int, int, int]]]:
+    """
+    Packs rectangles into rows from tallest to shortest. Each rectangle is surrounded
+    by a border which is not included in its region.
+
+    Parameters
+    ----------
+    sizes: Dict[str, Tuple[int, int]]
+        The width and height of each rectangle.
+
+    Returns
+    -------
+    Tuple[Tuple[int, int], Dict[str, Tuple[int, int, int, int]]]
+        The size of the atlas and the (x, y, width, height) region for each rectangle.
+    """
+    padding = ATLAS_BORDER * 2
+    atlas_width = max([ATLAS_WIDTH, *(width + padding for width, _ in sizes.values())])
+    regions = {}
+    x = y = row_height = 0
+    for name, (width, height) in sorted(
+        sizes.items(), key=lambda item: item[1][1], reverse=True
+    ):
+        # Start a new row if this one is full
+        if x + width + padding > atlas_width:
+            x, y, row_height = 0, y + row_height, 0
+        regions[name] = (x + ATLAS_BORDER, y + ATLAS_BORDER, width, height)
+        x += width + padding
+        row_height = max(row_height, height + padding)
+    return (atlas_width, y + row_height), regions
+
+
+def bake_atlas(
+    texture_path: pathlib.Path,
+    filenames: List[str],
+    image_path: pathlib.Path,
+    index_path: pathlib.Path,
+) -> None:
+    """
+    Decodes every source image and packs it and its horizontally flipped copy into a
+    single raw RGBA atlas with a JSON region index.
+
+    Parameters
+    ----------
+    texture_path: pathlib.Path
+        The folder containing the source images.
+    filenames: List[str]
+        The filenames of the source images.
+    image_path: pathlib.Path
+        The path to write the raw RGBA atlas to.
+    index_path: pathlib.Path
+        The path to write the region index to.
+    """
+    images = {}
+    for filename in filenames:
+        image = Image.open(texture_path.joinpath(filename)).convert("RGBA")
+        images[region_name(filename)] = image
+        images[region_name(filename, True)] = image.transpose(Image.FLIP_LEFT_RIGHT)
+    size, regions = pack_regions({name: image.size for name, image in images.items()})
+    atlas = Image.new("RGBA", size)
+    for name, (x, y, _, _) in regions.items():
+        # Paste the image shifted in each direction first to repeat its edge pixels
+        # into the border
+        for dx, dy in (
+            (-ATLAS_BORDER, 0),
+            (ATLAS_BORDER, 0),
+            (0, -ATLAS_BORDER),
+            (0, ATLAS_BORDER),
+            (0, 0),
+        ):
+            atlas.paste(images[name], (x + dx, y + dy))
+    image_path.write_bytes(atlas.tobytes())
+    index_path.write_text(
+        json.dumps(
+            {
+                "version": ATLAS_VERSION,
+                "sources": source_manifest(texture_path, filenames),
+                "size": size,
+                "regions": regions,
+            }
+        ),
+        encoding="utf8",
+    )
+
+
+class BakedAtlas:
+    """
+    A pre-decoded RGBA atlas which is memory-mapped and handed out as textures.
+
+    Parameters
+    ----------
+    image_path: pathlib.Path
+        The path to the raw RGBA atlas.
+    index: Dict
+        The parsed region index.
+
+    Attributes
+    ----------
+    buffer: mmap.mmap
+        The memory-mapped atlas. This is mapped copy-on-write, so it can be handed
+        to OpenGL directly.
+    image: Image.Image
+        The atlas image. This shares memory with the memory-mapped file.
+    regions: Dict[str, Tuple[int, int, int, int]]
+        The (x, y, width, height) region for each source image and its flipped copy.
+    textures: Dict[str, arcade.Texture]
+        Every texture which has been handed out keyed by its region name.
+    """
+
+    def __init__(self, image_path: pathlib.Path, index: Dict) -> None:
+        with open(image_path, "rb") as file:
+            self.buffer: mmap.mmap = mmap.mmap(
+                file.fileno(), 0, access=mmap.ACCESS_COPY
+            )
+        self.image: Image.Image = Image.frombuffer(
+            "RGBA", tuple(index["size"]), self.buffer, "raw", "RGBA", 0, 1
+        )
+        self.regions: Dict[str, Tuple[int, int, int, int]] = index["regions"]
+        self.textures: Dict[str, arcade.Texture] = {}
+
+    def __repr__(self) -> str:
+        return (
+            f"<BakedAtlas (Size={self.image.size}) (Region count={len(self.regions)})>"
+        )
+
+    def texture(self, filename: str, flipped: bool = False) -> arcade.Texture:
+        """
+        Gets the texture for a region of the atlas. Arcade textures need their own
+        image for their size and hit box, so the region is copied out of the
+        memory-mapped image.
+
+        Parameters
+        ----------
+        filename: str
+            The filename of the source image.
+        flipped: bool
+            Whether to get the horizontally flipped texture or not.
+
+        Returns
+        -------
+        arcade.Texture
+            The texture for the region.
+        """
+        name = region_name(filename, flipped)
+        if name not in self.textures:
+            x, y, width, height = self.regions[name]
+            self.textures[name] = arcade.Texture(
+                f"atlas:{name}", self.image.crop((x, y, x + width, y + height))
+            )
+        return self.textures[name]
+
+    def texture_pair(self, filename: str) -> List[arcade.Texture]:
+        """
+        Gets a texture and its horizontally flipped version like arcade's
+        load_texture_pair.
+
+        Parameters
+        ----------
+        filename: str
+            The filename of the source image.
+
+        Returns
+        -------
+        List[arcade.Texture]
+            The normal and flipped textures.
+        """
+        return [self.texture(filename), self.texture(filename, True)]
+
+    def upload(self, atlas: arcade.TextureAtlas) -> bool:
+        """
+        Writes the whole baked atlas into a texture atlas with a single upload and
+        points every texture which has been handed out at its region of it. Arcade
+        has no public way to add pre-packed regions, so this fills in the same
+        bookkeeping as TextureAtlas.allocate. The texture atlas is grown if the baked
+        atlas doesn't fit.
+
+        Parameters
+        ----------
+        atlas: arcade.TextureAtlas
+            The texture atlas to upload to.
+
+        Returns
+        -------
+        bool
+            Whether the baked atlas was uploaded or not. If it wasn't, the textures
+            have to be added to the texture atlas separately.
+        """
+        # Reserve space for the baked atlas, growing the texture atlas if needed
+        width, height = self.image.size
+        while True:
+            try:
+                left, top = atlas._allocator.alloc(width, height)
+                break
+            except AllocatorException:
+                size = (
+                    min(atlas.width * 2, atlas.max_width),
+                    min(atlas.height * 2, atlas.max_height),
+                )
+                if size == atlas.size:
+                    return False
+                atlas.resize(size)
+
+        # Upload every region at once
+        atlas.texture.write(
+            self.buffer, 0, viewport=(left, top, width, height)  # type: ignore
+        )
+
+        # Register each texture at its region
+        for name, texture in self.textures.items():
+            if atlas.has_texture(texture):
+                continue
+            x, y, region_width, region_height = self.regions[name]
+            region = arcade.AtlasRegion(
+                atlas, texture, left + x, top + y, region_width, region_height
+            )
+            slot = atlas._uv_slots_free.popleft()
+            atlas._atlas_regions[texture.name] = region
+            atlas._uv_slots[texture.name] = slot
+            atlas._uv_data[slot * 4 : slot * 4 + 4] = array(
+                "f", region.texture_coordinates
+            )
+            atlas._uv_data_changed = True
+            atlas._textures.append(texture)
+        return True
+
+
+def load_atlas(
+    texture_path: pathlib.Path,
+    filenames: List[str],
+    image_path: pathlib.Path,
+    index_path: pathlib.Path,
+) -> Optional[BakedAtlas]:
+    """
+    Loads a baked atlas if it exists and matches the current source images. The
+    source images are compared by size and modification time, so this doesn't need
+    to read them.
+
+    Parameters
+    ----------
+    texture_path: pathlib.Path
+        The folder containing the source images.
+    filenames: List[str]
+        The filenames of the source images.
+    image_path: pathlib.Path
+        The path to the raw RGBA atlas.
+    index_path: pathlib.Path
+        The path to the region index.
+
+    Returns
+    -------
+    Optional[BakedAtlas]
+        The baked atlas or None if it is missing or stale.
+    """
+    try:
+        index = json.loads(index_path.read_text(encoding="utf8"))
+        if index["version"] != ATLAS_VERSION or index["sources"] != source_manifest(
+            texture_path, filenames
+        ):
+            return None
+        return BakedAtlas(image_path, index)
+    except (OSError, ValueError, KeyError):
+        return None
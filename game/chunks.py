@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+# Builtin
+import math
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+# Pip
+import arcade
+
+# Custom
+from constants import CHUNK_SIZE, SPRITE_SIZE
+
+
+class ChunkedSpriteList:
+    """
+    Splits sprites into fixed-size spatial chunks which each have their own sprite list,
+    so drawing a region only submits the chunks which overlap it. The draw cost then
+    depends on the size of the region and not on the size of the level.
+
+    Parameters
+    ----------
+    sprites: Iterable[arcade.Sprite]
+        The sprites to split into chunks.
+    chunk_size: float
+        The width and height of each chunk in pixels.
+
+    Attributes
+    ----------
+    chunks: Dict[Tuple[int, int], arcade.SpriteList]
+        The sprite list for each chunk keyed by its column and row.
+    locations: Dict[arcade.Sprite, Tuple[int, int]]
+        The chunk which each sprite was last placed in.
+    """
+
+    def __init__(
+        self,
+        sprites: Iterable[arcade.Sprite] = (),
+        chunk_size: float = CHUNK_SIZE * SPRITE_SIZE,
+    ) -> None:
+        self.chunk_size: float = chunk_size
+        self.chunks: Dict[Tuple[int, int], arcade.SpriteList] = {}
+        self.locations: Dict[arcade.Sprite, Tuple[int, int]] = {}
+        for sprite in sprites:
+            self.append(sprite)
+
+    def __repr__(self) -> str:
+        return (
+            f"<ChunkedSpriteList (Chunk count={len(self.chunks)}) (Sprite"
+            f" count={len(self)})>"
+        )
+
+    def __len__(self) -> int:
+        return sum(len(chunk) for chunk in self.chunks.values())
+
+    def chunk_at(self, x: float, y: float) -> Tuple[int, int]:
+        """
+        Gets the chunk which contains a point.
+
+        Parameters
+        ----------
+        x: float
+            The x position of the point.
+        y: float
+            The y position of the point.
+
+        Returns
+        -------
+        Tuple[int, int]
+            The column and row of the chunk.
+        """
+        return int(x // self.chunk_size), int(y // self.chunk_size)
+
+    def chunks_in(
+        self, region: Tuple[float, float, float, float]
+    ) -> Iterator[arcade.SpriteList]:
+        """
+        Gets the chunks which overlap a region. Sprites are placed by their center, so
+        the region is grown by half a chunk to catch sprites hanging over its edge.
+
+        Parameters
+        ----------
+        region: Tuple[float, float, float, float]
+            The left, bottom, right and top of the region.
+
+        Returns
+        -------
+        Iterator[arcade.SpriteList]
+            The sprite list for each overlapping chunk which has sprites.
+        """
+        left, bottom, right, top = region
+        margin = self.chunk_size / 2
+        for column in range(
+            int((left - margin) // self.chunk_size),
+            math.ceil((right + margin) / self.chunk_size),
+        ):
+            for row in range(
+                int((bottom - margin) // self.chunk_size),
+                math.ceil((top + margin) / self.chunk_size),
+            ):
+                chunk = self.chunks.get((column, row))
+                if chunk:
+                    yield chunk
+
+    def append(self, sprite: arcade.Sprite) -> None:
+        """
+        Adds a sprite to the chunk containing its center.
+
+        Parameters
+        ----------
+        sprite: arcade.Sprite
+            The sprite to add.
+        """
+        location = self.chunk_at(sprite.center_x, sprite.center_y)
+        chunk = self.chunks.get(location)
+        if chunk is None:
+            chunk = self.chunks[location] = arcade.SpriteList()
+        chunk.append(sprite)
+        self.locations[sprite] = location
+
+    def update_locations(self) -> None:
+        """
+        Moves sprites which have crossed into another chunk and forgets sprites which
+        have been removed from their chunk's sprite list.
+        """
+        for sprite, location in list(self.locations.items()):
+            chunk = self.chunks[location]
+            if chunk not in sprite.sprite_lists:
+                del self.locations[sprite]
+                continue
+            new_location = self.chunk_at(sprite.center_x, sprite.center_y)
+            if new_location != location:
+                chunk.remove(sprite)
+                self.append(sprite)
+
+    def draw(
+        self,
+        region: Tuple[float, float, float, float],
+        blend_function: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        """
+        Draws the chunks which overlap a region.
+
+        Parameters
+        ----------
+        region: Tuple[float, float, float, float]
+            The left, bottom, right and top of the region.
+        blend_function: Optional[Tuple[int, int]]
+            The blend function to draw with. Arcade's default is used if this is None.
+        """
+        for chunk in self.chunks_in(region):
+            chunk.draw(blend_function=blend_function)
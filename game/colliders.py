@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+# Builtin
+from typing import Dict, List, Tuple
+
+# Pip
+import arcade
+from shapely.geometry import Polygon, box
+from shapely.ops import unary_union
+
+# The points of a collider polygon in world coordinates
+ColliderPolygon = List[Tuple[float, float]]
+
+
+def tile_polygon(sprite: arcade.Sprite) -> Polygon:
+    """
+    Converts a tile sprite's hit box into a polygon in world coordinates.
+
+    Parameters
+    ----------
+    sprite: arcade.Sprite
+        The tile sprite to convert.
+
+    Returns
+    -------
+    Polygon
+        The tile's hit box.
+    """
+    return Polygon(sprite.get_adjusted_hit_box())
+
+
+def is_rectangle(polygon: Polygon) -> bool:
+    """
+    Checks if a polygon is an axis-aligned rectangle.
+
+    Parameters
+    ----------
+    polygon: Polygon
+        The polygon to check.
+
+    Returns
+    -------
+    bool
+        Whether the polygon fills its bounding box or not.
+    """
+    return abs(polygon.envelope.area - polygon.area) < 1e-6
+
+
+def split_rectangles(polygon: Polygon) -> List[Tuple[float, float, float, float]]:
+    """
+    Splits a rectilinear polygon into as few rectangles as a sweep allows. The polygon
+    is cut into horizontal strips at every vertex height, so each strip is a set of
+    maximal horizontal runs, and runs with the same width are then stacked into taller
+    rectangles.
+
+    Parameters
+    ----------
+    polygon: Polygon
+        The rectilinear polygon to split. This can contain holes.
+
+    Returns
+    -------
+    List[Tuple[float, float, float, float]]
+        The left, bottom, right and top of each rectangle.
+    """
+    # Get every height where the outline changes
+    heights = sorted(
+        {y for ring in (polygon.exterior, *polygon.interiors) for _, y in ring.coords}
+    )
+    left, _, right, _ = polygon.bounds
+
+    # Cut each strip and stack it onto a rectangle of the same width directly below it
+    open_rectangles: Dict[Tuple[float, float, float], float] = {}
+    for bottom, top in zip(heights, heights[1:]):
+        strip = polygon.intersection(box(left, bottom, right, top))
+        for part in getattr(strip, "geoms", [strip]):
+            if part.geom_type != "Polygon" or part.area <= 0:
+                continue
+            run_left, _, run_right, _ = part.bounds
+            start = open_rectangles.pop((run_left, run_right, bottom), bottom)
+            open_rectangles[(run_left, run_right, top)] = start
+    return [
+        (run_left, bottom, run_right, top)
+        for (run_left, run_right, top), bottom in open_rectangles.items()
+    ]
+
+
+def merge_tiles(sprite_list: arcade.SpriteList) -> List[ColliderPolygon]:
+    """
+    Merges the hit boxes of a tile layer into as few collider polygons as possible.
+    Square tiles are unioned and split into maximal rectangles, while tiles with any
+    other hit box keep their own polygon so their shape isn't lost.
+
+    Parameters
+    ----------
+    sprite_list: arcade.SpriteList
+        The tile sprites to merge.
+
+    Returns
+    -------
+    List[ColliderPolygon]
+        The points of each merged collider in world coordinates.
+    """
+    rectangles: List[Polygon] = []
+    colliders: List[ColliderPolygon] = []
+    for sprite in sprite_list:
+        polygon = tile_polygon(sprite)
+        if is_rectangle(polygon):
+            rectangles.append(polygon)
+        else:
+            colliders.append(list(polygon.exterior.coords)[:-1])
+
+    # Union the square tiles and split each connected region back into rectangles
+    merged = unary_union(rectangles)
+    for region in getattr(merged, "geoms", [merged]):
+        if region.geom_type != "Polygon" or region.is_empty:
+            continue
+        colliders.extend(
+            [(left, bottom), (right, bottom), (right, top), (left, top)]
+            for left, bottom, right, top in split_rectangles(region)
+        )
+    return colliders
+
+
+class StaticCollider(arcade.Sprite):
+    """
+    An invisible sprite which stands in for a group of merged tiles in the physics
+    engine.
+
+    Parameters
+    ----------
+    points: ColliderPolygon
+        The points of the collider in world coordinates.
+    group: arcade.SpriteList
+        The sprite list containing the tiles which this collider covers.
+
+    Attributes
+    ----------
+    group: arcade.SpriteList
+        The sprite list containing the tiles which this collider covers.
+    """
+
+    def __init__(self, points: ColliderPolygon, group: arcade.SpriteList) -> None:
+        super().__init__()
+        left, bottom, right, top = Polygon(points).bounds
+        self.center_x = (left + right) / 2
+        self.center_y = (bottom + top) / 2
+        self.set_hit_box([(x - self.center_x, y - self.center_y) for x, y in points])
+        self.group: arcade.SpriteList = group
+
+    def __repr__(self) -> str:
+        return (
+            f"<StaticCollider (Position=({self.center_x}, {self.center_y})) (Point"
+            f" count={len(self.get_hit_box())})>"
+        )
@@ -5,6 +5,12 @@ BUTTON_STYLE = {
     "bg_color": (196, 196, 196),
 }
 LEVEL_COUNT = 10
+TOP_SCORE_COUNT = 5  # How many scores are shown for each level
+SCORE_TRANSFER_BATCH_SIZE = 10000  # How many scores are imported or exported at once
+
+# Level cache constants
+LEVEL_CACHE_SIZE = 3  # The maximum amount of levels which can be loaded at once
+LEVEL_MEMORY_BUDGET = 64 * 1024 * 1024  # The memory the loaded levels can use
 
 # Sprite sizes
 SPRITE_SCALE = 0.5
@@ -13,6 +19,12 @@ SPRITE_SIZE = 128 * SPRITE_SCALE
 # Physics constants
 GRAVITY = (0, -2000)
 DAMPING = 0.01  # This has to be set to 0.01 as 0 would make the player not move at all
+SIMULATION_TIMESTEP = 1 / 60  # The simulated time for each fixed step
+PHYSICS_SUBSTEPS = 1  # How many physics steps each fixed step is split into
+MAX_CATCH_UP_STEPS = 5  # The most fixed steps which can be simulated in one update
+UPDATE_RATE = 1 / 60  # How often the window updates and draws (separate to the above)
+PHYSICS_SLEEP_TIME = 1  # How long a resting body waits before it falls asleep
+PHYSICS_ACTIVATION_MARGIN = 6  # How many tiles past the screen bodies stay awake
 FRICTION = 0.4
 MASS = 1.0
 
@@ -21,6 +33,7 @@ FACING_RIGHT = 0
 FACING_LEFT = 1
 DEAD_ZONE = 0.1  # Needed since the physics engine often flips above and below zero
 DISTANCE_TO_CHANGE_TEXTURE = 20  # How far the entity needs to travel to change texture
+OFFSCREEN_ANIMATION_INTERVAL = 4  # Moves between animation updates when off camera
 
 # Player constants
 PLAYER_MOVE_FORCE = 1000
@@ -39,5 +52,40 @@ BOSS_ATTACK_COOLDOWN_MAX = 3
 ENEMY_BULLET_DAMAGE = 5
 BOSS_BULLET_DAMAGE = 20
 
+# Enemy AI scheduler constants
+AI_BUDGET = 500  # The initial microseconds which can be spent on AI each tick
+AI_MIN_BUDGET = 50
+AI_MAX_BUDGET = 2000
+AI_BUDGET_SHRINK = 0.75  # How much the budget shrinks when a step is over target
+AI_BUDGET_GROWTH = 1.05  # How much the budget grows when a step is under target
+AI_TARGET_STEP_TIME = UPDATE_RATE / 2  # The step work time which leaves time to draw
+AI_BUDGET_TOLERANCE = 0.25  # How far a step can stray from the target unadjusted
+AI_FIXED_CAPACITY = 50  # How many enemies think each tick in deterministic runs
+AI_INITIAL_COST = 10  # The initial estimate in microseconds for one enemy to think
+AI_NEAR_DISTANCE = 3  # Enemies within this many tiles of the player think every tick
+AI_FAR_INTERVAL = 6  # How many ticks the other enemies wait between thinking
+
 # Bullet constants
 BULLET_VELOCITY = 500
+BULLET_WIDTH = 50
+BULLET_HEIGHT = 10
+BULLET_POOL_SIZE = 64
+BULLET_TIME_TO_LIVE = 3  # How many seconds a bullet can fly for before it is retired
+
+# Rendering constants
+STATIC_TILE_SIZE = 1024  # The size in pixels of each pre-rendered static layer tile
+CHUNK_SIZE = 16  # The width and height in tiles of each sprite list chunk
+
+# Streaming constants
+STREAM_MARGIN = 1  # How many chunks past the physics activation region are loaded
+STREAM_UNLOAD_MARGIN = 2  # How many chunks past the region a chunk is unloaded at
+
+# Level generator constants
+GENERATOR_BAND_HEIGHT = 3  # How many rows apart the generated platform rows are
+GENERATOR_PLATFORM_MIN = 2  # The shortest generated platform in tiles
+GENERATOR_PLATFORM_MAX = 6  # The longest generated platform in tiles
+GENERATOR_SAFE_COLUMNS = 8  # How many columns next to the player have no enemies
+
+# Profiler constants
+PROFILER_SAMPLE_COUNT = 240  # How many frames the performance overlay keeps
+PROFILER_FRAME_BUDGET = 1 / 60  # Frames which take longer than this are highlighted
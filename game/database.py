@@ -1,9 +1,17 @@
 from __future__ import annotations
 
 # Builtin
+import atexit
+import logging
 import pathlib
+import queue
 import sqlite3
-from typing import TYPE_CHECKING
+import threading
+from bisect import insort
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+# Custom
+from constants import TOP_SCORE_COUNT
 
 if TYPE_CHECKING:
     from window import Window
@@ -13,6 +21,78 @@ database_path = (
     pathlib.Path(__file__).resolve().parent.joinpath("resources").joinpath("scores.db")
 )
 
+# Get the logger for this module
+logger = logging.getLogger(__name__)
+
+# A queued score (score, time, win, level) or None to stop the writer thread
+PendingScore = Optional[Tuple[int, float, bool, int]]
+
+# The schema migrations in order. The database's user_version stores how many have run
+MIGRATIONS = [
+    # Cover the leaderboard query, so it only reads the top rows of the index
+    """
+    CREATE INDEX IF NOT EXISTS Scores_Leaderboard
+    ON Scores(Level_ID, Score DESC, Time_to_complete ASC, Win);""",
+    # Allow scores for the generated levels after the shipped ones. SQLite can't alter
+    # a check constraint, so the table is rebuilt
+    """
+    CREATE TABLE Scores_New(
+        Game_ID INTEGER PRIMARY KEY,
+        Score INTEGER,
+        Time_to_complete REAL CHECK(Time_to_complete >= 0),
+        Win INTEGER CHECK(Win = 0 OR Win = 1),
+        Level_ID INTEGER CHECK(Level_ID >= 1)
+    );
+    INSERT INTO Scores_New SELECT * FROM Scores;
+    DROP TABLE Scores;
+    ALTER TABLE Scores_New RENAME TO Scores;
+    CREATE INDEX Scores_Leaderboard
+    ON Scores(Level_ID, Score DESC, Time_to_complete ASC, Win);""",
+]
+
+
+def migrate(connection: sqlite3.Connection) -> None:
+    """
+    Runs the schema migrations which haven't been applied to a database yet. Each
+    migration runs in its own transaction, so a failed one leaves the database as it
+    was.
+
+    Parameters
+    ----------
+    connection: sqlite3.Connection
+        The connection to the sqlite database.
+    """
+    (version,) = connection.execute("PRAGMA user_version;").fetchone()
+    for index, migration in enumerate(MIGRATIONS[version:], version + 1):
+        try:
+            connection.executescript(
+                f"BEGIN;{migration}\nPRAGMA user_version = {index};\nCOMMIT;"
+            )
+        except sqlite3.Error:
+            connection.rollback()
+            raise
+
+
+def connect(path: pathlib.Path) -> sqlite3.Connection:
+    """
+    Connects to the sqlite database in write-ahead logging mode, so reads aren't
+    blocked while scores are being written.
+
+    Parameters
+    ----------
+    path: pathlib.Path
+        The path to the sqlite database.
+
+    Returns
+    -------
+    sqlite3.Connection
+        The connection to the sqlite database.
+    """
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL;")
+    connection.execute("PRAGMA synchronous=NORMAL;")
+    return connection
+
 
 class Database:
     """
@@ -22,23 +102,145 @@ class Database:
     ----------
     window: Window
         The window which this class belong too.
+    path: pathlib.Path
+        The path to the sqlite database.
 
     Attributes
     ----------
     connection: sqlite3.Connection
-        The connection to the sqlite database.
+        The connection to the sqlite database used for reading on the main thread.
+    pending: queue.Queue
+        The scores waiting to be written by the writer thread. None tells the writer
+        thread to stop.
+    writer: threading.Thread
+        The background thread which writes the queued scores in batches.
+    top_scores: Dict[int, List[Tuple[int, float, bool]]]
+        The top scores for each level sorted by score then time. These are sort keys of
+        (-score, time, win) and are kept up to date as scores are committed.
+    score_text: Dict[int, str]
+        The formatted top scores text for each level which hasn't changed since it was
+        last displayed.
     """
 
-    def __init__(self, window: Window) -> None:
+    def __init__(self, window: Window, path: pathlib.Path = database_path) -> None:
         self.window: Window = window
-        self.connection: sqlite3.Connection = sqlite3.connect(database_path)
+        self.path: pathlib.Path = path
+        self.connection: sqlite3.Connection = connect(path)
+        migrate(self.connection)
+        self.top_scores: Dict[int, List[Tuple[int, float, bool]]] = {}
+        self.score_text: Dict[int, str] = {}
+        self.load_top_scores()
+        self.pending: queue.Queue[PendingScore] = queue.Queue()
+        self.writer: threading.Thread = threading.Thread(
+            target=self._write_scores, name="DatabaseWriter", daemon=True
+        )
+        self.writer.start()
+        self.closed: bool = False
+
+        # Make sure the queued scores are written when the game exits
+        atexit.register(self.close)
 
     def __repr__(self) -> str:
         return f"<Database (Connection={self.connection})>"
 
+    @staticmethod
+    def _insert_scores(
+        connection: sqlite3.Connection, rows: List[Tuple[int, float, bool, int]]
+    ) -> None:
+        """
+        Inserts scores in one transaction.
+
+        Parameters
+        ----------
+        connection: sqlite3.Connection
+            The connection to write with.
+        rows: List[Tuple[int, float, bool, int]]
+            The score, time to complete, win and level for each score.
+        """
+        with connection:
+            connection.executemany(
+                """
+                INSERT INTO Scores(Score, Time_to_complete, Win, Level_ID)
+                VALUES(?, ?, ?, ?);""",
+                rows,
+            )
+
+    def _write_scores(self) -> None:
+        """
+        Writes the queued scores in batches until it is told to stop. This runs on the
+        writer thread with its own connection. If the thread fails, every score left in
+        the queue is marked as done so flush and close don't wait forever.
+        """
+        connection: Optional[sqlite3.Connection] = None
+        try:
+            connection = connect(self.path)
+            running = True
+            while running:
+                running = self._write_batch(connection)
+        except Exception:
+            logger.exception("The database writer thread stopped unexpectedly")
+        finally:
+            if connection is not None:
+                connection.close()
+
+            # Drain the queue so nothing is left waiting on the scores
+            while True:
+                try:
+                    row = self.pending.get_nowait()
+                except queue.Empty:
+                    break
+                if row is not None:
+                    logger.error("Failed to write score %s", row)
+                self.pending.task_done()
+
+    def _write_batch(self, connection: sqlite3.Connection) -> bool:
+        """
+        Waits for a score then writes every queued score in one transaction.
+
+        Parameters
+        ----------
+        connection: sqlite3.Connection
+            The connection to write with.
+
+        Returns
+        -------
+        bool
+            Whether the writer thread should keep running or not.
+        """
+        # Wait for a score then take every other queued score with it
+        batch: List[Tuple[int, float, bool, int]] = []
+        running = True
+        item = self.pending.get()
+        while True:
+            if item is None:
+                running = False
+            else:
+                batch.append(item)
+            try:
+                item = self.pending.get_nowait()
+            except queue.Empty:
+                break
+
+        # Write the batch in one transaction
+        try:
+            self._insert_scores(connection, batch)
+        except sqlite3.Error:
+            # Write the scores one at a time so a bad score doesn't lose the rest
+            for row in batch:
+                try:
+                    self._insert_scores(connection, [row])
+                except sqlite3.Error:
+                    logger.exception("Failed to write score %s", row)
+        finally:
+            for _ in range(len(batch) + (not running)):
+                self.pending.task_done()
+        return running
+
     def commit_score(self, score: int, time: float, win: bool, level: int) -> None:
         """
-        Commits a score to the database
+        Queues a score to be committed to the database. This returns immediately and
+        the score is written by the writer thread. If the database has been closed or
+        the writer thread has stopped, the score is logged instead.
 
         Parameters
         ----------
@@ -51,17 +253,71 @@ class Database:
         level: int
             The level number.
         """
-        self.connection.execute(
-            """
-            INSERT INTO Scores(Score, Time_to_complete, Win, Level_ID)
-            VALUES(?, ?, ?, ?);""",
-            (score, time, win, level),
-        )
-        self.connection.commit()
+        if self.closed or not self.writer.is_alive():
+            logger.error(
+                "Can't commit score %s since the database writer has stopped",
+                (score, time, win, level),
+            )
+            return
+        self.pending.put((score, time, win, level))
+
+        # Update the cached top scores for the level
+        top_scores = self.top_scores.setdefault(level, [])
+        insort(top_scores, (-score, time, bool(win)))
+        del top_scores[TOP_SCORE_COUNT:]
+        self.score_text.pop(level, None)
+
+    def load_top_scores(self) -> None:
+        """Fills the top scores cache for every level which has scores."""
+        # Find each level by seeking past the previous one in the index, so this
+        # doesn't depend on how many scores there are
+        level_query = """
+            WITH RECURSIVE Levels(Level_ID) AS (
+                SELECT MIN(Level_ID) FROM Scores
+                UNION ALL
+                SELECT (
+                    SELECT MIN(Level_ID) FROM Scores WHERE Level_ID > Levels.Level_ID
+                )
+                FROM Levels
+                WHERE Level_ID IS NOT NULL
+            )
+            SELECT Level_ID FROM Levels WHERE Level_ID IS NOT NULL;"""
+
+        # Each level's rows then come from a separate index seek
+        top_query = """
+            SELECT Score, Time_to_complete, Win
+            FROM Scores
+            WHERE Level_ID = ?
+            ORDER BY Score DESC, Time_to_complete ASC
+            LIMIT ?;"""
+        self.top_scores = {}
+        self.score_text.clear()
+        for (level,) in self.connection.execute(level_query).fetchall():
+            self.top_scores[level] = sorted(
+                (-score, time, bool(win))
+                for score, time, win in self.connection.execute(
+                    top_query, (level, TOP_SCORE_COUNT)
+                )
+            )
+
+    def flush(self) -> None:
+        """Waits until every queued score has been written."""
+        if self.writer.is_alive():
+            self.pending.join()
+
+    def close(self) -> None:
+        """Writes the queued scores, stops the writer thread and closes the database."""
+        if self.closed:
+            return
+        self.closed = True
+        if self.writer.is_alive():
+            self.pending.put(None)
+            self.writer.join()
+        self.connection.close()
 
     def get_five_scores(self, level: int) -> str:
         """
-        Gets the top five scores for a specific level.
+        Gets the top five scores for a specific level from the cache.
 
         Parameters
         ----------
@@ -73,31 +329,30 @@ class Database:
         str
             The score text which will be displayed to the user.
         """
-        final = []
-        cursor = self.connection.cursor()
-        for count, result in enumerate(
-            cursor.execute(
-                """
-                SELECT Score, Time_to_complete, Win
-                FROM Scores
-                WHERE Level_ID = ?
-                ORDER BY Score DESC, Time_to_complete ASC
-                LIMIT 5;""",
-                (level,),
-            )
-        ):
-            result = list(result)
-            final.append(
-                f"{count + 1}. Score: {result[0]}."
-                f" {self.window.seconds_to_string(result[1])}. Win:"
-                f" {'Yes' if result[2] else 'No'}"
+        # Use the cached text if the level's scores haven't changed
+        if level in self.score_text:
+            return self.score_text[level]
+
+        # Format the cached top scores
+        final = [
+            f"{count + 1}. Score: {-negative_score}."
+            f" {self.window.seconds_to_string(time)}. Win: {'Yes' if win else 'No'}"
+            for count, (negative_score, time, win) in enumerate(
+                self.top_scores.get(level, [])
             )
+        ]
         if final:
-            final.insert(0, f"Top 5 Scores (Level {level}):\n")
-            return "\n".join(final)
-        return "No scores saved. Play the level to generate some."
+            final.insert(0, f"Top {TOP_SCORE_COUNT} Scores (Level {level}):\n")
+            text = "\n".join(final)
+        else:
+            text = "No scores saved. Play the level to generate some."
+        self.score_text[level] = text
+        return text
 
     def delete_all(self) -> None:
         """Deletes all rows in the scores table."""
+        self.flush()
         self.connection.execute("DELETE FROM Scores;")
         self.connection.commit()
+        self.top_scores = {}
+        self.score_text.clear()
@@ -1,23 +1,26 @@
 from __future__ import annotations
 
 # Builtin
-from typing import TYPE_CHECKING, Dict, List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Set, Tuple
 
 # Pip
 import arcade
 
 # Custom
+from animation import FALL, IDLE, JUMP, WALK, AnimationTable, compile_animations
 from constants import (
-    BULLET_VELOCITY,
     DEAD_ZONE,
     DISTANCE_TO_CHANGE_TEXTURE,
     FACING_LEFT,
     FACING_RIGHT,
+    OFFSCREEN_ANIMATION_INTERVAL,
     SPRITE_SCALE,
 )
 
 if TYPE_CHECKING:
+    import pymunk
     from physics import PhysicsEngine
+    from projectiles import ProjectileManager
 
 
 class Bullet(arcade.SpriteSolidColor):
@@ -40,6 +43,8 @@ class Bullet(arcade.SpriteSolidColor):
         The direction of the bullet. 1 is right and -1 is left.
     owner: Entity
         The entity which shot the bullet.
+    manager: ProjectileManager
+        The projectile manager which owns this bullet.
     """
 
     def __init__(
@@ -51,12 +56,15 @@ class Bullet(arcade.SpriteSolidColor):
         color: Tuple[int, int, int],
         direction: int,
         owner: Entity,
+        manager: ProjectileManager,
     ) -> None:
         super().__init__(width=width, height=height, color=color)
         self.center_x: float = x
         self.center_y: float = y
+        self.solid_color: Tuple[int, int, int] = color
         self.direction: int = direction
         self.owner: Entity = owner
+        self.manager: ProjectileManager = manager
 
     def __repr__(self) -> str:
         return f"<Bullet (Position=({self.center_x}, {self.center_y}))>"
@@ -83,6 +91,10 @@ class Entity(arcade.Sprite):
     ----------
     texture: arcade.Texture
         The sprite which represents this entity.
+    animations: AnimationTable
+        The compiled animation table for this entity's textures.
+    texture_index: int
+        The index in the animation table of the current texture.
     time_since_last_attack: float
         How long it has been since the last attack.
     facing: int
@@ -91,6 +103,13 @@ class Entity(arcade.Sprite):
         The current walk texture index which is displayed.
     x_odometer: float
         Measures how far the entity has travelled in the x direction.
+    offscreen_moves: int
+        How many moves have been made off camera since the animation last advanced.
+    ground_contacts: Set[pymunk.Shape]
+        The wall and blocker shapes which the entity is standing on. This is kept up to
+        date by the physics engine's collision handlers.
+    is_grounded: bool
+        Whether the entity is standing on a wall or blocker or not.
     """
 
     def __init__(
@@ -107,23 +126,28 @@ class Entity(arcade.Sprite):
         self.texture_dict: Dict[str, List[List[arcade.Texture]]] = texture_dict
         self.health: int = health
         self.bullet_damage: int = bullet_damage
-        self.texture: arcade.Texture = self.texture_dict["idle"][0][0]
+        self.animations: AnimationTable = compile_animations(texture_dict)
+        self.texture_index: int = self.animations.index(IDLE, 0, FACING_RIGHT)
+        self.texture: arcade.Texture = self.animations.textures[self.texture_index]
         self.time_since_last_attack: float = 0
         self.facing: int = FACING_RIGHT
         self.walk_texture_index: int = 0
         self.x_odometer: float = 0
+        self.offscreen_moves: int = 0
+        self.ground_contacts: Set[pymunk.Shape] = set()
+        self.is_grounded: bool = False
 
     def __repr__(self) -> str:
         return f"<Entity (Position=({self.center_x}, {self.center_y}))>"
 
-    def ranged_attack(self, bullet_list: arcade.SpriteList) -> None:
+    def ranged_attack(self, projectiles: ProjectileManager) -> None:
         """
         Spawns a bullet in a specific direction.
 
         Parameters
         ----------
-        bullet_list: arcade.SpriteList
-            The sprite list to add the bullet to.
+        projectiles: ProjectileManager
+            The projectile manager to spawn the bullet from.
         """
         self.time_since_last_attack = 0
         center_x = self.center_x
@@ -133,18 +157,30 @@ class Entity(arcade.Sprite):
         else:
             center_x -= 48
             direction = -1
-        new_bullet = Bullet(
-            center_x, self.center_y, 50, 10, arcade.color.RED, self.facing, self
-        )
-        physics: PhysicsEngine = self.physics_engines[0]
-        physics.add_bullet(new_bullet)
-        physics.set_velocity(new_bullet, (BULLET_VELOCITY * direction, 0))
-        bullet_list.append(new_bullet)
+        projectiles.spawn(center_x, self.center_y, direction, self)
 
     def deal_damage(self, damage: int) -> None:
         """Deals damage to the entity."""
         self.health -= damage
 
+    def show_frame(self, state: int, frame: int = 0) -> None:
+        """
+        Shows a frame of an animation in the direction the entity is facing. The
+        texture is only assigned if the frame has changed, since every assignment marks
+        the sprite as dirty in its sprite lists.
+
+        Parameters
+        ----------
+        state: int
+            The animation state.
+        frame: int
+            The frame within the state.
+        """
+        index = self.animations.index(state, frame, self.facing)
+        if index != self.texture_index:
+            self.texture_index = index
+            self.texture = self.animations.textures[index]
+
     def pymunk_moved(
         self, physics_engine: PhysicsEngine, dx: float, dy: float, d_angle: float
     ) -> None:
@@ -173,20 +209,28 @@ class Entity(arcade.Sprite):
         # Add to the odometer how far we've moved
         self.x_odometer += dx
 
+        # Only advance the animation every few moves while off camera
+        left, bottom, right, top = physics_engine.game.view_region
+        if not (left <= self.center_x <= right and bottom <= self.center_y <= top):
+            self.offscreen_moves += 1
+            if self.offscreen_moves < OFFSCREEN_ANIMATION_INTERVAL:
+                return
+        self.offscreen_moves = 0
+
         # Idle animation
         if abs(dx) <= DEAD_ZONE:
-            self.texture = self.texture_dict["idle"][0][self.facing]
+            self.show_frame(IDLE)
             return
 
         # Jumping/falling animation
-        if not physics_engine.is_on_ground(self):
+        if not self.is_grounded:
             if dy > DEAD_ZONE:
                 # Jumping animation
-                self.texture = self.texture_dict["jump"][0][self.facing]
+                self.show_frame(JUMP)
                 return
             elif dy < -DEAD_ZONE:
                 # Falling animation
-                self.texture = self.texture_dict["fall"][0][self.facing]
+                self.show_frame(FALL)
                 return
 
         # Walking animation
@@ -196,9 +240,6 @@ class Entity(arcade.Sprite):
 
             # Advance the walking animation
             self.walk_texture_index += 1
-            if self.walk_texture_index > 7:
+            if self.walk_texture_index >= self.animations.frame_counts[WALK]:
                 self.walk_texture_index = 0
-            self.texture = self.texture_dict["walk"][self.walk_texture_index][
-                self.facing
-            ]
-            return
+            self.show_frame(WALK, self.walk_texture_index)
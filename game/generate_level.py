@@ -0,0 +1,340 @@
+"""
+Generates large procedural levels as Tiled maps for stress testing. The maps use the
+shipped tileset and the layers which Game.setup expects, so they load through
+levels.load_tilemap like the shipped levels, and the same seed always produces the
+same map.
+
+Run this from the game folder with
+``python generate_level.py "resources/levels/Level 11/map.json" --width 2000 --seed 1``.
+Levels numbered after the shipped ones can then be played with
+``python headless.py --level 11`` or Game.setup(11).
+"""
+from __future__ import annotations
+
+# Builtin
+import argparse
+import base64
+import json
+import os
+import pathlib
+import random
+import shutil
+import zlib
+from typing import Dict, NamedTuple
+
+# Pip
+import numpy as np
+
+# Custom
+from constants import (
+    GENERATOR_BAND_HEIGHT,
+    GENERATOR_PLATFORM_MAX,
+    GENERATOR_PLATFORM_MIN,
+    GENERATOR_SAFE_COLUMNS,
+)
+from levels import level_path
+
+# The layers which are written in the order Tiled assigns their ids
+LAYER_NAMES = (
+    "Platforms",
+    "Walls1",
+    "Coins",
+    "Enemies",
+    "Player",
+    "Walls2",
+    "Door",
+    "Boss",
+)
+
+# The smallest map which has room for the border, both blocker walls and the door
+MIN_WIDTH = 16
+MIN_HEIGHT = 8
+
+
+class LevelSpec(NamedTuple):
+    """
+    Represents the settings for a generated level.
+
+    width: int
+        The width of the map in tiles.
+    height: int
+        The height of the map in tiles.
+    density: float
+        The chance of a platform starting at each free column of a platform row.
+    enemies: int
+        How many enemies to place.
+    coins: int
+        How many coins to place.
+    seed: int
+        The seed for the random generator.
+    boss: bool
+        Whether to place a boss instead of the door like level 10.
+    """
+
+    width: int
+    height: int
+    density: float
+    enemies: int
+    coins: int
+    seed: int
+    boss: bool = False
+
+
+def load_tile_ids(tileset_path: pathlib.Path) -> Dict[str, int]:
+    """
+    Maps each tile's image name in a tileset to its global tile id.
+
+    Parameters
+    ----------
+    tileset_path: pathlib.Path
+        The path to the tileset. This is assumed to be the map's first tileset.
+
+    Returns
+    -------
+    Dict[str, int]
+        The global tile id for each image name, for example "coin".
+    """
+    tileset = json.loads(tileset_path.read_text(encoding="utf8"))
+    return {
+        pathlib.Path(tile["image"]).stem: tile["id"] + 1 for tile in tileset["tiles"]
+    }
+
+
+def generate_layers(spec: LevelSpec, tile_ids: Dict[str, int]) -> Dict[str, np.ndarray]:
+    """
+    Lays out a level. The map is enclosed by a floor border, the platforms are placed
+    in rows which are a jump apart and the blocker walls split the map into thirds with
+    the player on the left and the door or boss on the right.
+
+    Parameters
+    ----------
+    spec: LevelSpec
+        The settings for the level.
+    tile_ids: Dict[str, int]
+        The global tile id for each image name in the tileset.
+
+    Returns
+    -------
+    Dict[str, np.ndarray]
+        A grid of global tile ids for each layer indexed by row and column with the
+        first row at the top.
+
+    Raises
+    ------
+    ValueError
+        The map is too small or there isn't room for the entities.
+    """
+    width, height = spec.width, spec.height
+    if width < MIN_WIDTH or height < MIN_HEIGHT:
+        raise ValueError(f"Levels must be at least {MIN_WIDTH}x{MIN_HEIGHT} tiles")
+    rng = random.Random(spec.seed)
+    layers = {name: np.zeros((height, width), dtype=np.uint32) for name in LAYER_NAMES}
+    platforms = layers["Platforms"]
+    ground = height - 2
+
+    # Enclose the map and lay the ground
+    platforms[[0, 1, -1], :] = tile_ids["floor_bottom"]
+    platforms[:, [0, -1]] = tile_ids["floor_bottom"]
+    platforms[ground, 1:-1] = tile_ids["floor_top"]
+
+    # Scatter the platforms along rows which are a jump apart
+    for row in range(ground - GENERATOR_BAND_HEIGHT, 2, -GENERATOR_BAND_HEIGHT):
+        column = 2
+        while column < width - 2:
+            if rng.random() < spec.density:
+                length = rng.randint(GENERATOR_PLATFORM_MIN, GENERATOR_PLATFORM_MAX)
+                end = min(column + length, width - 2)
+                platforms[row, column:end] = tile_ids["box"]
+                column = end + 1
+            else:
+                column += 1
+
+    # Split the map with the blocker walls and keep their columns clear
+    for name, column in (("Walls1", width // 3), ("Walls2", width * 2 // 3)):
+        platforms[2:ground, column] = 0
+        layers[name][2:ground, column] = tile_ids["wall"]
+
+    # Place the player at the left and the door or boss at the right
+    platforms[ground - 2 : ground, 1:3] = 0
+    layers["Player"][ground - 1, 1] = tile_ids["player_idle"]
+    platforms[ground - 2 : ground, width - 4 : width - 1] = 0
+    if spec.boss:
+        layers["Boss"][ground - 1, width - 3] = tile_ids["boss_idle"]
+    else:
+        layers["Door"][ground - 2, width - 2] = tile_ids["door_top"]
+        layers["Door"][ground - 1, width - 2] = tile_ids["door_mid"]
+
+    # Find the free cells which have something to stand on
+    occupied = np.logical_or.reduce([layer != 0 for layer in layers.values()])
+    standing = np.zeros_like(occupied)
+    standing[:-1] = ~occupied[:-1] & (platforms[1:] != 0)
+    standing[:, : GENERATOR_SAFE_COLUMNS + 1] = False
+    standing[:, width - 4 :] = False
+    spawns = np.argwhere(standing)
+    if spec.enemies + spec.coins > len(spawns):
+        raise ValueError(
+            f"There is only room for {len(spawns)} enemies and coins in this level"
+        )
+
+    # Place the enemies and coins on different cells
+    picks = rng.sample(range(len(spawns)), spec.enemies + spec.coins)
+    for name, image, cells in (
+        ("Enemies", "enemy_idle", picks[: spec.enemies]),
+        ("Coins", "coin", picks[spec.enemies :]),
+    ):
+        if cells:
+            rows, columns = spawns[cells].T
+            layers[name][rows, columns] = tile_ids[image]
+    return layers
+
+
+def encode_layer(grid: np.ndarray) -> str:
+    """
+    Encodes a layer's grid the same way as the shipped maps.
+
+    Parameters
+    ----------
+    grid: np.ndarray
+        The global tile ids for the layer indexed by row and column.
+
+    Returns
+    -------
+    str
+        The zlib compressed and base64 encoded little endian tile ids.
+    """
+    return base64.b64encode(zlib.compress(grid.astype("<u4").tobytes())).decode("ascii")
+
+
+def build_map(
+    spec: LevelSpec, map_path: pathlib.Path, tileset_path: pathlib.Path
+) -> Dict:
+    """
+    Generates a level and builds its Tiled map.
+
+    Parameters
+    ----------
+    spec: LevelSpec
+        The settings for the level.
+    map_path: pathlib.Path
+        The path the map will be saved to. The tileset is referenced relative to it.
+    tileset_path: pathlib.Path
+        The path to the tileset to use.
+
+    Returns
+    -------
+    Dict
+        The Tiled map data.
+    """
+    tileset = json.loads(tileset_path.read_text(encoding="utf8"))
+    layers = generate_layers(spec, load_tile_ids(tileset_path))
+    source = os.path.relpath(tileset_path.resolve(), map_path.resolve().parent)
+    return {
+        "compressionlevel": -1,
+        "height": spec.height,
+        "infinite": False,
+        "layers": [
+            {
+                "compression": "zlib",
+                "data": encode_layer(layers[name]),
+                "encoding": "base64",
+                "height": spec.height,
+                "id": layer_id,
+                "name": name,
+                "opacity": 1,
+                "type": "tilelayer",
+                "visible": True,
+                "width": spec.width,
+                "x": 0,
+                "y": 0,
+            }
+            for layer_id, name in enumerate(LAYER_NAMES, 1)
+        ],
+        "nextlayerid": len(LAYER_NAMES) + 1,
+        "nextobjectid": 1,
+        "orientation": "orthogonal",
+        "renderorder": "right-down",
+        "tiledversion": tileset["tiledversion"],
+        "tileheight": tileset["tileheight"],
+        "tilesets": [{"firstgid": 1, "source": pathlib.Path(source).as_posix()}],
+        "tilewidth": tileset["tilewidth"],
+        "type": "map",
+        "version": tileset["version"],
+        "width": spec.width,
+    }
+
+
+def write_level(
+    spec: LevelSpec,
+    map_path: pathlib.Path,
+    tileset_path: pathlib.Path = level_path.joinpath("tileset.json"),
+) -> Dict[str, int]:
+    """
+    Generates a level and saves its Tiled map. Level 1's questions are copied next to
+    the map if it doesn't have any, so the folder can be played as a level.
+
+    Parameters
+    ----------
+    spec: LevelSpec
+        The settings for the level.
+    map_path: pathlib.Path
+        The path to save the map to.
+    tileset_path: pathlib.Path
+        The path to the tileset to use.
+
+    Returns
+    -------
+    Dict[str, int]
+        How many tiles each layer has.
+    """
+    tilemap = build_map(spec, map_path, tileset_path)
+    map_path.parent.mkdir(parents=True, exist_ok=True)
+    map_path.write_text(json.dumps(tilemap), encoding="utf8")
+    questions_path = map_path.parent.joinpath("questions.json")
+    if not questions_path.exists():
+        shutil.copyfile(
+            level_path.joinpath("Level 1").joinpath("questions.json"), questions_path
+        )
+    return {
+        layer["name"]: int(
+            np.count_nonzero(
+                np.frombuffer(zlib.decompress(base64.b64decode(layer["data"])), "<u4")
+            )
+        )
+        for layer in tilemap["layers"]
+    }
+
+
+def main() -> None:
+    """Generates a level from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", type=pathlib.Path, help="The map.json to write")
+    parser.add_argument("--width", type=int, default=500)
+    parser.add_argument("--height", type=int, default=40)
+    parser.add_argument("--density", type=float, default=0.15)
+    parser.add_argument("--enemies", type=int, default=200)
+    parser.add_argument("--coins", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--boss", action="store_true")
+    args = parser.parse_args()
+
+    # Generate the level
+    counts = write_level(
+        LevelSpec(
+            args.width,
+            args.height,
+            args.density,
+            args.enemies,
+            args.coins,
+            args.seed,
+            args.boss,
+        ),
+        args.path,
+    )
+    print(
+        f"Wrote {args.path} ({args.width}x{args.height} tiles):"
+        f" {', '.join(f'{count} {name}' for name, count in counts.items())}"
+    )
+
+
+if __name__ == "__main__":
+    main()
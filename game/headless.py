@@ -0,0 +1,287 @@
+"""
+Runs the game without a window or rendering at a fixed timestep as fast as the CPU
+allows.
+
+Run this from the game folder with ``python headless.py --level 1 --ticks 3600``.
+"""
+from __future__ import annotations
+
+# Builtin
+import argparse
+import json
+import pathlib
+import time
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional
+
+# Pip
+import arcade
+
+# Custom
+from constants import BLOCKER_WALL_HEALTH_LOSS, SIMULATION_TIMESTEP
+from entities.player import ScoreAmount
+from textures import load_textures, moving_textures
+from views.game import Game
+from window import Window
+
+# The default simulation timestep which matches the game's fixed step
+HEADLESS_TIMESTEP = SIMULATION_TIMESTEP
+
+# The keys which can be scripted
+SCRIPTED_KEYS = {
+    "A": arcade.key.A,
+    "D": arcade.key.D,
+    "SPACE": arcade.key.SPACE,
+    "E": arcade.key.E,
+}
+
+
+class HeadlessWindow:
+    """
+    Stands in for the window when running the game without rendering.
+
+    Parameters
+    ----------
+    width: int
+        The width of the simulated window.
+    height: int
+        The height of the simulated window.
+
+    Attributes
+    ----------
+    views: Dict[str, arcade.View]
+        Holds all the views used by the game.
+    current_view: Optional[arcade.View]
+        The currently shown view.
+    headless: bool
+        Whether the window runs without rendering. This is always True.
+    """
+
+    # Reuse the real window's helper so the database can format scores
+    seconds_to_string = staticmethod(Window.seconds_to_string)
+
+    def __init__(self, width: int = 800, height: int = 600) -> None:
+        self.width: int = width
+        self.height: int = height
+        self.views: Dict[str, arcade.View] = {}
+        self.current_view: Optional[arcade.View] = None
+        self.headless: bool = True
+
+    def __repr__(self) -> str:
+        return f"<HeadlessWindow (Width={self.width}) (Height={self.height})>"
+
+    def show_view(self, view: arcade.View) -> None:
+        """
+        Sets the current view.
+
+        Parameters
+        ----------
+        view: arcade.View
+            The view to show.
+        """
+        self.current_view = view
+
+
+class InputEvent(NamedTuple):
+    """
+    Represents a scripted input.
+
+    tick: int
+        The tick to apply the input on.
+    action: str
+        The input to apply. This is either "press", "release", "click", "answer" or
+        "wrong".
+    key: Optional[str]
+        The key name for "press" and "release" inputs.
+    """
+
+    tick: int
+    action: str
+    key: Optional[str] = None
+
+
+def load_script(path: pathlib.Path) -> List[InputEvent]:
+    """
+    Loads a JSON list of [tick, action, key] inputs.
+
+    Parameters
+    ----------
+    path: pathlib.Path
+        The path to the script.
+
+    Returns
+    -------
+    List[InputEvent]
+        The scripted inputs.
+    """
+    return [InputEvent(*event) for event in json.loads(path.read_text("utf8"))]
+
+
+def apply_input(game: Game, event: InputEvent) -> None:
+    """
+    Applies a scripted input to the game.
+
+    Parameters
+    ----------
+    game: Game
+        The game to apply the input to.
+    event: InputEvent
+        The input to apply.
+    """
+    if event.action == "press":
+        game.on_key_press(SCRIPTED_KEYS[event.key], 0)  # type: ignore
+    elif event.action == "release":
+        game.on_key_release(SCRIPTED_KEYS[event.key], 0)  # type: ignore
+    elif event.action == "click":
+        game.on_mouse_press(0, 0, arcade.MOUSE_BUTTON_LEFT, 0)
+    elif event.action == "answer":
+        # There is no question view, so answer the current question correctly
+        if game.current_question[0]:
+            assert game.player is not None
+            game.disable_blocker_wall()
+            game.player.update_score(ScoreAmount.QUESTION_CORRECT)
+    elif event.action == "wrong":
+        # Answer the current question incorrectly
+        if game.current_question[0]:
+            assert game.player is not None
+            game.player.update_score(ScoreAmount.QUESTION_WRONG)
+            game.player.health -= BLOCKER_WALL_HEALTH_LOSS
+    else:
+        raise ValueError(f"Unknown input action {event.action}")
+
+
+class HeadlessGame:
+    """
+    Runs a game level without a window at a fixed timestep.
+
+    Parameters
+    ----------
+    level: int
+        The level to run.
+    script: Optional[List[InputEvent]]
+        The scripted inputs to apply.
+    timestep: float
+        The simulated time in seconds for each tick.
+    seed: Optional[int]
+        The seed for the level's random generator. A random seed is used if this is
+        None.
+    streaming: bool
+        Whether to stream the level's chunks around the player.
+
+    Attributes
+    ----------
+    window: HeadlessWindow
+        The stand-in window.
+    game: Game
+        The game being simulated.
+    tick: int
+        How many ticks have been simulated.
+    """
+
+    def __init__(
+        self,
+        level: int,
+        script: Optional[List[InputEvent]] = None,
+        timestep: float = HEADLESS_TIMESTEP,
+        seed: Optional[int] = None,
+        streaming: bool = False,
+    ) -> None:
+        # Make sure the textures needed for the entities are loaded
+        if not moving_textures:
+            load_textures()
+        self.timestep: float = timestep
+        self.window: HeadlessWindow = HeadlessWindow()
+        self.game: Game = Game(self.window)
+        self.game.timestep = timestep
+        self.game.setup(level, seed, streaming)
+        self.window.views["Game"] = self.game
+        self.window.show_view(self.game)
+        self.script: Dict[int, List[InputEvent]] = defaultdict(list)
+        for event in script or []:
+            self.script[event.tick].append(event)
+        self.tick: int = 0
+
+    def __repr__(self) -> str:
+        return f"<HeadlessGame (Level={self.game.level_id}) (Tick={self.tick})>"
+
+    def step(self) -> None:
+        """Applies this tick's inputs and advances the game by one timestep."""
+        for event in self.script.get(self.tick, []):
+            apply_input(self.game, event)
+        self.game.on_update(self.timestep)
+        self.tick += 1
+
+    def run(self, ticks: int) -> int:
+        """
+        Advances the game until the tick limit is reached or the level finishes.
+
+        Parameters
+        ----------
+        ticks: int
+            The maximum amount of ticks to simulate.
+
+        Returns
+        -------
+        int
+            How many ticks were simulated.
+        """
+        start = self.tick
+        while self.tick - start < ticks and not self.game.level_finished:
+            self.step()
+        return self.tick - start
+
+
+def main() -> None:
+    """Runs a headless game from the command line and prints a summary."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--ticks", type=int, default=3600)
+    parser.add_argument("--timestep", type=float, default=HEADLESS_TIMESTEP)
+    parser.add_argument("--script", type=pathlib.Path)
+    parser.add_argument("--stream", action="store_true")
+    args = parser.parse_args()
+
+    # Run the simulation
+    start = time.perf_counter()
+    headless = HeadlessGame(
+        args.level,
+        load_script(args.script) if args.script else None,
+        args.timestep,
+        streaming=args.stream,
+    )
+    setup_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    ticks = headless.run(args.ticks)
+    elapsed = time.perf_counter() - start
+
+    # Print the summary
+    game = headless.game
+    assert game.player is not None
+    assert game.ai_scheduler is not None
+    assert game.physics_engine is not None
+    print(
+        json.dumps(
+            {
+                "level": args.level,
+                "ticks": ticks,
+                "setup_seconds": setup_elapsed,
+                "simulated_seconds": ticks * args.timestep,
+                "wall_seconds": elapsed,
+                "ticks_per_second": ticks / elapsed if elapsed else 0,
+                "score": game.player.score,
+                "health": game.player.health,
+                "finished": game.level_finished,
+                "won": game.level_won,
+                "ai_updates": game.ai_scheduler.total_updated,
+                "ai_deferred": game.ai_scheduler.total_deferred,
+                "active_bodies": game.physics_engine.active_bodies,
+                "static_tiles": game.physics_engine.static_tile_count,
+                "static_shapes": game.physics_engine.static_shape_count,
+                **(game.streamer.stats() if game.streamer is not None else {}),
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
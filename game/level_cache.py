@@ -0,0 +1,473 @@
+from __future__ import annotations
+
+# Builtin
+import base64
+import gzip
+import hashlib
+import json
+import mmap
+import pathlib
+import struct
+import zlib
+from typing import Dict, List, Optional, Tuple, Union
+
+# Pip
+import arcade
+import numpy as np
+
+# Custom
+from constants import SPRITE_SCALE
+
+# The compiled level format details
+CACHE_MAGIC = b"EGLC"
+CACHE_VERSION = 3
+CACHE_SUFFIX = ".cache"
+CACHE_ALIGNMENT = 8
+
+# Tiled stores the flip flags in the top three bits of each gid
+GID_MASK = 0x1FFFFFFF
+
+# The layers which are stored as lists of cells instead of being scanned from the grid
+POINT_LAYERS = ("Player", "Enemies", "Boss", "Walls1", "Walls2")
+
+
+def content_hash(map_path: pathlib.Path, tilesets: List[str]) -> str:
+    """
+    Hashes the raw bytes of a Tiled map and the tilesets it references. The tilesets
+    are passed in so checking a cache doesn't need to parse the map.
+
+    Parameters
+    ----------
+    map_path: pathlib.Path
+        The path to the Tiled map.
+    tilesets: List[str]
+        The paths of the map's external tilesets relative to its directory.
+
+    Returns
+    -------
+    str
+        The hex digest of the map and tileset contents.
+    """
+    digest = hashlib.sha256()
+    digest.update(map_path.read_bytes())
+    for tileset in tilesets:
+        digest.update(map_path.parent.joinpath(tileset).read_bytes())
+    return digest.hexdigest()
+
+
+def decode_layer(layer: Dict) -> np.ndarray:
+    """
+    Decodes a Tiled tile layer into a grid of gids.
+
+    Parameters
+    ----------
+    layer: Dict
+        The Tiled JSON tile layer.
+
+    Returns
+    -------
+    np.ndarray
+        An array of shape (height, width) containing the gid for each cell with the
+        flip flags removed.
+    """
+    data: Union[str, List[int]] = layer["data"]
+    if isinstance(data, str):
+        raw = base64.b64decode(data)
+        compression = layer.get("compression", "")
+        if compression == "zlib":
+            raw = zlib.decompress(raw)
+        elif compression == "gzip":
+            raw = gzip.decompress(raw)
+        gids = np.frombuffer(raw, dtype="<u4")
+    else:
+        gids = np.array(data, dtype="<u4")
+    return (gids & GID_MASK).reshape(layer["height"], layer["width"])
+
+
+def load_tileset_images(map_path: pathlib.Path, map_data: Dict) -> Dict[int, str]:
+    """
+    Maps each gid used by a Tiled map to its image path.
+
+    Parameters
+    ----------
+    map_path: pathlib.Path
+        The path to the Tiled map.
+    map_data: Dict
+        The parsed Tiled map.
+
+    Returns
+    -------
+    Dict[int, str]
+        The image path for each gid relative to the map's directory.
+    """
+    images = {}
+    for tileset_ref in map_data["tilesets"]:
+        if "source" in tileset_ref:
+            tileset_path = map_path.parent.joinpath(tileset_ref["source"])
+            tileset = json.loads(tileset_path.read_text(encoding="utf8"))
+            tileset_dir = pathlib.Path(tileset_ref["source"]).parent
+        else:
+            tileset, tileset_dir = tileset_ref, pathlib.Path()
+        for tile in tileset.get("tiles", []):
+            images[tileset_ref["firstgid"] + tile["id"]] = tileset_dir.joinpath(
+                tile["image"]
+            ).as_posix()
+    return images
+
+
+def compile_level(map_path: pathlib.Path) -> pathlib.Path:
+    """
+    Compiles a Tiled map into the binary level format. The compiled file is stored
+    next to the map and is keyed by a hash of the map and its tilesets.
+
+    Parameters
+    ----------
+    map_path: pathlib.Path
+        The path to the Tiled map.
+
+    Returns
+    -------
+    pathlib.Path
+        The path to the compiled level.
+    """
+    map_data = json.loads(map_path.read_text(encoding="utf8"))
+
+    # Pack each tile layer's grid and the cells for the spawn and blocker layers
+    blobs: List[bytes] = []
+    offset = 0
+    layers, points = [], {}
+    for layer in map_data["layers"]:
+        if layer["type"] != "tilelayer":
+            continue
+        grid = decode_layer(layer).astype("<u4")
+        layers.append({"name": layer["name"], "offset": offset})
+        blobs.append(grid.tobytes())
+        offset += grid.nbytes
+        if layer["name"] in POINT_LAYERS:
+            rows, columns = np.nonzero(grid)
+            cells = np.stack([columns, rows], axis=1).astype("<u2")
+            points[layer["name"]] = {"offset": offset, "count": len(cells)}
+            blobs.append(cells.tobytes())
+            offset += cells.nbytes
+
+    # Write the header followed by the aligned data
+    tilesets = [
+        tileset["source"] for tileset in map_data["tilesets"] if "source" in tileset
+    ]
+    header = json.dumps(
+        {
+            "version": CACHE_VERSION,
+            "hash": content_hash(map_path, tilesets),
+            "tilesets": tilesets,
+            "width": map_data["width"],
+            "height": map_data["height"],
+            "tile_width": map_data["tilewidth"],
+            "tile_height": map_data["tileheight"],
+            "images": load_tileset_images(map_path, map_data),
+            "layers": layers,
+            "points": points,
+        }
+    ).encode("utf8")
+    prefix = CACHE_MAGIC + struct.pack("<I", len(header)) + header
+    prefix += b"\0" * (-len(prefix) % CACHE_ALIGNMENT)
+    cache_path = map_path.with_suffix(CACHE_SUFFIX)
+    cache_path.write_bytes(prefix + b"".join(blobs))
+    return cache_path
+
+
+class CompiledTileMap:
+    """
+    A tilemap loaded from the binary level format. This exposes the same attributes
+    as an arcade.TileMap which the game uses.
+
+    Parameters
+    ----------
+    map_path: pathlib.Path
+        The path to the Tiled map the level was compiled from.
+    buffer: mmap.mmap
+        The memory-mapped compiled level.
+    header: Dict
+        The parsed header of the compiled level.
+    data_start: int
+        The offset of the packed arrays in the buffer.
+    options: Dict[str, Dict[str, Union[str, bool]]]
+        Specific options to use when creating each layer's sprite list.
+    streamed_layers: Tuple[str, ...]
+        The layers whose sprites are created a chunk at a time with chunk_sprites
+        instead of up front. Their sprite lists start empty.
+    lazy: bool
+        Whether to defer creating the sprite lists' OpenGL resources until they are
+        first drawn. This allows the tilemap to be loaded off the main thread.
+
+    Attributes
+    ----------
+    width: int
+        The width of the map in tiles.
+    height: int
+        The height of the map in tiles.
+    grids: Dict[str, np.ndarray]
+        The gid grid for each tile layer. These are views into the memory-mapped file.
+    points: Dict[str, np.ndarray]
+        The (column, row) cells for the spawn and blocker layers.
+    sprite_lists: Dict[str, arcade.SpriteList]
+        The sprite list for each tile layer.
+    """
+
+    def __init__(
+        self,
+        map_path: pathlib.Path,
+        buffer: mmap.mmap,
+        header: Dict,
+        data_start: int,
+        options: Dict[str, Dict[str, Union[str, bool]]],
+        streamed_layers: Tuple[str, ...] = (),
+        lazy: bool = False,
+    ) -> None:
+        self.buffer: mmap.mmap = buffer
+        self.width: int = header["width"]
+        self.height: int = header["height"]
+        self.tile_width: float = header["tile_width"] * SPRITE_SCALE
+        self.tile_height: float = header["tile_height"] * SPRITE_SCALE
+        self.images: Dict[int, pathlib.Path] = {
+            int(gid): map_path.parent.joinpath(image)
+            for gid, image in header["images"].items()
+        }
+        self.grids: Dict[str, np.ndarray] = {
+            layer["name"]: np.frombuffer(
+                buffer,
+                dtype="<u4",
+                count=self.width * self.height,
+                offset=data_start + layer["offset"],
+            ).reshape(self.height, self.width)
+            for layer in header["layers"]
+        }
+        self.points: Dict[str, np.ndarray] = {
+            name: np.frombuffer(
+                buffer,
+                dtype="<u2",
+                count=point["count"] * 2,
+                offset=data_start + point["offset"],
+            ).reshape(-1, 2)
+            for name, point in header["points"].items()
+        }
+        self.sprite_lists: Dict[str, arcade.SpriteList] = {
+            name: self._create_sprite_list(
+                name, options.get(name, {}), name not in streamed_layers, lazy
+            )
+            for name in self.grids
+        }
+
+    def __repr__(self) -> str:
+        return f"<CompiledTileMap (Width={self.width}) (Height={self.height})>"
+
+    def cells(self, name: str) -> List[Tuple[int, int]]:
+        """
+        Gets the occupied cells for a layer.
+
+        Parameters
+        ----------
+        name: str
+            The name of the layer.
+
+        Returns
+        -------
+        List[Tuple[int, int]]
+            The (column, row) of each occupied cell.
+        """
+        if name in self.points:
+            return [(int(column), int(row)) for column, row in self.points[name]]
+        rows, columns = np.nonzero(self.grids[name])
+        return list(zip(columns.tolist(), rows.tolist()))
+
+    def create_sprite(self, gid: int, column: int, row: int) -> arcade.Sprite:
+        """
+        Creates the sprite for a tile in the same position arcade's tilemap loader
+        would place it.
+
+        Parameters
+        ----------
+        gid: int
+            The gid of the tile.
+        column: int
+            The column of the tile.
+        row: int
+            The row of the tile counting from the top of the map.
+
+        Returns
+        -------
+        arcade.Sprite
+            The tile sprite.
+        """
+        sprite = arcade.Sprite(
+            str(self.images[gid]), SPRITE_SCALE, hit_box_algorithm="Simple"
+        )
+        sprite.center_x = column * self.tile_width + sprite.width / 2
+        sprite.center_y = (self.height - row - 1) * self.tile_height + sprite.height / 2
+        return sprite
+
+    def chunk_sprites(
+        self, name: str, column: int, row: int, size: int
+    ) -> List[arcade.Sprite]:
+        """
+        Decodes a square chunk of a layer and creates the sprites for its tiles.
+
+        Parameters
+        ----------
+        name: str
+            The name of the layer.
+        column: int
+            The column of the chunk.
+        row: int
+            The row of the chunk counting from the bottom of the map.
+        size: int
+            The width and height of the chunk in tiles.
+
+        Returns
+        -------
+        List[arcade.Sprite]
+            The sprite for each tile in the chunk.
+        """
+        # Chunk rows count up from the bottom while the grid's rows count down
+        top = max(self.height - (row + 1) * size, 0)
+        bottom = max(self.height - row * size, 0)
+        left = column * size
+        window = self.grids[name][top:bottom, left : left + size]
+        rows, columns = np.nonzero(window)
+        return [
+            self.create_sprite(int(window[y, x]), left + int(x), top + int(y))
+            for y, x in zip(rows, columns)
+        ]
+
+    def _create_sprite_list(
+        self,
+        name: str,
+        options: Dict[str, Union[str, bool]],
+        populate: bool = True,
+        lazy: bool = False,
+    ) -> arcade.SpriteList:
+        """
+        Creates the sprite list for a layer.
+
+        Parameters
+        ----------
+        name: str
+            The name of the layer.
+        options: Dict[str, Union[str, bool]]
+            Specific options to use when creating the sprite list.
+        populate: bool
+            Whether to create the layer's sprites or leave the sprite list empty.
+        lazy: bool
+            Whether to defer creating the sprite list's OpenGL resources until it is
+            first drawn.
+
+        Returns
+        -------
+        arcade.SpriteList
+            The sprite list containing a sprite for each tile in the layer.
+        """
+        sprite_list = arcade.SpriteList(
+            use_spatial_hash=bool(options.get("use_spatial_hash", False)), lazy=lazy
+        )
+        if not populate:
+            return sprite_list
+        grid = self.grids[name]
+        for column, row in self.cells(name):
+            sprite_list.append(self.create_sprite(int(grid[row, column]), column, row))
+        return sprite_list
+
+
+def open_cache(map_path: pathlib.Path) -> Optional[Tuple[mmap.mmap, Dict, int]]:
+    """
+    Memory-maps the compiled version of a Tiled map if it exists and is up to date.
+
+    Parameters
+    ----------
+    map_path: pathlib.Path
+        The path to the Tiled map.
+
+    Returns
+    -------
+    Optional[Tuple[mmap.mmap, Dict, int]]
+        The memory-mapped file, its parsed header and the offset of the packed arrays
+        or None if the cache is missing, stale or corrupt.
+    """
+    cache_path = map_path.with_suffix(CACHE_SUFFIX)
+    try:
+        with open(cache_path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    # Check the header is valid and matches the current map
+    try:
+        if buffer[:4] != CACHE_MAGIC:
+            raise ValueError("The compiled level has the wrong magic number")
+        (header_length,) = struct.unpack_from("<I", buffer, 4)
+        header = json.loads(buffer[8 : 8 + header_length])
+        if header["version"] != CACHE_VERSION or header["hash"] != content_hash(
+            map_path, header["tilesets"]
+        ):
+            raise ValueError("The compiled level is stale")
+        data_start = 8 + header_length
+        data_start += -data_start % CACHE_ALIGNMENT
+
+        # Check the packed arrays all fit in the file
+        grid_size = header["width"] * header["height"] * 4
+        ends = [layer["offset"] + grid_size for layer in header["layers"]]
+        ends += [
+            point["offset"] + point["count"] * 4 for point in header["points"].values()
+        ]
+        if data_start + max(ends, default=0) > len(buffer):
+            raise ValueError("The compiled level is truncated")
+    except (OSError, struct.error, ValueError, KeyError, TypeError):
+        buffer.close()
+        return None
+    return buffer, header, data_start
+
+
+def ensure_compiled(map_path: pathlib.Path) -> None:
+    """
+    Compiles a Tiled map if its compiled version is missing or stale.
+
+    Parameters
+    ----------
+    map_path: pathlib.Path
+        The path to the Tiled map.
+    """
+    cache = open_cache(map_path)
+    if cache is None:
+        compile_level(map_path)
+    else:
+        cache[0].close()
+
+
+def load_compiled_tilemap(
+    map_path: pathlib.Path,
+    options: Dict[str, Dict[str, Union[str, bool]]],
+    streamed_layers: Tuple[str, ...] = (),
+    lazy: bool = False,
+) -> Optional[CompiledTileMap]:
+    """
+    Loads the compiled version of a Tiled map if it exists and is up to date.
+
+    Parameters
+    ----------
+    map_path: pathlib.Path
+        The path to the Tiled map.
+    options: Dict[str, Dict[str, Union[str, bool]]]
+        Specific options to use when creating each layer's sprite list.
+    streamed_layers: Tuple[str, ...]
+        The layers whose sprites are created a chunk at a time instead of up front.
+    lazy: bool
+        Whether to defer creating the sprite lists' OpenGL resources until they are
+        first drawn.
+
+    Returns
+    -------
+    Optional[CompiledTileMap]
+        The compiled tilemap or None if the cache is missing, stale or corrupt.
+    """
+    cache = open_cache(map_path)
+    if cache is None:
+        return None
+    return CompiledTileMap(map_path, *cache, options, streamed_layers, lazy)
@@ -2,21 +2,40 @@ from __future__ import annotations
 
 # Builtin
 import json
+import logging
 import pathlib
-from typing import Dict, List, NamedTuple, Union
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, List, NamedTuple, Optional, Union
 
 # Pip
 import arcade
 
 # Custom
-from constants import LEVEL_COUNT, SPRITE_SCALE
+from colliders import ColliderPolygon, merge_tiles
+from constants import LEVEL_CACHE_SIZE, LEVEL_COUNT, LEVEL_MEMORY_BUDGET, SPRITE_SCALE
+from level_cache import (
+    CompiledTileMap,
+    compile_level,
+    ensure_compiled,
+    load_compiled_tilemap,
+)
+
+# Get the logger for this module
+logger = logging.getLogger(__name__)
 
 
 def load_tilemap(
-    path: pathlib.Path, options: Dict[str, Dict[str, Union[str, bool]]]
-) -> arcade.TileMap:
+    path: pathlib.Path,
+    options: Dict[str, Dict[str, Union[str, bool]]],
+    lazy: bool = False,
+) -> Union[arcade.TileMap, CompiledTileMap]:
     """
-    Initialises a tilemap.
+    Initialises a tilemap. The compiled level cache is used if it is up to date,
+    otherwise the Tiled JSON is loaded and the cache is regenerated for next time.
 
     Parameters
     ----------
@@ -24,22 +43,50 @@ def load_tilemap(
         The tilemap path.
     options: Dict[str, Dict[str, Union[str, bool]]]
         Specific options to use when loading the tilemap.
+    lazy: bool
+        Whether to defer creating the sprite lists' OpenGL resources until they are
+        first drawn, so the tilemap can be loaded off the main thread. Only the
+        compiled level cache supports this, so it is always regenerated first.
+
+    Raises
+    ------
+    OSError
+        The tilemap is loaded lazily and the compiled level cache can't be written.
     """
-    return arcade.load_tilemap(str(path), SPRITE_SCALE, options)
+    compiled = load_compiled_tilemap(path, options, lazy=lazy)
+    if compiled is not None:
+        return compiled
+    if lazy:
+        # Arcade's loader needs the OpenGL context so always use the compiled level
+        compile_level(path)
+        compiled = load_compiled_tilemap(path, options, lazy=True)
+        if compiled is None:
+            raise OSError(f"The compiled cache for {path} could not be loaded")
+        return compiled
+    tilemap = arcade.load_tilemap(str(path), SPRITE_SCALE, options)
+    try:
+        compile_level(path)
+    except OSError:
+        # The resources folder may be read-only, so just use the JSON next time too
+        pass
+    return tilemap
 
 
 class GameLevel(NamedTuple):
     """
     Represents a level in the game.
 
-    tilemap: arcade.TileMap
+    tilemap: Union[arcade.TileMap, CompiledTileMap]
         The loaded tilemap for the level.
     questions: List[Dict[str, Union[List[str], str]]]
         A list of questions with their correct answer and an explanation.
+    colliders: Dict[str, List[ColliderPolygon]]
+        The merged static colliders for each layer in STATIC_LAYERS.
     """
 
-    tilemap: arcade.TileMap
+    tilemap: Union[arcade.TileMap, CompiledTileMap]
     questions: List[Dict[str, Union[List[str], str]]]
+    colliders: Dict[str, List[ColliderPolygon]]
 
 
 # Create the level path
@@ -63,19 +110,389 @@ layer_options: Dict[str, Dict[str, Union[str, bool]]] = {
     },
 }
 
-# Create the levels
-levels: Dict[int, GameLevel] = {
-    count
-    + 1: GameLevel(
-        load_tilemap(
-            level_path.joinpath(f"Level {count+1}").joinpath("map.json"), layer_options
-        ),
-        json.loads(
-            open(
-                level_path.joinpath(f"Level {count+1}").joinpath("questions.json"),
-                encoding="utf8",
-            ).read()
-        ),
+# The static layers whose tiles are merged into larger colliders when a level is loaded
+STATIC_LAYERS = ("Platforms", "Walls1", "Walls2")
+
+# The layers which are created a chunk at a time around the player when streaming
+STREAMED_LAYERS = ("Platforms", "Coins", "Enemies")
+
+
+def level_exists(level: int) -> bool:
+    """
+    Checks if a level has a map. This includes generated levels numbered after the
+    shipped ones.
+
+    Parameters
+    ----------
+    level: int
+        The level number to check.
+
+    Returns
+    -------
+    bool
+        Whether the level's map exists or not.
+    """
+    return (
+        level >= 1
+        and level_path.joinpath(f"Level {level}").joinpath("map.json").is_file()
     )
-    for count in range(LEVEL_COUNT)
-}
+
+
+def load_questions(level: int) -> List[Dict[str, Union[List[str], str]]]:
+    """
+    Loads a level's questions from disk.
+
+    Parameters
+    ----------
+    level: int
+        The level number to load the questions for.
+
+    Returns
+    -------
+    List[Dict[str, Union[List[str], str]]]
+        A list of questions with their correct answer and an explanation.
+    """
+    with open(
+        level_path.joinpath(f"Level {level}").joinpath("questions.json"),
+        encoding="utf8",
+    ) as file:
+        return json.load(file)
+
+
+def load_level(
+    level: int,
+    questions: Optional[List[Dict[str, Union[List[str], str]]]] = None,
+    lazy: bool = False,
+) -> GameLevel:
+    """
+    Loads a level's tilemap and questions from disk and merges its static tiles into
+    colliders.
+
+    Parameters
+    ----------
+    level: int
+        The level number to load.
+    questions: Optional[List[Dict[str, Union[List[str], str]]]]
+        The level's questions if they have already been loaded.
+    lazy: bool
+        Whether to defer creating the sprite lists' OpenGL resources until they are
+        first drawn, so the level can be loaded off the main thread.
+
+    Returns
+    -------
+    GameLevel
+        The loaded level.
+    """
+    tilemap = load_tilemap(
+        level_path.joinpath(f"Level {level}").joinpath("map.json"), layer_options, lazy
+    )
+    return GameLevel(
+        tilemap,
+        questions if questions is not None else load_questions(level),
+        {name: merge_tiles(tilemap.sprite_lists[name]) for name in STATIC_LAYERS},
+    )
+
+
+def load_streamed_level(level: int) -> GameLevel:
+    """
+    Loads a level whose streamed layers are created a chunk at a time as the player
+    moves, so its setup time and memory don't grow with the size of the map. The
+    chunks are decoded from the compiled level cache, which is built first if needed.
+    Only the static layers which aren't streamed are merged up front.
+
+    Parameters
+    ----------
+    level: int
+        The level number to load.
+
+    Returns
+    -------
+    GameLevel
+        The loaded level. Its streamed layers' sprite lists are empty.
+    """
+    path = level_path.joinpath(f"Level {level}").joinpath("map.json")
+    ensure_compiled(path)
+    tilemap = load_compiled_tilemap(path, layer_options, STREAMED_LAYERS)
+    if tilemap is None:
+        raise ValueError(f"Level {level} has no compiled cache to stream from")
+    return GameLevel(
+        tilemap,
+        load_questions(level),
+        {
+            name: merge_tiles(tilemap.sprite_lists[name])
+            for name in STATIC_LAYERS
+            if name not in STREAMED_LAYERS
+        },
+    )
+
+
+def object_size(value: object) -> int:
+    """
+    Measures the memory used by an object and everything inside it if it is a plain
+    container.
+
+    Parameters
+    ----------
+    value: object
+        The object to measure.
+
+    Returns
+    -------
+    int
+        The size of the object in bytes.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(object_size(key) + object_size(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(object_size(item) for item in value)
+    return size
+
+
+def measure_level_size(level: GameLevel) -> int:
+    """
+    Measures how much memory a loaded level uses. This counts every sprite and its
+    attributes, the pixels of each texture the sprites use, the compiled level data,
+    the colliders and the questions.
+
+    Parameters
+    ----------
+    level: GameLevel
+        The level to measure.
+
+    Returns
+    -------
+    int
+        The size of the level in bytes.
+    """
+    size = object_size(level.questions) + object_size(level.colliders)
+    buffer = getattr(level.tilemap, "buffer", None)
+    if buffer is not None:
+        size += len(buffer)
+    textures: Dict[int, arcade.Texture] = {}
+    for sprite_list in level.tilemap.sprite_lists.values():
+        for sprite in sprite_list:
+            size += sys.getsizeof(sprite) + object_size(vars(sprite))
+            for texture in sprite.textures or [sprite.texture]:
+                if texture is not None:
+                    textures[id(texture)] = texture
+
+    # Textures are shared between sprites so only count each one once
+    for texture in textures.values():
+        size += len(texture.image.getbands()) * texture.width * texture.height
+    return size
+
+
+class LevelRegistry:
+    """
+    Lazily loads levels when they are first requested and keeps the most recently used
+    ones in memory. Levels are evicted once there are more than max_levels loaded or
+    their measured size goes over the memory budget. Prefetched levels are loaded on
+    a background thread with lazy sprite lists, so their OpenGL resources are only
+    created once they are drawn on the main thread.
+
+    Parameters
+    ----------
+    max_levels: int
+        The maximum amount of levels which can be loaded at once.
+    memory_budget: int
+        The maximum memory in bytes which the loaded levels can use.
+
+    Attributes
+    ----------
+    cache: OrderedDict[int, GameLevel]
+        The loaded levels ordered from least to most recently used.
+    sizes: Dict[int, int]
+        The measured size in bytes of each loaded level.
+    pending: Dict[int, Future]
+        The levels which are currently being prefetched.
+    questions: Dict[int, List[Dict[str, Union[List[str], str]]]]
+        The questions for each level which has been prepared.
+    loads: int
+        How many times a level has been loaded from disk.
+    hits: int
+        How many times a requested level was already loaded or being prefetched.
+    evictions: int
+        How many times a level has been evicted.
+    """
+
+    def __init__(
+        self,
+        max_levels: int = LEVEL_CACHE_SIZE,
+        memory_budget: int = LEVEL_MEMORY_BUDGET,
+    ) -> None:
+        self.max_levels: int = max_levels
+        self.memory_budget: int = memory_budget
+        self.cache: OrderedDict[int, GameLevel] = OrderedDict()
+        self.sizes: Dict[int, int] = {}
+        self.pending: Dict[int, Future] = {}
+        self.questions: Dict[int, List[Dict[str, Union[List[str], str]]]] = {}
+        self.loads: int = 0
+        self.hits: int = 0
+        self.evictions: int = 0
+        self._lock: threading.Lock = threading.Lock()
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="LevelPrefetch"
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"<LevelRegistry (Loaded={list(self.cache)}) (Loads={self.loads})"
+            f" (Hits={self.hits}) (Evictions={self.evictions})>"
+        )
+
+    def __contains__(self, level: int) -> bool:
+        return level in self.cache
+
+    def __getitem__(self, level: int) -> GameLevel:
+        """
+        Gets a level, loading it if needed.
+
+        Parameters
+        ----------
+        level: int
+            The level number to get. This can be a generated level after the shipped
+            ones.
+
+        Returns
+        -------
+        GameLevel
+            The requested level.
+
+        Raises
+        ------
+        KeyError
+            The level doesn't have a map.
+        """
+        if level not in self.cache and not level_exists(level):
+            raise KeyError(level)
+
+        # Check if the level is already loaded
+        with self._lock:
+            if level in self.cache:
+                self.hits += 1
+                self.cache.move_to_end(level)
+                return self.cache[level]
+            future = self.pending.get(level)
+
+        # Wait for the prefetch to finish or load the level now
+        if future is not None:
+            try:
+                game_level = future.result()
+            except Exception:
+                # The prefetch failed (e.g. the level couldn't be compiled) so it is
+                # forgotten and the level is loaded on this thread instead
+                logger.warning("Prefetching level %d failed", level, exc_info=True)
+                with self._lock:
+                    if self.pending.get(level) is future:
+                        del self.pending[level]
+                return self._load(level)
+            with self._lock:
+                self.hits += 1
+            return game_level
+        return self._load(level)
+
+    def _load(self, level: int, lazy: bool = False) -> GameLevel:
+        """
+        Loads a level from disk and stores it, evicting other levels if needed.
+
+        Parameters
+        ----------
+        level: int
+            The level number to load.
+        lazy: bool
+            Whether to defer creating the sprite lists' OpenGL resources until they
+            are first drawn. This must be set when loading off the main thread.
+
+        Returns
+        -------
+        GameLevel
+            The loaded level.
+        """
+        game_level = load_level(level, self.questions.get(level), lazy)
+        size = measure_level_size(game_level)
+        with self._lock:
+            self.loads += 1
+            self.cache[level] = game_level
+            self.sizes[level] = size
+            self.pending.pop(level, None)
+
+            # Evict the least recently used levels (but never the new one)
+            while len(self.cache) > 1 and (
+                len(self.cache) > self.max_levels
+                or sum(self.sizes.values()) > self.memory_budget
+            ):
+                evicted, _ = self.cache.popitem(last=False)
+                del self.sizes[evicted]
+                self.evictions += 1
+        return game_level
+
+    def prepare(self, level: int) -> None:
+        """
+        Parses a level's questions and makes sure its compiled cache is up to date, so
+        loading the level later only needs to create the sprites. This is safe to call
+        from any thread.
+
+        Parameters
+        ----------
+        level: int
+            The level number to prepare.
+        """
+        try:
+            ensure_compiled(level_path.joinpath(f"Level {level}").joinpath("map.json"))
+        except OSError:
+            # The resources folder may be read-only, so the JSON will be used instead
+            pass
+        questions = load_questions(level)
+        with self._lock:
+            self.questions[level] = questions
+
+    def prefetch(self, level: int) -> None:
+        """
+        Starts loading a level in the background if it isn't loaded already.
+
+        Parameters
+        ----------
+        level: int
+            The level number to prefetch.
+        """
+        if not level_exists(level):
+            return
+        with self._lock:
+            if level in self.cache or level in self.pending:
+                return
+            self.pending[level] = self._executor.submit(self._load, level, True)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Gets the load, hit and eviction counters.
+
+        Returns
+        -------
+        Dict[str, int]
+            The registry statistics keyed by name.
+        """
+        with self._lock:
+            return {
+                "loaded": len(self.cache),
+                "size": sum(self.sizes.values()),
+                "loads": self.loads,
+                "hits": self.hits,
+                "evictions": self.evictions,
+            }
+
+
+def level_tasks() -> List[Callable[[], None]]:
+    """
+    Creates a task for each level which prepares it.
+
+    Returns
+    -------
+    List[Callable[[], None]]
+        The tasks which can be run on any thread.
+    """
+    return [partial(levels.prepare, count + 1) for count in range(LEVEL_COUNT)]
+
+
+# Create the level registry
+levels: LevelRegistry = LevelRegistry()
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+# Builtin
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+# Get the logger for this module
+logger = logging.getLogger(__name__)
+
+
+class AssetLoader:
+    """
+    Runs the asset decoding tasks on a thread pool and records how long each asset
+    class took.
+
+    Parameters
+    ----------
+    tasks: Dict[str, List[Callable[[], None]]]
+        The tasks to run for each asset class.
+    max_workers: Optional[int]
+        The maximum amount of threads to use. None lets the executor decide.
+
+    Attributes
+    ----------
+    total: int
+        How many tasks there are.
+    completed: int
+        How many tasks have finished.
+    started: Dict[str, float]
+        When the first task for each asset class started.
+    finished: Dict[str, float]
+        When the last task for each asset class finished.
+    timings: Dict[str, float]
+        The wall time in seconds for each asset class including the GPU upload. This is
+        filled in by finish().
+    """
+
+    def __init__(
+        self,
+        tasks: Dict[str, List[Callable[[], None]]],
+        max_workers: Optional[int] = None,
+    ) -> None:
+        self.tasks: Dict[str, List[Callable[[], None]]] = tasks
+        self.total: int = sum(len(class_tasks) for class_tasks in tasks.values())
+        self.completed: int = 0
+        self.started: Dict[str, float] = {}
+        self.finished: Dict[str, float] = {}
+        self.timings: Dict[str, float] = {}
+        self.futures: List[Future] = []
+        self._lock: threading.Lock = threading.Lock()
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="AssetLoader"
+        )
+
+    def __repr__(self) -> str:
+        return f"<AssetLoader (Completed={self.completed}/{self.total})>"
+
+    @property
+    def progress(self) -> float:
+        """Returns the fraction of tasks which have finished."""
+        return self.completed / self.total if self.total else 1
+
+    @property
+    def done(self) -> bool:
+        """Returns whether every task has finished or not."""
+        return self.completed >= self.total
+
+    def _run(self, asset_class: str, task: Callable[[], None]) -> None:
+        """
+        Runs a task and records when it started and finished.
+
+        Parameters
+        ----------
+        asset_class: str
+            The asset class which the task belongs to.
+        task: Callable[[], None]
+            The task to run.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            self.started[asset_class] = min(self.started.get(asset_class, start), start)
+        try:
+            task()
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.finished[asset_class] = max(
+                    self.finished.get(asset_class, end), end
+                )
+                self.completed += 1
+
+    def start(self) -> None:
+        """Submits every task to the thread pool."""
+        for asset_class, class_tasks in self.tasks.items():
+            for task in class_tasks:
+                self.futures.append(self._executor.submit(self._run, asset_class, task))
+
+    def finish(self, upload: Callable[[], None]) -> Dict[str, float]:
+        """
+        Waits for every task, then runs the GPU upload on the calling thread. This must
+        be called from the main thread.
+
+        Parameters
+        ----------
+        upload: Callable[[], None]
+            The function which uploads the decoded assets to the GPU.
+
+        Returns
+        -------
+        Dict[str, float]
+            The wall time in seconds for each asset class.
+        """
+        # Re-raise any errors which happened while loading
+        for future in self.futures:
+            future.result()
+        self._executor.shutdown()
+
+        # Upload the assets
+        start = time.perf_counter()
+        upload()
+        self.timings = {
+            asset_class: self.finished[asset_class] - self.started[asset_class]
+            for asset_class in self.started
+        }
+        self.timings["upload"] = time.perf_counter() - start
+        for asset_class, duration in self.timings.items():
+            logger.info("Loaded %s in %.3f seconds", asset_class, duration)
+        return self.timings
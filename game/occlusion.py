@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+# Builtin
+import math
+from typing import Dict, Iterable, List, Tuple
+
+# Pip
+import arcade
+import numpy as np
+
+# Custom
+from constants import SPRITE_SIZE
+
+
+def sprite_to_cell(sprite: arcade.Sprite) -> Tuple[int, int]:
+    """
+    Converts a tile sprite's position into its tilemap grid cell.
+
+    Parameters
+    ----------
+    sprite: arcade.Sprite
+        The tile sprite to convert.
+
+    Returns
+    -------
+    Tuple[int, int]
+        The column and row of the cell which the sprite occupies.
+    """
+    return int(sprite.center_x // SPRITE_SIZE), int(sprite.center_y // SPRITE_SIZE)
+
+
+class OccluderIndex:
+    """
+    A persistent grid of the tiles which block an entity's vision. This is built once
+    per level and replaces rebuilding a spatial hashed sprite list every frame.
+
+    Parameters
+    ----------
+    wall_list: arcade.SpriteList
+        The sprite list for the wall sprites.
+    blocker_list: List[arcade.SpriteList]
+        A list containing sprite lists for each blocker wall.
+    size: Tuple[int, int]
+        The columns and rows to allocate the grid with. The grid still grows if a
+        tile is added outside it.
+
+    Attributes
+    ----------
+    cells: Dict[Tuple[int, int], int]
+        Maps each occupied grid cell to the number of tiles occupying it.
+    blocker_cells: Dict[arcade.SpriteList, List[Tuple[int, int]]]
+        Maps each blocker wall to the grid cells it occupies so it can be removed later.
+    grid: np.ndarray
+        A boolean array indexed by column and row which mirrors the occupied cells so
+        many lines of sight can be checked at once.
+    """
+
+    def __init__(
+        self,
+        wall_list: arcade.SpriteList,
+        blocker_list: List[arcade.SpriteList],
+        size: Tuple[int, int] = (0, 0),
+    ) -> None:
+        self.cells: Dict[Tuple[int, int], int] = {}
+        self.blocker_cells: Dict[arcade.SpriteList, List[Tuple[int, int]]] = {}
+        self.grid: np.ndarray = np.zeros(size, dtype=bool)
+        self._add_cells(sprite_to_cell(sprite) for sprite in wall_list)
+        for blocker in blocker_list:
+            self.add_blocker(blocker)
+
+    def __repr__(self) -> str:
+        return (
+            f"<OccluderIndex (Cell count={len(self.cells)}) (Blocker"
+            f" count={len(self.blocker_cells)})>"
+        )
+
+    def _add_cells(self, cells: Iterable[Tuple[int, int]]) -> None:
+        """
+        Marks a group of grid cells as occupied.
+
+        Parameters
+        ----------
+        cells: Iterable[Tuple[int, int]]
+            The grid cells to mark as occupied.
+        """
+        for cell in cells:
+            self.cells[cell] = self.cells.get(cell, 0) + 1
+
+            # Grow the grid if the cell is outside it
+            column, row = cell
+            if column >= self.grid.shape[0] or row >= self.grid.shape[1]:
+                self.grid = np.pad(
+                    self.grid,
+                    (
+                        (0, max(column + 1 - self.grid.shape[0], 0)),
+                        (0, max(row + 1 - self.grid.shape[1], 0)),
+                    ),
+                )
+            self.grid[column, row] = True
+
+    def add_blocker(self, blocker: arcade.SpriteList) -> None:
+        """
+        Adds a blocker wall to the index.
+
+        Parameters
+        ----------
+        blocker: arcade.SpriteList
+            The sprite list containing the blocker wall sprites.
+        """
+        cells = [sprite_to_cell(sprite) for sprite in blocker]
+        self.blocker_cells[blocker] = cells
+        self._add_cells(cells)
+
+    def remove_blocker(self, blocker: arcade.SpriteList) -> None:
+        """
+        Removes a blocker wall from the index so entities can see through it.
+
+        Parameters
+        ----------
+        blocker: arcade.SpriteList
+            The sprite list containing the blocker wall sprites.
+        """
+        for cell in self.blocker_cells.pop(blocker, []):
+            count = self.cells[cell] - 1
+            if count:
+                self.cells[cell] = count
+            else:
+                del self.cells[cell]
+                self.grid[cell] = False
+
+    def is_blocked(self, x: float, y: float) -> bool:
+        """
+        Checks if a point is inside an occluding tile.
+
+        Parameters
+        ----------
+        x: float
+            The x position of the point.
+        y: float
+            The y position of the point.
+
+        Returns
+        -------
+        bool
+            Whether the point is inside an occluding tile or not.
+        """
+        return (int(x // SPRITE_SIZE), int(y // SPRITE_SIZE)) in self.cells
+
+    def has_line_of_sight(
+        self,
+        origin: Tuple[float, float],
+        target: Tuple[float, float],
+        max_distance: float = -1,
+    ) -> bool:
+        """
+        Checks if there are no occluding tiles between two points. This is the same
+        check as has_line_of_sight_batch with a single origin.
+
+        Parameters
+        ----------
+        origin: Tuple[float, float]
+            The point to look from.
+        target: Tuple[float, float]
+            The point to look at.
+        max_distance: float
+            The maximum distance which can be seen. -1 means there is no limit.
+
+        Returns
+        -------
+        bool
+            Whether the target can be seen from the origin or not.
+        """
+        if max_distance == -1:
+            max_distance = math.hypot(target[0] - origin[0], target[1] - origin[1])
+        return bool(
+            self.has_line_of_sight_batch(
+                np.array([origin], dtype=float), target, max_distance
+            )[0]
+        )
+
+    def has_line_of_sight_batch(
+        self,
+        origins: np.ndarray,
+        target: Tuple[float, float],
+        max_distance: float,
+        check_resolution: float = SPRITE_SIZE / 8,
+    ) -> np.ndarray:
+        """
+        Checks if there are no occluding tiles between many points and a single target
+        in one vectorised pass. Each line is sampled every check_resolution pixels and
+        the samples are looked up in the occupancy grid.
+
+        Parameters
+        ----------
+        origins: np.ndarray
+            An array of shape (N, 2) containing the points to look from.
+        target: Tuple[float, float]
+            The point to look at.
+        max_distance: float
+            The maximum distance which can be seen.
+        check_resolution: float
+            The distance in pixels between each sample along a line.
+
+        Returns
+        -------
+        np.ndarray
+            A boolean array of shape (N,) containing whether each origin can see the
+            target or not.
+        """
+        # Only lines within range need to be sampled
+        offsets = np.asarray(target, dtype=float) - origins
+        result = np.hypot(offsets[:, 0], offsets[:, 1]) <= max_distance
+        if not result.any():
+            return result
+
+        # Sample every line at the same fractions of its length
+        sample_count = int(max_distance // check_resolution) + 2
+        fractions = np.linspace(0, 1, sample_count)
+        samples = (
+            origins[result, None, :]
+            + fractions[None, :, None] * offsets[result, None, :]
+        )
+        cells = (samples // SPRITE_SIZE).astype(int)
+
+        # Look up the samples which fall inside the grid
+        columns, rows = cells[..., 0], cells[..., 1]
+        inside = (
+            (columns >= 0)
+            & (rows >= 0)
+            & (columns < self.grid.shape[0])
+            & (rows < self.grid.shape[1])
+        )
+        blocked = np.zeros(inside.shape, dtype=bool)
+        blocked[inside] = self.grid[columns[inside], rows[inside]]
+        result[result] = ~blocked.any(axis=1)
+        return result
@@ -1,21 +1,105 @@
 from __future__ import annotations
 
-# Custom
-from typing import TYPE_CHECKING, List, Optional, Tuple
+# Builtin
+import logging
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
 
 # Pip
 import arcade
 
 # Custom
-from constants import FRICTION, MASS
+from colliders import ColliderPolygon, StaticCollider, merge_tiles
+from constants import FRICTION, MASS, PHYSICS_SLEEP_TIME, PHYSICS_SUBSTEPS
 from entities.enemy import Enemy
 from entities.player import ScoreAmount
 
 if TYPE_CHECKING:
-    from entities.entity import Bullet
+    import pymunk
+    from entities.entity import Bullet, Entity
     from entities.player import Player
     from views.game import Game
 
+# Get the logger for this module
+logger = logging.getLogger(__name__)
+
+
+def ground_begin_handler(
+    entity: Entity, wall: arcade.Sprite, arbiter: pymunk.Arbiter, *_
+) -> bool:
+    """
+    Handles collision between an entity and a wall or blocker as they touch. If the
+    contact normal points down into the wall, the entity is standing on it and is marked
+    as grounded. This uses the begin_handler which processes collision when two shapes
+    are touching for the first time.
+
+    Parameters
+    ----------
+    entity: Entity
+        The entity sprite.
+    wall: arcade.Sprite
+        The wall or blocker collider that the entity has touched.
+    arbiter: pymunk.Arbiter
+        The arbiter for the collision.
+    """
+    # The entity may have been removed from the physics engine
+    if entity is not None and entity.physics_engines[0].is_ground_contact(arbiter):
+        entity.ground_contacts.add(arbiter.shapes[1])
+        entity.is_grounded = True
+    # Return True so pymunk will process the collision and stop the entity going
+    # through the wall
+    return True
+
+
+def ground_post_handler(
+    entity: Entity, wall: arcade.Sprite, arbiter: pymunk.Arbiter, *_
+) -> None:
+    """
+    Handles collision between an entity and a wall or blocker while they are touching.
+    The contact normal is checked again every step since a merged collider can be
+    touched on its side first and stood on later. This uses the post_handler which
+    processes collision after it has been solved each step.
+
+    Parameters
+    ----------
+    entity: Entity
+        The entity sprite.
+    wall: arcade.Sprite
+        The wall or blocker collider that the entity is touching.
+    arbiter: pymunk.Arbiter
+        The arbiter for the collision.
+    """
+    physics_engine = entity.physics_engines[0]
+    shape = physics_engine.sprites[wall].shape
+    if physics_engine.is_ground_contact(arbiter):
+        entity.ground_contacts.add(shape)
+    else:
+        entity.ground_contacts.discard(shape)
+    entity.is_grounded = bool(entity.ground_contacts)
+
+
+def ground_separate_handler(
+    entity: Entity, wall: arcade.Sprite, arbiter: pymunk.Arbiter, *_
+) -> bool:
+    """
+    Handles collision between an entity and a wall or blocker after they have
+    separated. The entity stops being grounded once it has left every wall it was
+    standing on. This uses the separate_handler which processes collision after two
+    shapes separate.
+
+    Parameters
+    ----------
+    entity: Entity
+        The entity sprite.
+    wall: arcade.Sprite
+        The wall or blocker collider that the entity has separated from.
+    arbiter: pymunk.Arbiter
+        The arbiter for the collision.
+    """
+    if entity is not None:
+        entity.ground_contacts.discard(arbiter.shapes[1])
+        entity.is_grounded = bool(entity.ground_contacts)
+    return True
+
 
 def player_coin_pickup_handler(player: Player, coin: arcade.Sprite, *_) -> bool:
     """
@@ -38,7 +122,9 @@ def player_coin_pickup_handler(player: Player, coin: arcade.Sprite, *_) -> bool:
     return False
 
 
-def player_blocker_begin_handler(player: Player, wall: arcade.Sprite, *_) -> bool:
+def player_blocker_begin_handler(
+    player: Player, wall: StaticCollider, arbiter: pymunk.Arbiter, *_
+) -> bool:
     """
     Handles collision between a player sprite and a blocker wall sprite as they touch.
     This uses the begin_handler which processes collision when two shapes are touching
@@ -48,13 +134,17 @@ def player_blocker_begin_handler(player: Player, wall: arcade.Sprite, *_) -> boo
     ----------
     player: Player
         The player sprite.
-    wall: arcade.Sprite
-        The wall sprite that the player has touched.
+    wall: StaticCollider
+        The blocker wall collider that the player has touched.
+    arbiter: pymunk.Arbiter
+        The arbiter for the collision.
     """
+    # Update the player's grounded state since this replaces the ground handler
+    ground_begin_handler(player, wall, arbiter)
     # Get the sprite list containing the wall sprites
-    blocker_list = wall.sprite_lists[0]
-    # Get the current view
-    game_view: Game = arcade.get_window().current_view  # noqa
+    blocker_list = wall.group
+    # Get the game which owns the physics engine
+    game_view: Game = player.physics_engines[0].game
     # Set the current_question attribute
     game_view.current_question = (True, blocker_list)
     # Return True so pymunk will process the collision and stop the player going through
@@ -62,7 +152,9 @@ def player_blocker_begin_handler(player: Player, wall: arcade.Sprite, *_) -> boo
     return True
 
 
-def player_blocker_separate_handler(player: Player, wall: arcade.Sprite, *_) -> bool:
+def player_blocker_separate_handler(
+    player: Player, wall: arcade.Sprite, arbiter: pymunk.Arbiter, *_
+) -> bool:
     """
     Handles collision between a player sprite and a blocker wall sprite after they have
     separated. This uses the separate_handler which processes collision after two shapes
@@ -74,9 +166,13 @@ def player_blocker_separate_handler(player: Player, wall: arcade.Sprite, *_) ->
         The player sprite.
     wall: arcade.Sprite
         The wall sprite that the player has separated from.
+    arbiter: pymunk.Arbiter
+        The arbiter for the collision.
     """
-    # Get the current view
-    game_view: Game = arcade.get_window().current_view  # noqa
+    # Update the player's grounded state since this replaces the ground handler
+    ground_separate_handler(player, wall, arbiter)
+    # Get the game which owns the physics engine
+    game_view: Game = player.physics_engines[0].game
     # Set the current_question attribute
     game_view.current_question = (False, None)
     # Return True so pymunk will process the collision and stop the player going through
@@ -100,8 +196,8 @@ def player_bullet_begin_handler(player: Player, bullet: Bullet, *_) -> bool:
     try:
         # Deal damage to the player
         player.deal_damage(bullet.owner.bullet_damage)
-        # Remove the bullet
-        bullet.remove_from_sprite_lists()
+        # Retire the bullet
+        bullet.manager.retire(bullet)
     except AttributeError:
         # An error randomly occurs when the player is moving fast enough
         pass
@@ -128,8 +224,8 @@ def enemy_bullet_begin_handler(enemy: Enemy, bullet: Bullet, *_) -> bool:
         if not isinstance(bullet.owner, Enemy):
             # Deal damage to the enemy
             enemy.deal_damage(bullet.owner.bullet_damage)
-            # Remove the bullet
-            bullet.remove_from_sprite_lists()
+            # Retire the bullet
+            bullet.manager.retire(bullet)
     except AttributeError:
         # An error randomly occurs when the player is moving fast enough
         pass
@@ -151,9 +247,9 @@ def bullet_wall_begin_handler(bullet: Bullet, wall: arcade.Sprite, *_) -> bool:
     wall: arcade.Sprite
         The wall sprite which the bullet hit
     """
-    # Remove the bullet
+    # Retire the bullet
     try:
-        bullet.remove_from_sprite_lists()
+        bullet.manager.retire(bullet)
     except AttributeError:
         # An error randomly occurs when a collision is detected between a bullet and a
         # wall
@@ -176,8 +272,8 @@ def player_door_begin_handler(player: Player, door: arcade.Sprite, *_) -> bool:
     door: arcade.Sprite
         The door sprite that the player has touched.
     """
-    # Get the current view
-    game_view: Game = arcade.get_window().current_view  # noqa
+    # Get the game which owns the physics engine
+    game_view: Game = player.physics_engines[0].game
     # Set the is_touching_door attribute
     game_view.is_touching_door = True
     # Return True so pymunk will process the collision and stop the player going through
@@ -198,8 +294,8 @@ def player_door_separate_handler(player: Player, door: arcade.Sprite, *_) -> boo
     door: arcade.Sprite
         The door sprite that the player has separated from.
     """
-    # Get the current view
-    game_view: Game = arcade.get_window().current_view  # noqa
+    # Get the game which owns the physics engine
+    game_view: Game = player.physics_engines[0].game
     # Reset the is_touching_door attribute
     game_view.is_touching_door = False
     # Return True so pymunk will process the collision and stop the player going through
@@ -219,12 +315,53 @@ class PhysicsEngine(arcade.PymunkPhysicsEngine):
     damping: float
         The amount of speed which is kept to the next tick. A value of 1.0 means no
         speed is lost, while 0.9 means 10% of speed is lost.
+    game: Game
+        The game which owns this physics engine. The collision handlers update its
+        state, so they work without a window.
+
+    Attributes
+    ----------
+    gravity_direction: pymunk.Vec2d
+        The unit vector in the direction of gravity.
+    parked_bullets: Dict[Bullet, arcade.PymunkPhysicsObject]
+        The physics objects for bullets which have been removed from the space but are
+        kept, so they can be reused without creating a new body and shape.
+    pending_forces: List[Tuple[arcade.Sprite, Tuple[float, float]]]
+        The forces which will be applied throughout the next fixed step.
+    shape_sprites: Dict[pymunk.Shape, arcade.Sprite]
+        Maps each shape to its sprite, so the collision handlers don't have to search
+        every sprite to find the ones touching.
+    sleepable: Set[arcade.Sprite]
+        The enemy sprites which are put to sleep when they are outside the activation
+        region.
+    static_groups: Dict[arcade.SpriteList, List[StaticCollider]]
+        Maps each static tile layer or blocker wall to the merged colliders which stand
+        in for its tiles.
+    static_tile_count: int
+        How many static tiles were added.
+    static_shape_count: int
+        How many static shapes the tiles were merged into.
     """
 
-    def __init__(self, gravity: Tuple[float, float], damping: float) -> None:
+    def __init__(
+        self, gravity: Tuple[float, float], damping: float, game: Game
+    ) -> None:
         super().__init__(gravity=gravity, damping=damping)
         self.gravity: Tuple[float, float] = gravity
+        self.gravity_direction: pymunk.Vec2d = self.space.gravity.normalized()
         self.damping: float = damping
+        self.game: Game = game
+        self.parked_bullets: Dict[Bullet, arcade.PymunkPhysicsObject] = {}
+        self.pending_forces: List[Tuple[arcade.Sprite, Tuple[float, float]]] = []
+        self.shape_sprites: Dict[pymunk.Shape, arcade.Sprite] = {}
+        self.sleepable: Set[arcade.Sprite] = set()
+        self.static_groups: Dict[arcade.SpriteList, List[StaticCollider]] = {}
+        self.static_tile_count: int = 0
+        self.static_shape_count: int = 0
+
+        # Enable sleeping, so bodies can be deactivated (this also lets bodies which
+        # have been resting for a while fall asleep on their own)
+        self.space.sleep_time_threshold = PHYSICS_SLEEP_TIME
 
     def setup(
         self,
@@ -235,6 +372,7 @@ class PhysicsEngine(arcade.PymunkPhysicsEngine):
         blocker_list: List[arcade.SpriteList],
         door_list: arcade.SpriteList,
         boss: Optional[arcade.Sprite],
+        colliders: Optional[Dict[arcade.SpriteList, List[ColliderPolygon]]] = None,
     ) -> None:
         """
         Setups up the various sprites needed for the physics engine to work properly.
@@ -255,7 +393,12 @@ class PhysicsEngine(arcade.PymunkPhysicsEngine):
             The sprite list for the door sprites.
         boss: Optional[arcade.Sprite]
             The boss sprite.
+        colliders: Optional[Dict[arcade.SpriteList, List[ColliderPolygon]]]
+            The merged colliders for the wall list and each blocker wall. Any which are
+            missing are merged now.
         """
+        colliders = colliders or {}
+
         # Add the player sprite to the physics engine
         self.add_sprite(
             player,
@@ -265,8 +408,8 @@ class PhysicsEngine(arcade.PymunkPhysicsEngine):
             collision_type="player",
         )
 
-        # Add the wall sprites to the physics engine
-        self.add_sprite_list(wall_list, body_type=self.STATIC, collision_type="wall")
+        # Add the merged wall colliders to the physics engine
+        self.add_static_group(wall_list, "wall", colliders.get(wall_list))
 
         # Add the enemy sprites to the physics engine
         self.add_sprite_list(
@@ -276,6 +419,7 @@ class PhysicsEngine(arcade.PymunkPhysicsEngine):
             moment_of_intertia=self.MOMENT_INF,
             collision_type="enemy",
         )
+        self.sleepable.update(enemy_list)
 
         # Add the coin sprites to the physics engine
         self.add_sprite_list(
@@ -285,13 +429,14 @@ class PhysicsEngine(arcade.PymunkPhysicsEngine):
             collision_type="coin",
         )
 
-        # Add the blocker sprites to the physics engine
+        # Add the merged colliders for each blocker to the physics engine
         for blocker in blocker_list:
-            self.add_sprite_list(
-                blocker,
-                body_type=self.STATIC,
-                collision_type="blocker",
-            )
+            self.add_static_group(blocker, "blocker", colliders.get(blocker))
+        logger.info(
+            "Merged %d static tiles into %d shapes",
+            self.static_tile_count,
+            self.static_shape_count,
+        )
 
         # Add the door sprites to the physics engine
         self.add_sprite_list(
@@ -309,14 +454,34 @@ class PhysicsEngine(arcade.PymunkPhysicsEngine):
                 moment_of_inertia=self.MOMENT_INF,
                 collision_type="boss",
             )
+            self.sleepable.add(boss)
 
         # Add collision handlers
+        for entity_type in ("player", "enemy", "boss"):
+            self.add_collision_handler(
+                entity_type,
+                "wall",
+                begin_handler=ground_begin_handler,
+                post_handler=ground_post_handler,
+                separate_handler=ground_separate_handler,
+            )
+        for entity_type in ("enemy", "boss"):
+            self.add_collision_handler(
+                entity_type,
+                "blocker",
+                begin_handler=ground_begin_handler,
+                post_handler=ground_post_handler,
+                separate_handler=ground_separate_handler,
+            )
         self.add_collision_handler(
             "player", "coin", begin_handler=player_coin_pickup_handler
         )
         self.add_collision_handler(
             "player", "blocker", begin_handler=player_blocker_begin_handler
         )
+        self.add_collision_handler(
+            "player", "blocker", post_handler=ground_post_handler
+        )
         self.add_collision_handler(
             "player", "blocker", separate_handler=player_blocker_separate_handler
         )
@@ -349,18 +514,261 @@ class PhysicsEngine(arcade.PymunkPhysicsEngine):
             f" count={len(self.sprites)})>"
         )
 
+    def add_sprite(self, sprite: arcade.Sprite, *args, **kwargs) -> None:
+        """
+        Adds a sprite to the physics engine and records which sprite its shape
+        belongs to.
+
+        Parameters
+        ----------
+        sprite: arcade.Sprite
+            The sprite to add.
+        args
+            The positional arguments for arcade.PymunkPhysicsEngine.add_sprite.
+        kwargs
+            The keyword arguments for arcade.PymunkPhysicsEngine.add_sprite.
+        """
+        super().add_sprite(sprite, *args, **kwargs)
+        shape = self.sprites[sprite].shape
+        assert shape is not None
+        self.shape_sprites[shape] = sprite
+
+    def remove_sprite(self, sprite: arcade.Sprite) -> None:
+        """
+        Removes a sprite from the physics engine.
+
+        Parameters
+        ----------
+        sprite: arcade.Sprite
+            The sprite to remove.
+        """
+        shape = self.sprites[sprite].shape
+        assert shape is not None
+        del self.shape_sprites[shape]
+        super().remove_sprite(sprite)
+
+    def get_sprite_for_shape(
+        self, shape: Optional[pymunk.Shape]
+    ) -> Optional[arcade.Sprite]:
+        """
+        Gets the sprite a shape belongs to. Arcade searches every sprite for this, but
+        it runs twice for every collision handler call.
+
+        Parameters
+        ----------
+        shape: Optional[pymunk.Shape]
+            The shape to get the sprite for.
+
+        Returns
+        -------
+        Optional[arcade.Sprite]
+            The sprite or None if the shape isn't in the physics engine.
+        """
+        if shape is None:
+            return None
+        return self.shape_sprites.get(shape)
+
+    @property
+    def active_bodies(self) -> int:
+        """How many non-static bodies are awake and being simulated."""
+        return sum(
+            1
+            for body in self.space.bodies
+            if body.body_type != self.STATIC and not body.is_sleeping
+        )
+
+    def is_ground_contact(self, arbiter: pymunk.Arbiter) -> bool:
+        """
+        Checks if a contact means the first shape is standing on the second. This uses
+        the same incline limit as is_on_ground.
+
+        Parameters
+        ----------
+        arbiter: pymunk.Arbiter
+            The arbiter for the contact.
+
+        Returns
+        -------
+        bool
+            Whether the contact normal is within the incline limit of gravity or not.
+        """
+        normal = arbiter.normal
+        return (
+            abs(normal.x - self.gravity_direction.x) < self.maximum_incline_on_ground
+            and abs(normal.y - self.gravity_direction.y)
+            < self.maximum_incline_on_ground
+        )
+
+    def add_static_group(
+        self,
+        group: arcade.SpriteList,
+        collision_type: str,
+        polygons: Optional[List[ColliderPolygon]] = None,
+    ) -> None:
+        """
+        Adds a group of static tiles to the physics engine as merged colliders, so the
+        broadphase only sees a few large shapes instead of one box per tile.
+
+        Parameters
+        ----------
+        group: arcade.SpriteList
+            The sprite list containing the tiles.
+        collision_type: str
+            The collision type for the colliders.
+        polygons: Optional[List[ColliderPolygon]]
+            The merged colliders for the tiles. These are merged now if not given.
+        """
+        if polygons is None:
+            polygons = merge_tiles(group)
+        static_colliders = [StaticCollider(points, group) for points in polygons]
+        for collider in static_colliders:
+            self.add_sprite(
+                collider, body_type=self.STATIC, collision_type=collision_type
+            )
+        self.static_groups[group] = static_colliders
+        self.static_tile_count += len(group)
+        self.static_shape_count += len(static_colliders)
+
+    def remove_static_group(self, group: arcade.SpriteList) -> None:
+        """
+        Removes the merged colliders for a group of static tiles from the physics
+        engine.
+
+        Parameters
+        ----------
+        group: arcade.SpriteList
+            The sprite list containing the tiles.
+        """
+        for collider in self.static_groups.pop(group, []):
+            self.remove_sprite(collider)
+
+    def update_activation(self, region: Tuple[float, float, float, float]) -> None:
+        """
+        Puts the enemies outside a region to sleep and wakes the ones inside it, so
+        only the bodies near the player cost anything to simulate. Sleeping bodies are
+        still woken if something moving touches them.
+
+        Parameters
+        ----------
+        region: Tuple[float, float, float, float]
+            The left, bottom, right and top of the activation region.
+        """
+        left, bottom, right, top = region
+        for sprite in self.sleepable:
+            physics_object = self.sprites.get(sprite)
+            if physics_object is None:
+                continue
+            body = physics_object.body
+            assert body is not None
+            inside = (
+                left <= sprite.center_x <= right and bottom <= sprite.center_y <= top
+            )
+            if inside and body.is_sleeping:
+                body.activate()
+            elif not inside and not body.is_sleeping and self.is_resting(body):
+                body.sleep()
+
+    def is_resting(self, body: pymunk.Body) -> bool:
+        """
+        Checks if a body is only touching static bodies. Chipmunk keeps touching bodies
+        in the same sleeping group, so forcing a body to sleep while it touches another
+        moving body corrupts the space.
+
+        Parameters
+        ----------
+        body: pymunk.Body
+            The body to check.
+
+        Returns
+        -------
+        bool
+            Whether the body can safely be put to sleep or not.
+        """
+        touching: List[pymunk.Body] = []
+        body.each_arbiter(
+            lambda arbiter: touching.extend(
+                shape.body for shape in arbiter.shapes if shape.body is not body
+            )
+        )
+        return all(other.body_type == self.STATIC for other in touching)
+
     def add_bullet(self, bullet: Bullet) -> None:
         """
-        Adds a bullet to the physics engine.
+        Adds a bullet to the physics engine. If the bullet has been added before, its
+        parked body and shape are reused.
 
         Parameters
         ----------
         bullet: Bullet
             The bullet to add to the physics engine.
         """
-        self.add_sprite(
-            bullet,
-            moment_of_inertia=self.MOMENT_INF,
-            body_type=self.KINEMATIC,
-            collision_type="bullet",
-        )
+        physics_object = self.parked_bullets.pop(bullet, None)
+        if physics_object is None:
+            self.add_sprite(
+                bullet,
+                moment_of_inertia=self.MOMENT_INF,
+                body_type=self.KINEMATIC,
+                collision_type="bullet",
+            )
+            return
+        body, shape = physics_object.body, physics_object.shape
+        assert body is not None and shape is not None
+        body.position = bullet.center_x, bullet.center_y
+        self.sprites[bullet] = physics_object
+        self.shape_sprites[shape] = bullet
+        self.non_static_sprite_list.append(bullet)
+        self.space.add(body, shape)
+
+    def remove_bullet(self, bullet: Bullet) -> None:
+        """
+        Removes a bullet from the physics engine while keeping its body and shape, so
+        they can be reused by add_bullet.
+
+        Parameters
+        ----------
+        bullet: Bullet
+            The bullet to remove from the physics engine.
+        """
+        physics_object = self.sprites.pop(bullet)
+        body, shape = physics_object.body, physics_object.shape
+        assert body is not None and shape is not None
+        del self.shape_sprites[shape]
+        self.non_static_sprite_list.remove(bullet)
+        self.space.remove(body, shape)
+        self.parked_bullets[bullet] = physics_object
+
+    def apply_force(self, sprite: arcade.Sprite, force: Tuple[float, float]) -> None:
+        """
+        Queues a force to be applied throughout the next fixed step. Pymunk clears the
+        forces on a body after every step, so applying them directly would only affect
+        the first substep.
+
+        Parameters
+        ----------
+        sprite: arcade.Sprite
+            The sprite to apply the force to.
+        force: Tuple[float, float]
+            The force to apply.
+        """
+        self.pending_forces.append((sprite, force))
+
+    def fixed_step(self, timestep: float, substeps: int = PHYSICS_SUBSTEPS) -> None:
+        """
+        Advances the physics simulation by a fixed step split into substeps. The queued
+        forces are applied in every substep and the sprites are only synced with their
+        bodies after the last one.
+
+        Parameters
+        ----------
+        timestep: float
+            The simulated time in seconds for this step.
+        substeps: int
+            How many physics steps to split the step into.
+        """
+        for substep in range(substeps):
+            for sprite, force in self.pending_forces:
+                # The sprite may have been removed by a collision handler
+                if sprite in self.sprites:
+                    super().apply_force(sprite, force)
+            self.step(timestep / substeps, resync_sprites=substep == substeps - 1)
+        self.pending_forces.clear()
@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+# Builtin
+import time
+from typing import Dict, List, Tuple
+
+# Pip
+import arcade
+import numpy as np
+
+# Custom
+from constants import PROFILER_FRAME_BUDGET, PROFILER_SAMPLE_COUNT
+
+# The colours used to draw the overlay
+OVERLAY_BACKGROUND = (0, 0, 0, 160)
+OVERLAY_UPDATE_COLOR = arcade.color.GREEN
+OVERLAY_DRAW_COLOR = arcade.color.SKY_BLUE
+OVERLAY_OVER_BUDGET_COLOR = arcade.color.RED
+
+
+class FrameProfiler:
+    """
+    Records how long each phase of a frame takes into a fixed-size ring buffer. Each
+    phase is timed from the previous mark, so marking a phase only costs one clock read
+    and one array write. Nothing is recorded while the profiler is disabled.
+
+    Parameters
+    ----------
+    phases: Tuple[str, ...]
+        The names of the phases in the order they happen.
+    capacity: int
+        How many frames to keep.
+
+    Attributes
+    ----------
+    columns: Dict[str, int]
+        Maps each phase to its column in the samples array.
+    samples: np.ndarray
+        An array of shape (capacity, phase count) containing the duration of each phase
+        in seconds.
+    totals: np.ndarray
+        The total duration of each frame in seconds.
+    index: int
+        The row which the current frame is written to.
+    count: int
+        How many rows contain recorded frames.
+    enabled: bool
+        Whether the profiler is recording or not.
+    """
+
+    def __init__(
+        self, phases: Tuple[str, ...], capacity: int = PROFILER_SAMPLE_COUNT
+    ) -> None:
+        self.phases: Tuple[str, ...] = phases
+        self.columns: Dict[str, int] = {
+            phase: index for index, phase in enumerate(phases)
+        }
+        self.samples: np.ndarray = np.zeros((capacity, len(phases)), dtype=float)
+        self.totals: np.ndarray = np.zeros(capacity, dtype=float)
+        self.index: int = 0
+        self.count: int = 0
+        self.enabled: bool = False
+        self._frame_start: float = 0
+        self._last_mark: float = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"<FrameProfiler (Phase count={len(self.phases)}) (Frame"
+            f" count={self.count}) (Enabled={self.enabled})>"
+        )
+
+    def begin_frame(self) -> None:
+        """Starts timing a new frame."""
+        if not self.enabled:
+            return
+        self.samples[self.index] = 0
+        self._frame_start = self._last_mark = time.perf_counter()
+
+    def mark(self, phase: str) -> None:
+        """
+        Records the time since the last mark against a phase.
+
+        Parameters
+        ----------
+        phase: str
+            The phase which has just finished.
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.samples[self.index, self.columns[phase]] += now - self._last_mark
+        self._last_mark = now
+
+    def end_frame(self) -> None:
+        """Finishes timing the current frame and moves on to the next row."""
+        if not self.enabled:
+            return
+        self.totals[self.index] = time.perf_counter() - self._frame_start
+        self.index = (self.index + 1) % len(self.totals)
+        self.count = min(self.count + 1, len(self.totals))
+
+    def recent_totals(self) -> np.ndarray:
+        """
+        Gets the recorded frame durations from oldest to newest.
+
+        Returns
+        -------
+        np.ndarray
+            The duration of each recorded frame in seconds.
+        """
+        if self.count < len(self.totals):
+            return self.totals[: self.count]
+        return np.roll(self.totals, -self.index)
+
+    def averages(self) -> Dict[str, float]:
+        """
+        Gets the average duration of each phase over the recorded frames.
+
+        Returns
+        -------
+        Dict[str, float]
+            The average duration of each phase in seconds.
+        """
+        if not self.count:
+            return {phase: 0 for phase in self.phases}
+        means = self.samples[: self.count].mean(axis=0)
+        return {phase: float(means[column]) for phase, column in self.columns.items()}
+
+
+class PerformanceOverlay:
+    """
+    Draws rolling frame-time graphs for the update and draw profilers along with the
+    average duration of each of their phases. Frames which go over the budget are drawn
+    in red.
+
+    Parameters
+    ----------
+    update_profiler: FrameProfiler
+        The profiler for Game.on_update.
+    draw_profiler: FrameProfiler
+        The profiler for Game.on_draw.
+    position: Tuple[float, float]
+        The bottom left corner of the overlay.
+    budget: float
+        The frame time budget in seconds.
+
+    Attributes
+    ----------
+    graph_size: Tuple[float, float]
+        The width and height of each graph in pixels.
+    phase_text: List[arcade.Text]
+        The text objects used for displaying the phase durations.
+    """
+
+    def __init__(
+        self,
+        update_profiler: FrameProfiler,
+        draw_profiler: FrameProfiler,
+        position: Tuple[float, float],
+        budget: float = PROFILER_FRAME_BUDGET,
+    ) -> None:
+        self.update_profiler: FrameProfiler = update_profiler
+        self.draw_profiler: FrameProfiler = draw_profiler
+        self.position: Tuple[float, float] = position
+        self.budget: float = budget
+        self.graph_size: Tuple[float, float] = (PROFILER_SAMPLE_COUNT, 60)
+        line_count = len(update_profiler.phases) + len(draw_profiler.phases) + 2
+        self.phase_text: List[arcade.Text] = [
+            arcade.Text(
+                "",
+                position[0] + 5,
+                position[1] + self.graph_size[1] * 2 + 15 + index * 14,
+                arcade.color.WHITE,
+                10,
+            )
+            for index in range(line_count)
+        ]
+
+    def __repr__(self) -> str:
+        return f"<PerformanceOverlay (Position={self.position}) (Budget={self.budget})>"
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the overlay is shown and the profilers are recording or not."""
+        return self.update_profiler.enabled
+
+    def toggle(self) -> None:
+        """Shows or hides the overlay and starts or stops the profilers recording."""
+        enabled = not self.enabled
+        self.update_profiler.enabled = enabled
+        self.draw_profiler.enabled = enabled
+
+    def draw_graph(
+        self, profiler: FrameProfiler, bottom: float, color: arcade.Color
+    ) -> None:
+        """
+        Draws a bar for each recorded frame of a profiler.
+
+        Parameters
+        ----------
+        profiler: FrameProfiler
+            The profiler to draw.
+        bottom: float
+            The y position of the bottom of the graph.
+        color: arcade.Color
+            The colour of the bars which are within the budget.
+        """
+        # Scale the graph so the budget is at half its height
+        width, height = self.graph_size
+        left = self.position[0] + 5
+        totals = profiler.recent_totals()
+        heights = np.minimum(totals / self.budget * height / 2, height)
+        over_budget = totals > self.budget
+        points: List[Tuple[float, float]] = []
+        over_budget_points: List[Tuple[float, float]] = []
+        for offset, (bar_height, over) in enumerate(zip(heights, over_budget)):
+            line = over_budget_points if over else points
+            line.append((left + offset, bottom))
+            line.append((left + offset, bottom + float(bar_height)))
+        if points:
+            arcade.draw_lines(points, color)
+        if over_budget_points:
+            arcade.draw_lines(over_budget_points, OVERLAY_OVER_BUDGET_COLOR)
+
+        # Draw the budget line
+        arcade.draw_line(
+            left,
+            bottom + height / 2,
+            left + width,
+            bottom + height / 2,
+            arcade.color.WHITE,
+        )
+
+    def draw(self) -> None:
+        """Draws the overlay. This should be called with the GUI camera active."""
+        if not self.enabled:
+            return
+        x, y = self.position
+        width, height = self.graph_size
+        line_count = len(self.phase_text)
+        arcade.draw_lrtb_rectangle_filled(
+            x,
+            x + width + 10,
+            y + height * 2 + 20 + line_count * 14,
+            y,
+            OVERLAY_BACKGROUND,
+        )
+        self.draw_graph(self.draw_profiler, y + 5, OVERLAY_DRAW_COLOR)
+        self.draw_graph(self.update_profiler, y + height + 10, OVERLAY_UPDATE_COLOR)
+
+        # List the average phase durations with the draw phases at the bottom
+        lines: List[Tuple[str, arcade.Color]] = []
+        for name, profiler in (
+            ("on_draw", self.draw_profiler),
+            ("on_update", self.update_profiler),
+        ):
+            lines.extend(
+                (f"  {phase}: {duration * 1000:.2f}ms", arcade.color.WHITE)
+                for phase, duration in reversed(profiler.averages().items())
+            )
+            recent = profiler.recent_totals()
+            average = recent.mean() if len(recent) else 0
+            worst = recent.max() if len(recent) else 0
+            lines.append(
+                (
+                    f"{name}: {average * 1000:.2f}ms (worst {worst * 1000:.2f}ms)",
+                    OVERLAY_OVER_BUDGET_COLOR
+                    if worst > self.budget
+                    else arcade.color.WHITE,
+                )
+            )
+        for text, (line, color) in zip(self.phase_text, lines):
+            text.value = line
+            text.color = color
+            text.draw()
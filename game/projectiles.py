@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+# Builtin
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+# Pip
+import arcade
+
+# Custom
+from constants import (
+    BULLET_HEIGHT,
+    BULLET_POOL_SIZE,
+    BULLET_TIME_TO_LIVE,
+    BULLET_VELOCITY,
+    BULLET_WIDTH,
+)
+from entities.entity import Bullet
+
+if TYPE_CHECKING:
+    from entities.entity import Entity
+    from physics import PhysicsEngine
+
+
+class ProjectileManager:
+    """
+    Manages the lifecycle of every bullet in the game. Bullets and their physics bodies
+    are recycled from a fixed-size pool and are retired once they hit something, fly
+    for too long or leave the tilemap.
+
+    Parameters
+    ----------
+    physics_engine: PhysicsEngine
+        The physics engine which the bullets are added to.
+    bounds: Tuple[float, float]
+        The width and height of the tilemap in pixels.
+    pool_size: int
+        The maximum amount of bullets which can exist at once.
+
+    Attributes
+    ----------
+    bullet_list: arcade.SpriteList
+        The sprite list for the active bullets.
+    active: Dict[Bullet, float]
+        Maps each active bullet to how long it has been flying for. This is ordered by
+        spawn time, so the oldest bullet is always first.
+    pool: List[Bullet]
+        The bullets which are free to be reused.
+    spawned: int
+        How many bullets have been spawned.
+    retired: int
+        How many bullets have been retired for any reason.
+    expired: int
+        How many bullets have been retired because their time to live ran out.
+    out_of_bounds: int
+        How many bullets have been retired because they left the tilemap.
+    recycled: int
+        How many active bullets have been retired early because the pool was full.
+    """
+
+    def __init__(
+        self,
+        physics_engine: PhysicsEngine,
+        bounds: Tuple[float, float],
+        pool_size: int = BULLET_POOL_SIZE,
+    ) -> None:
+        self.physics_engine: PhysicsEngine = physics_engine
+        self.bounds: Tuple[float, float] = bounds
+        self.pool_size: int = pool_size
+        self.bullet_list: arcade.SpriteList = arcade.SpriteList(use_spatial_hash=True)
+        self.active: Dict[Bullet, float] = {}
+        self.pool: List[Bullet] = []
+        self.spawned: int = 0
+        self.retired: int = 0
+        self.expired: int = 0
+        self.out_of_bounds: int = 0
+        self.recycled: int = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"<ProjectileManager (Active={len(self.active)}) (Pool"
+            f" size={self.pool_size}) (Spawned={self.spawned})"
+            f" (Retired={self.retired})>"
+        )
+
+    @property
+    def occupancy(self) -> float:
+        """Returns the fraction of the pool which is currently in use."""
+        return len(self.active) / self.pool_size
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Gets the pool occupancy and the spawn and retire counters.
+
+        Returns
+        -------
+        Dict[str, float]
+            The projectile statistics keyed by name.
+        """
+        return {
+            "active": len(self.active),
+            "occupancy": self.occupancy,
+            "spawned": self.spawned,
+            "retired": self.retired,
+            "expired": self.expired,
+            "out_of_bounds": self.out_of_bounds,
+            "recycled": self.recycled,
+        }
+
+    def spawn(self, x: float, y: float, direction: int, owner: Entity) -> Bullet:
+        """
+        Spawns a bullet travelling in a specific direction. If the pool is full, the
+        oldest active bullet is recycled.
+
+        Parameters
+        ----------
+        x: float
+            The starting x position of the bullet.
+        y: float
+            The starting y position of the bullet.
+        direction: int
+            The direction of the bullet. 1 is right and -1 is left.
+        owner: Entity
+            The entity which shot the bullet.
+
+        Returns
+        -------
+        Bullet
+            The spawned bullet.
+        """
+        # Get a free bullet
+        if not self.pool:
+            if len(self.active) < self.pool_size:
+                self.pool.append(
+                    Bullet(
+                        x,
+                        y,
+                        BULLET_WIDTH,
+                        BULLET_HEIGHT,
+                        arcade.color.RED,
+                        direction,
+                        owner,
+                        self,
+                    )
+                )
+            else:
+                self.retire(next(iter(self.active)))
+                self.recycled += 1
+        bullet = self.pool.pop()
+
+        # Reset the bullet and add it to the physics engine
+        bullet.center_x = x
+        bullet.center_y = y
+        bullet.direction = direction
+        bullet.owner = owner
+        self.physics_engine.add_bullet(bullet)
+        self.physics_engine.set_velocity(bullet, (BULLET_VELOCITY * direction, 0))
+        self.active[bullet] = 0
+        self.bullet_list.append(bullet)
+        self.spawned += 1
+        return bullet
+
+    def retire(self, bullet: Bullet) -> None:
+        """
+        Removes a bullet from the game and returns it to the pool. Retiring a bullet
+        which is not active does nothing.
+
+        Parameters
+        ----------
+        bullet: Bullet
+            The bullet to retire.
+        """
+        if self.active.pop(bullet, None) is None:
+            return
+        self.physics_engine.remove_bullet(bullet)
+        self.bullet_list.remove(bullet)
+        self.pool.append(bullet)
+        self.retired += 1
+
+    def update(self, delta_time: float) -> None:
+        """
+        Ages every active bullet and retires the ones which have expired or left the
+        tilemap.
+
+        Parameters
+        ----------
+        delta_time: float
+            Time interval since the last time the function was called.
+        """
+        width, height = self.bounds
+        finished = []
+        for bullet, age in self.active.items():
+            age += delta_time
+            self.active[bullet] = age
+            if age >= BULLET_TIME_TO_LIVE:
+                self.expired += 1
+                finished.append(bullet)
+            elif (
+                bullet.right < 0
+                or bullet.left > width
+                or bullet.top < 0
+                or bullet.bottom > height
+            ):
+                self.out_of_bounds += 1
+                finished.append(bullet)
+        for bullet in finished:
+            self.retire(bullet)
@@ -0,0 +1,474 @@
+from __future__ import annotations
+
+# Builtin
+import math
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Set, Tuple
+
+# Pip
+import arcade
+import numpy as np
+import pyglet.gl
+from arcade.gl import BufferDescription
+from arcade.gl.geometry import quad_2d
+
+# Custom
+from chunks import ChunkedSpriteList
+from constants import BULLET_HEIGHT, BULLET_POOL_SIZE, BULLET_WIDTH, STATIC_TILE_SIZE
+
+if TYPE_CHECKING:
+    from arcade import ArcadeContext
+    from arcade.gl import Context
+    from entities.entity import Bullet
+
+# The per-bullet data uploaded to the GPU each frame
+BULLET_DTYPE = np.dtype(
+    [("position", "f4", 2), ("direction", "f4"), ("color", "u1", 4)]
+)
+
+BULLET_VERTEX_SHADER = """
+#version 330
+
+uniform Projection {
+    uniform mat4 matrix;
+} proj;
+
+uniform vec2 size;
+
+in vec2 in_vert;
+in vec2 in_position;
+in float in_direction;
+in vec4 in_color;
+
+out vec4 v_color;
+
+void main() {
+    vec2 offset = in_vert * size * vec2(in_direction, 1.0);
+    gl_Position = proj.matrix * vec4(in_position + offset, 0.0, 1.0);
+    v_color = in_color;
+}
+"""
+
+BULLET_FRAGMENT_SHADER = """
+#version 330
+
+in vec4 v_color;
+
+out vec4 out_color;
+
+void main() {
+    out_color = v_color;
+}
+"""
+
+STATIC_VERTEX_SHADER = """
+#version 330
+
+uniform Projection {
+    uniform mat4 matrix;
+} proj;
+
+in vec2 in_vert;
+in vec2 in_uv;
+
+out vec2 v_uv;
+
+void main() {
+    gl_Position = proj.matrix * vec4(in_vert, 0.0, 1.0);
+    v_uv = in_uv;
+}
+"""
+
+STATIC_FRAGMENT_SHADER = """
+#version 330
+
+uniform sampler2D layer;
+
+in vec2 v_uv;
+
+out vec4 out_color;
+
+void main() {
+    out_color = texture(layer, v_uv);
+}
+"""
+
+# The texture, framebuffer and world-space quad for a pre-rendered tile
+StaticTile = Tuple[arcade.gl.Texture, arcade.gl.Framebuffer, arcade.gl.Geometry]
+
+
+class BulletRenderer:
+    """
+    Draws every bullet with one instanced draw call. Each bullet is uploaded as a
+    compact position, direction and color record instead of a full sprite, so this can
+    be used in place of drawing the bullet sprite list.
+
+    Parameters
+    ----------
+    ctx: Context
+        The OpenGL context to render with.
+    capacity: int
+        The initial amount of bullets the instance buffer can hold. This grows if more
+        bullets are drawn.
+
+    Attributes
+    ----------
+    instances: np.ndarray
+        The host copy of the per-bullet data.
+    instance_buffer: arcade.gl.Buffer
+        The GPU buffer holding the per-bullet data.
+    geometry: arcade.gl.Geometry
+        The unit quad combined with the per-bullet data.
+    count: int
+        How many bullets will be drawn on the next draw call.
+    """
+
+    def __init__(self, ctx: Context, capacity: int = BULLET_POOL_SIZE) -> None:
+        self.ctx: Context = ctx
+        self.program: arcade.gl.Program = ctx.program(
+            vertex_shader=BULLET_VERTEX_SHADER,
+            fragment_shader=BULLET_FRAGMENT_SHADER,
+        )
+        self.program["size"] = BULLET_WIDTH, BULLET_HEIGHT
+        self.quad_buffer: arcade.gl.Buffer = ctx.buffer(
+            data=np.array(
+                [-0.5, -0.5, 0.5, -0.5, -0.5, 0.5, 0.5, 0.5], dtype="f4"
+            ).tobytes()
+        )
+        self.instances: np.ndarray = np.zeros(capacity, dtype=BULLET_DTYPE)
+        self.instance_buffer: arcade.gl.Buffer = ctx.buffer(
+            reserve=self.instances.nbytes, usage="stream"
+        )
+        self.geometry: arcade.gl.Geometry = self._create_geometry()
+        self.count: int = 0
+
+    def __repr__(self) -> str:
+        return f"<BulletRenderer (Count={self.count}) (Capacity={len(self.instances)})>"
+
+    def _create_geometry(self) -> arcade.gl.Geometry:
+        """Combines the unit quad with the instance buffer."""
+        return self.ctx.geometry(
+            [
+                BufferDescription(self.quad_buffer, "2f", ["in_vert"]),
+                BufferDescription(
+                    self.instance_buffer,
+                    "2f 1f 4f1",
+                    ["in_position", "in_direction", "in_color"],
+                    normalized=["in_color"],
+                    instanced=True,
+                ),
+            ],
+            mode=self.ctx.TRIANGLE_STRIP,
+        )
+
+    def update(self, bullets: Iterable[Bullet]) -> None:
+        """
+        Writes the data for every bullet to the GPU in one go.
+
+        Parameters
+        ----------
+        bullets: Iterable[Bullet]
+            The bullets to draw.
+        """
+        bullets = list(bullets)
+        self.count = len(bullets)
+        if not self.count:
+            return
+
+        # Grow the buffers if there are more bullets than they can hold
+        if self.count > len(self.instances):
+            self.instances = np.zeros(
+                max(self.count, len(self.instances) * 2), dtype=BULLET_DTYPE
+            )
+            self.instance_buffer.orphan(self.instances.nbytes)
+
+        # Fill each field of the records in place
+        instances = self.instances[: self.count]
+        positions, colors = instances["position"], instances["color"]
+        positions[:, 0] = np.fromiter((bullet.center_x for bullet in bullets), "f4")
+        positions[:, 1] = np.fromiter((bullet.center_y for bullet in bullets), "f4")
+        instances["direction"] = np.fromiter(
+            (bullet.direction for bullet in bullets), "f4"
+        )
+        for channel in range(3):
+            colors[:, channel] = np.fromiter(
+                (bullet.solid_color[channel] for bullet in bullets), "u1"
+            )
+        colors[:, 3] = np.fromiter((bullet.alpha for bullet in bullets), "u1")
+
+        # Upload the data
+        self.instance_buffer.write(instances.tobytes())
+
+    def draw(self, bullets: Iterable[Bullet]) -> None:
+        """
+        Uploads and draws every bullet. This is a drop-in replacement for drawing the
+        bullet sprite list.
+
+        Parameters
+        ----------
+        bullets: Iterable[Bullet]
+            The bullets to draw.
+        """
+        self.update(bullets)
+        if self.count:
+            self.ctx.enable(self.ctx.BLEND)
+            self.geometry.render(self.program, instances=self.count)
+
+
+class StaticLayerCache:
+    """
+    Pre-renders sprite lists which never move into offscreen tiles, so drawing them
+    each frame only composites the tiles the camera can see. A tile is only rendered
+    again when a layer covering it is added or removed. Tiles are only allocated where
+    there are sprites and are freed once no layer covers them.
+
+    Parameters
+    ----------
+    ctx: ArcadeContext
+        The OpenGL context to render with.
+    layers: List[arcade.SpriteList]
+        The sprite lists to pre-render in the order they are drawn.
+    tile_size: int
+        The width and height of each tile in pixels.
+
+    Attributes
+    ----------
+    chunks: Dict[arcade.SpriteList, ChunkedSpriteList]
+        Each layer split into chunks the size of a tile, so rendering a tile only
+        submits the sprites near it.
+    tiles: Dict[Tuple[int, int], StaticTile]
+        The texture, framebuffer and quad for each allocated tile keyed by its column
+        and row.
+    dirty: Set[Tuple[int, int]]
+        The tiles which need to be rendered before they are next drawn.
+    bakes: int
+        How many times a tile has been rendered.
+    draw_calls: int
+        How many tiles were composited in the last draw.
+    """
+
+    def __init__(
+        self,
+        ctx: ArcadeContext,
+        layers: List[arcade.SpriteList],
+        tile_size: int = STATIC_TILE_SIZE,
+    ) -> None:
+        self.ctx: ArcadeContext = ctx
+        self.layers: List[arcade.SpriteList] = []
+        self.tile_size: int = tile_size
+        self.chunks: Dict[arcade.SpriteList, ChunkedSpriteList] = {}
+        self.program: arcade.gl.Program = ctx.program(
+            vertex_shader=STATIC_VERTEX_SHADER,
+            fragment_shader=STATIC_FRAGMENT_SHADER,
+        )
+        self.tiles: Dict[Tuple[int, int], StaticTile] = {}
+        self.dirty: Set[Tuple[int, int]] = set()
+        self.bakes: int = 0
+        self.draw_calls: int = 0
+        for layer in layers:
+            self.add_layer(layer)
+
+    def __repr__(self) -> str:
+        return (
+            f"<StaticLayerCache (Layer count={len(self.layers)}) (Tile"
+            f" count={len(self.tiles)}) (Bakes={self.bakes})>"
+        )
+
+    def _cells(
+        self, region: Tuple[float, float, float, float]
+    ) -> Iterator[Tuple[int, int]]:
+        """
+        Gets the tiles which overlap a region.
+
+        Parameters
+        ----------
+        region: Tuple[float, float, float, float]
+            The left, bottom, right and top of the region.
+
+        Returns
+        -------
+        Iterator[Tuple[int, int]]
+            The column and row of each tile.
+        """
+        left, bottom, right, top = region
+        size = self.tile_size
+        for column in range(int(left // size), math.ceil(right / size)):
+            for row in range(int(bottom // size), math.ceil(top / size)):
+                yield column, row
+
+    def _create_tile(self, cell: Tuple[int, int]) -> StaticTile:
+        """
+        Allocates the texture, framebuffer and quad for a tile.
+
+        Parameters
+        ----------
+        cell: Tuple[int, int]
+            The column and row of the tile.
+
+        Returns
+        -------
+        StaticTile
+            The allocated tile.
+        """
+        size = self.tile_size
+        texture = self.ctx.texture(
+            (size, size), filter=(self.ctx.NEAREST, self.ctx.NEAREST)
+        )
+        return (
+            texture,
+            self.ctx.framebuffer(color_attachments=[texture]),
+            quad_2d((size, size), ((cell[0] + 0.5) * size, (cell[1] + 0.5) * size)),
+        )
+
+    def _bake(self, cell: Tuple[int, int]) -> None:
+        """
+        Renders every layer into a tile.
+
+        Parameters
+        ----------
+        cell: Tuple[int, int]
+            The column and row of the tile.
+        """
+        _, framebuffer, _ = self.tiles[cell]
+        left, bottom = cell[0] * self.tile_size, cell[1] * self.tile_size
+        projection = self.ctx.projection_2d_matrix
+        region = left, bottom, left + self.tile_size, bottom + self.tile_size
+        with framebuffer.activate():
+            framebuffer.clear()
+            self.ctx.projection_2d = (region[0], region[2], region[1], region[3])
+
+            # Arcade can only set one blend function for the colour and alpha, so
+            # the colour is blended normally first and the alpha is accumulated in a
+            # second pass. The tile then holds premultiplied colour with the correct
+            # coverage
+            pyglet.gl.glColorMask(True, True, True, False)
+            for layer in self.layers:
+                self.chunks[layer].draw(region)
+            pyglet.gl.glColorMask(False, False, False, True)
+            for layer in self.layers:
+                self.chunks[layer].draw(
+                    region, (self.ctx.ONE, self.ctx.ONE_MINUS_SRC_ALPHA)
+                )
+            pyglet.gl.glColorMask(True, True, True, True)
+        self.ctx.projection_2d_matrix = projection
+        self.bakes += 1
+
+    def _is_covered(self, cell: Tuple[int, int]) -> bool:
+        """
+        Checks if any layer has a sprite which overlaps a tile.
+
+        Parameters
+        ----------
+        cell: Tuple[int, int]
+            The column and row of the tile.
+
+        Returns
+        -------
+        bool
+            Whether the tile still has anything to render.
+        """
+        left, bottom = cell[0] * self.tile_size, cell[1] * self.tile_size
+        right, top = left + self.tile_size, bottom + self.tile_size
+        for chunks in self.chunks.values():
+            for chunk in chunks.chunks_in((left, bottom, right, top)):
+                for sprite in chunk:
+                    if (
+                        sprite.right > left
+                        and sprite.left < right
+                        and sprite.top > bottom
+                        and sprite.bottom < top
+                    ):
+                        return True
+        return False
+
+    def add_layer(self, layer: arcade.SpriteList) -> None:
+        """
+        Starts drawing a layer above the existing ones and allocates every tile which
+        its sprites touch.
+
+        Parameters
+        ----------
+        layer: arcade.SpriteList
+            The sprite list to add.
+        """
+        self.layers.append(layer)
+        self.chunks[layer] = ChunkedSpriteList(layer, self.tile_size)
+        for sprite in layer:
+            for cell in self._cells(
+                (sprite.left, sprite.bottom, sprite.right, sprite.top)
+            ):
+                if cell not in self.tiles:
+                    self.tiles[cell] = self._create_tile(cell)
+                self.dirty.add(cell)
+
+    def remove_layer(self, layer: arcade.SpriteList) -> None:
+        """
+        Stops drawing a layer, marks the tiles it covered to be rendered again and
+        frees the ones which are now empty.
+
+        Parameters
+        ----------
+        layer: arcade.SpriteList
+            The sprite list to remove.
+        """
+        self.layers.remove(layer)
+        del self.chunks[layer]
+        cells = {
+            cell
+            for sprite in layer
+            for cell in self._cells(
+                (sprite.left, sprite.bottom, sprite.right, sprite.top)
+            )
+            if cell in self.tiles
+        }
+        for cell in cells:
+            if self._is_covered(cell):
+                self.dirty.add(cell)
+            else:
+                texture, framebuffer, _ = self.tiles.pop(cell)
+                framebuffer.delete()
+                texture.delete()
+                self.dirty.discard(cell)
+
+    def draw(self, view_region: Tuple[float, float, float, float]) -> None:
+        """
+        Renders any dirty tiles and composites the ones inside the view region. This
+        should be called with the camera active.
+
+        Parameters
+        ----------
+        view_region: Tuple[float, float, float, float]
+            The left, bottom, right and top of the part of the level the camera shows.
+        """
+        for cell in self.dirty:
+            self._bake(cell)
+        self.dirty.clear()
+
+        # The tiles hold premultiplied colours, so they are composited without
+        # multiplying by their alpha again
+        self.draw_calls = 0
+        self.ctx.enable(self.ctx.BLEND)
+        self.ctx.blend_func = self.ctx.ONE, self.ctx.ONE_MINUS_SRC_ALPHA
+        for cell in self._cells(view_region):
+            tile = self.tiles.get(cell)
+            if tile is not None:
+                tile[0].use(0)
+                tile[2].render(self.program)
+                self.draw_calls += 1
+        self.ctx.blend_func = self.ctx.BLEND_DEFAULT
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Gets the tile and draw call counters.
+
+        Returns
+        -------
+        Dict[str, int]
+            The allocated tiles, total bakes, tiles composited in the last draw and
+            the sprites which no longer have to be drawn every frame.
+        """
+        return {
+            "tiles": len(self.tiles),
+            "bakes": self.bakes,
+            "draw_calls": self.draw_calls,
+            "sprites": sum(len(layer) for layer in self.layers),
+        }
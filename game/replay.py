@@ -0,0 +1,319 @@
+"""
+Records the inputs for a game level into a compact binary file and replays them either
+in a window or headlessly. The game ends up in the same state because it runs at a fixed
+timestep and the enemy cooldowns are drawn from a seeded random generator.
+
+Run this from the game folder with ``python replay.py record --level 1 run.replay`` and
+``python replay.py play run.replay --headless``.
+"""
+from __future__ import annotations
+
+# Builtin
+import argparse
+import json
+import pathlib
+import struct
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+# Pip
+import arcade
+import pyglet
+
+# Custom
+from constants import PHYSICS_SUBSTEPS, SIMULATION_TIMESTEP
+from headless import SCRIPTED_KEYS, HeadlessGame, InputEvent, apply_input
+from sounds import sound_tasks
+from textures import load_textures
+from views.game import Game
+from window import Window
+
+# The replay file format details
+REPLAY_MAGIC = b"EGRP"
+REPLAY_VERSION = 1
+
+# The header contains the magic, version, level, seed, timestep, substeps and tick count
+REPLAY_HEADER = struct.Struct("<4sHHIdHI")
+
+# Each event is stored as its tick and a code from EVENT_CODES
+REPLAY_EVENT = struct.Struct("<IB")
+
+# Every input which can be recorded
+EVENT_CODES: List[Tuple[str, Optional[str]]] = [
+    *(("press", key) for key in SCRIPTED_KEYS),
+    *(("release", key) for key in SCRIPTED_KEYS),
+    ("click", None),
+    ("answer", None),
+    ("wrong", None),
+]
+EVENT_LOOKUP: Dict[Tuple[str, Optional[str]], int] = {
+    event: code for code, event in enumerate(EVENT_CODES)
+}
+KEY_NAMES: Dict[int, str] = {key: name for name, key in SCRIPTED_KEYS.items()}
+
+
+class InputRecorder:
+    """
+    Records a game's inputs against the tick they take effect on.
+
+    Parameters
+    ----------
+    path: pathlib.Path
+        The path to save the recording to.
+    level: int
+        The level being recorded.
+    seed: int
+        The seed for the level's random generator.
+    timestep: float
+        The simulated time in seconds for each tick.
+    substeps: int
+        How many physics steps each tick is split into.
+
+    Attributes
+    ----------
+    events: bytearray
+        The packed events which have been recorded.
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        level: int,
+        seed: int,
+        timestep: float = SIMULATION_TIMESTEP,
+        substeps: int = PHYSICS_SUBSTEPS,
+    ) -> None:
+        self.path: pathlib.Path = path
+        self.level: int = level
+        self.seed: int = seed
+        self.timestep: float = timestep
+        self.substeps: int = substeps
+        self.events: bytearray = bytearray()
+
+    def __repr__(self) -> str:
+        return (
+            f"<InputRecorder (Level={self.level}) (Event"
+            f" count={len(self.events) // REPLAY_EVENT.size})>"
+        )
+
+    def record(self, tick: int, action: str, key: Optional[int] = None) -> None:
+        """
+        Records an input. Keys which can't be replayed are ignored.
+
+        Parameters
+        ----------
+        tick: int
+            The tick the input takes effect on.
+        action: str
+            The input. This is either "press", "release", "click", "answer" or "wrong".
+        key: Optional[int]
+            The arcade key for "press" and "release" inputs.
+        """
+        key_name = KEY_NAMES.get(key) if key is not None else None
+        code = EVENT_LOOKUP.get((action, key_name))
+        if code is not None:
+            self.events += REPLAY_EVENT.pack(tick, code)
+
+    def save(self, tick_count: int) -> None:
+        """
+        Writes the recording to its file.
+
+        Parameters
+        ----------
+        tick_count: int
+            How many ticks were simulated.
+        """
+        self.path.write_bytes(
+            REPLAY_HEADER.pack(
+                REPLAY_MAGIC,
+                REPLAY_VERSION,
+                self.level,
+                self.seed,
+                self.timestep,
+                self.substeps,
+                tick_count,
+            )
+            + self.events
+        )
+
+
+class InputReplayer:
+    """
+    Feeds a recording back into a game at the ticks the inputs were recorded on.
+
+    Parameters
+    ----------
+    path: pathlib.Path
+        The path to the recording.
+
+    Attributes
+    ----------
+    events: Dict[int, List[InputEvent]]
+        Maps each tick to the inputs applied on it.
+    applying: bool
+        Whether the replayer is currently applying inputs. Real inputs are ignored
+        while replaying unless this is set.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        data = path.read_bytes()
+        (
+            magic,
+            version,
+            self.level,
+            self.seed,
+            self.timestep,
+            self.substeps,
+            self.tick_count,
+        ) = REPLAY_HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(f"{path} is not a version {REPLAY_VERSION} replay")
+        self.events: Dict[int, List[InputEvent]] = defaultdict(list)
+        for tick, code in REPLAY_EVENT.iter_unpack(data[REPLAY_HEADER.size :]):
+            self.events[tick].append(InputEvent(tick, *EVENT_CODES[code]))
+        self.applying: bool = False
+
+    def __repr__(self) -> str:
+        return f"<InputReplayer (Level={self.level}) (Tick count={self.tick_count})>"
+
+    def apply(self, game: Game) -> None:
+        """
+        Applies the inputs for the game's current tick.
+
+        Parameters
+        ----------
+        game: Game
+            The game to apply the inputs to.
+        """
+        self.applying = True
+        try:
+            for event in self.events.get(game.tick, []):
+                apply_input(game, event)
+        finally:
+            self.applying = False
+
+
+def game_state(game: Game) -> Dict:
+    """
+    Summarises the state of a game so two runs can be compared.
+
+    Parameters
+    ----------
+    game: Game
+        The game to summarise.
+
+    Returns
+    -------
+    Dict
+        The tick, player state and remaining entity counts.
+    """
+    assert game.player is not None
+    return {
+        "level": game.level_id,
+        "seed": game.seed,
+        "tick": game.tick,
+        "player_position": [game.player.center_x, game.player.center_y],
+        "score": game.player.score,
+        "health": game.player.health,
+        "enemies": len(game.enemy_list),
+        "walls_completed": game.walls_completed,
+        "finished": game.level_finished,
+        "won": game.level_won,
+    }
+
+
+def run_windowed(
+    level: int,
+    seed: Optional[int],
+    recorder_path: Optional[pathlib.Path] = None,
+    replayer: Optional[InputReplayer] = None,
+) -> Game:
+    """
+    Runs a game level in a window while recording or replaying its inputs.
+
+    Parameters
+    ----------
+    level: int
+        The level to run.
+    seed: Optional[int]
+        The seed for the level's random generator.
+    recorder_path: Optional[pathlib.Path]
+        The path to save a recording to.
+    replayer: Optional[InputReplayer]
+        The recording to replay.
+
+    Returns
+    -------
+    Game
+        The game once the window has closed.
+    """
+    # Load the assets synchronously since there is no loading view
+    window = Window("Educational Game")
+    load_textures()
+    for task in sound_tasks():
+        task()
+
+    # Set up the game (recordings and replays schedule the enemy AI the same way)
+    game = Game(window)
+    game.replayer = replayer
+    game.setup(level, seed, fixed_ai_capacity=True)
+    if recorder_path is not None:
+        game.recorder = InputRecorder(
+            recorder_path, level, game.seed, game.timestep, game.physics_substeps
+        )
+    if replayer is not None:
+        game.timestep = replayer.timestep
+        game.physics_substeps = replayer.substeps
+
+        # Close the window once every recorded tick has been replayed (this is checked
+        # every frame)
+        tick_count = replayer.tick_count
+
+        def check_finished(_) -> None:
+            if game.tick >= tick_count:
+                arcade.exit()
+
+        pyglet.clock.schedule(check_finished)
+    window.views["Game"] = game
+    window.show_view(game)
+    window.run()
+
+    # Save the recording
+    if game.recorder is not None:
+        game.recorder.save(game.tick)
+    return game
+
+
+def main() -> None:
+    """Records or replays a game from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    record_parser = subparsers.add_parser("record")
+    record_parser.add_argument("path", type=pathlib.Path)
+    record_parser.add_argument("--level", type=int, default=1)
+    record_parser.add_argument("--seed", type=int)
+    play_parser = subparsers.add_parser("play")
+    play_parser.add_argument("path", type=pathlib.Path)
+    play_parser.add_argument("--headless", action="store_true")
+    args = parser.parse_args()
+
+    # Record or replay the game
+    if args.command == "record":
+        game = run_windowed(args.level, args.seed, recorder_path=args.path)
+    else:
+        replayer = InputReplayer(args.path)
+        if args.headless:
+            headless = HeadlessGame(
+                replayer.level, timestep=replayer.timestep, seed=replayer.seed
+            )
+            game = headless.game
+            game.physics_substeps = replayer.substeps
+            game.replayer = replayer
+            headless.run(replayer.tick_count)
+        else:
+            game = run_windowed(replayer.level, replayer.seed, replayer=replayer)
+    print(json.dumps(game_state(game)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Streams the Scores table to and from CSV or JSON Lines files, so score databases from
+different machines can be merged. Both directions run in constant memory.
+
+Run this from the game folder with ``python score_transfer.py export scores.csv`` and
+``python score_transfer.py import other.jsonl``.
+"""
+from __future__ import annotations
+
+# Builtin
+import argparse
+import csv
+import json
+import pathlib
+import time
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+# Custom
+from constants import SCORE_TRANSFER_BATCH_SIZE
+from database import Database, database_path
+
+# The columns which are transferred (Game_ID is local to each database)
+SCORE_COLUMNS = ("Score", "Time_to_complete", "Win", "Level_ID")
+
+# The score types for each column
+ScoreRow = Tuple[int, float, int, int]
+
+
+class TransferStats(NamedTuple):
+    """
+    Represents the result of an import or export.
+
+    rows: int
+        How many rows were written.
+    skipped: int
+        How many rows were skipped because they were duplicates or invalid.
+    seconds: float
+        How long the transfer took.
+    """
+
+    rows: int
+    skipped: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        """How many rows were processed each second."""
+        return (self.rows + self.skipped) / self.seconds if self.seconds else 0
+
+
+def parse_row(values: List) -> Optional[ScoreRow]:
+    """
+    Converts a row from a file into the score types and checks it matches the table's
+    constraints.
+
+    Parameters
+    ----------
+    values: List
+        The score, time to complete, win and level values.
+
+    Returns
+    -------
+    Optional[ScoreRow]
+        The converted row or None if it is invalid.
+    """
+    try:
+        score, time_to_complete, win, level = values
+        row = (int(score), float(time_to_complete), int(win), int(level))
+    except (TypeError, ValueError):
+        return None
+    if row[1] < 0 or row[2] not in (0, 1) or row[3] < 1:
+        return None
+    return row
+
+
+def read_rows(path: pathlib.Path) -> Iterator[Optional[ScoreRow]]:
+    """
+    Reads the rows from a CSV or JSON Lines file one at a time.
+
+    Parameters
+    ----------
+    path: pathlib.Path
+        The file to read.
+
+    Returns
+    -------
+    Iterator[Optional[ScoreRow]]
+        Each converted row or None if the row is invalid.
+    """
+    with open(path, newline="", encoding="utf8") as file:
+        if path.suffix == ".csv":
+            for record in csv.DictReader(file):
+                yield parse_row([record.get(column) for column in SCORE_COLUMNS])
+        else:
+            for line in file:
+                if line.strip():
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        yield None
+                        continue
+                    yield parse_row([record.get(column) for column in SCORE_COLUMNS])
+
+
+def export_scores(
+    database: Database,
+    path: pathlib.Path,
+    batch_size: int = SCORE_TRANSFER_BATCH_SIZE,
+) -> TransferStats:
+    """
+    Writes every score to a CSV or JSON Lines file depending on its suffix. The rows
+    are fetched in chunks, so the table is never loaded into memory.
+
+    Parameters
+    ----------
+    database: Database
+        The database to export. Its queued scores are written first.
+    path: pathlib.Path
+        The file to write.
+    batch_size: int
+        How many rows to fetch at once.
+
+    Returns
+    -------
+    TransferStats
+        How many rows were written and how long it took.
+    """
+    start = time.perf_counter()
+    database.flush()
+    rows = 0
+    cursor = database.connection.execute(
+        f"SELECT {', '.join(SCORE_COLUMNS)} FROM Scores;"
+    )
+    with open(path, "w", newline="", encoding="utf8") as file:
+        writer = csv.writer(file) if path.suffix == ".csv" else None
+        if writer is not None:
+            writer.writerow(SCORE_COLUMNS)
+        while True:
+            chunk = cursor.fetchmany(batch_size)
+            if not chunk:
+                break
+            if writer is not None:
+                writer.writerows(chunk)
+            else:
+                file.writelines(
+                    json.dumps(dict(zip(SCORE_COLUMNS, row))) + "\n" for row in chunk
+                )
+            rows += len(chunk)
+    return TransferStats(rows, 0, time.perf_counter() - start)
+
+
+def import_scores(
+    database: Database,
+    path: pathlib.Path,
+    batch_size: int = SCORE_TRANSFER_BATCH_SIZE,
+) -> TransferStats:
+    """
+    Adds the scores from a CSV or JSON Lines file to the database. The rows are written
+    in batches with one transaction each and rows which already exist in the database
+    are skipped, so the same file can be imported more than once.
+
+    Parameters
+    ----------
+    database: Database
+        The database to import into. Its top scores cache is reloaded afterwards.
+    path: pathlib.Path
+        The file to read.
+    batch_size: int
+        How many rows to write in each transaction.
+
+    Returns
+    -------
+    TransferStats
+        How many rows were added and skipped and how long it took.
+    """
+    start = time.perf_counter()
+    database.flush()
+    connection = database.connection
+    before = connection.total_changes
+    read = 0
+
+    # The leaderboard index covers every column, so the duplicate check is one seek
+    statement = f"""
+        INSERT INTO Scores({', '.join(SCORE_COLUMNS)})
+        SELECT ?1, ?2, ?3, ?4
+        WHERE NOT EXISTS (
+            SELECT 1 FROM Scores
+            WHERE Score = ?1 AND Time_to_complete = ?2 AND Win = ?3 AND Level_ID = ?4
+        );"""
+    batch: List[ScoreRow] = []
+    for row in read_rows(path):
+        read += 1
+        if row is not None:
+            batch.append(row)
+        if len(batch) >= batch_size:
+            with connection:
+                connection.executemany(statement, batch)
+            batch.clear()
+    if batch:
+        with connection:
+            connection.executemany(statement, batch)
+    rows = connection.total_changes - before
+    database.load_top_scores()
+    return TransferStats(rows, read - rows, time.perf_counter() - start)
+
+
+def main() -> None:
+    """Imports or exports the scores from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("command", choices=("import", "export"))
+    parser.add_argument("path", type=pathlib.Path, help="A .csv or .jsonl file")
+    parser.add_argument("--database", type=pathlib.Path, default=database_path)
+    args = parser.parse_args()
+
+    # Run the transfer (the window is only needed for formatting scores)
+    database = Database(None, args.database)  # type: ignore
+    if args.command == "import":
+        stats = import_scores(database, args.path)
+    else:
+        stats = export_scores(database, args.path)
+    database.close()
+    print(
+        f"{args.command.capitalize()}ed {stats.rows} rows ({stats.skipped} skipped) in"
+        f" {stats.seconds:.2f} seconds ({stats.rows_per_second:.0f} rows/second)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
-import pathlib
-
 # Builtin
-from typing import Dict
+import pathlib
+from functools import partial
+from typing import Callable, Dict, List
 
 # Pip
 import arcade
@@ -20,8 +20,34 @@ sound_filenames = {
     "end screen": "end screen.mp3",
 }
 
-# Create the sound dictionary
-sounds: Dict[str, arcade.Sound] = {
-    key: arcade.load_sound(str(sound_path.joinpath(value)), True)
-    for key, value in sound_filenames.items()
-}
+# Create the sound dictionary (this is filled in by the asset loader)
+sounds: Dict[str, arcade.Sound] = {}
+
+
+def load_sound(key: str, filename: str) -> None:
+    """
+    Loads a sound and stores it in the sound dictionary.
+
+    Parameters
+    ----------
+    key: str
+        The name of the sound.
+    filename: str
+        The filename of the sound.
+    """
+    # Arcade raises an error if the sound can't be loaded
+    sound = arcade.load_sound(str(sound_path.joinpath(filename)), True)
+    assert sound is not None
+    sounds[key] = sound
+
+
+def sound_tasks() -> List[Callable[[], None]]:
+    """
+    Creates a task for each sound which loads it.
+
+    Returns
+    -------
+    List[Callable[[], None]]
+        The tasks which can be run on any thread.
+    """
+    return [partial(load_sound, key, value) for key, value in sound_filenames.items()]
@@ -0,0 +1,400 @@
+from __future__ import annotations
+
+# Builtin
+import math
+from typing import TYPE_CHECKING, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# Pip
+import arcade
+import numpy as np
+
+# Custom
+from constants import (
+    CHUNK_SIZE,
+    ENEMY_ATTACK_COOLDOWN_MAX,
+    ENEMY_ATTACK_COOLDOWN_MIN,
+    ENEMY_BULLET_DAMAGE,
+    FRICTION,
+    MASS,
+    SPRITE_SIZE,
+    STREAM_MARGIN,
+    STREAM_UNLOAD_MARGIN,
+)
+from entities.enemy import Enemy
+from textures import moving_textures
+
+if TYPE_CHECKING:
+    from level_cache import CompiledTileMap
+    from views.game import Game
+
+
+class ChunkRecord(NamedTuple):
+    """
+    Represents the state of an unloaded chunk which differs from the map.
+
+    coins: np.ndarray
+        Whether each of the chunk's coins in decoding order hasn't been collected yet.
+    enemies: np.ndarray
+        An array of shape (N, 5) containing the x position, y position, health, attack
+        cooldown and attack counter of each enemy which was in the chunk.
+    """
+
+    coins: np.ndarray
+    enemies: np.ndarray
+
+
+class StreamedChunk:
+    """
+    Holds the sprites which were created for a loaded chunk.
+
+    Parameters
+    ----------
+    cell: Tuple[int, int]
+        The column and row of the chunk.
+
+    Attributes
+    ----------
+    walls: arcade.SpriteList
+        The wall sprites in the chunk.
+    coins: List[arcade.Sprite]
+        Every coin sprite in the chunk in decoding order including collected ones.
+    """
+
+    def __init__(self, cell: Tuple[int, int]) -> None:
+        self.cell: Tuple[int, int] = cell
+        self.walls: arcade.SpriteList = arcade.SpriteList(use_spatial_hash=True)
+        self.coins: List[arcade.Sprite] = []
+
+    def __repr__(self) -> str:
+        return (
+            f"<StreamedChunk (Cell={self.cell}) (Wall count={len(self.walls)}) (Coin"
+            f" count={len(self.coins)})>"
+        )
+
+
+class WorldStreamer:
+    """
+    Creates the walls, coins and enemies of a level a chunk at a time as the player
+    moves, so only the part of the map around the player exists in memory and the
+    physics engine. Chunks are loaded when they come within STREAM_MARGIN chunks of
+    the physics activation region and unloaded once they are STREAM_UNLOAD_MARGIN
+    chunks away, so walking along a chunk border doesn't reload it every tick.
+    Collected coins and the enemies' positions, health and cooldowns are kept in a
+    compact record while a chunk is unloaded.
+
+    Parameters
+    ----------
+    game: Game
+        The game to stream the chunks into. Its physics engine, line of sight index and
+        enemy AI should already be set up.
+    tilemap: CompiledTileMap
+        The compiled tilemap to decode the chunks from.
+    chunk_size: int
+        The width and height of each chunk in tiles.
+
+    Attributes
+    ----------
+    columns: int
+        How many columns of chunks the map has.
+    rows: int
+        How many rows of chunks the map has.
+    loaded: Dict[Tuple[int, int], StreamedChunk]
+        The sprites for each loaded chunk keyed by its column and row.
+    records: Dict[Tuple[int, int], ChunkRecord]
+        The saved state of each chunk which has been unloaded.
+    loads: int
+        How many times a chunk has been loaded.
+    unloads: int
+        How many times a chunk has been unloaded.
+    """
+
+    def __init__(
+        self, game: Game, tilemap: CompiledTileMap, chunk_size: int = CHUNK_SIZE
+    ) -> None:
+        self.game: Game = game
+        self.tilemap: CompiledTileMap = tilemap
+        self.chunk_size: int = chunk_size
+        self.columns: int = math.ceil(tilemap.width / chunk_size)
+        self.rows: int = math.ceil(tilemap.height / chunk_size)
+        self.loaded: Dict[Tuple[int, int], StreamedChunk] = {}
+        self.records: Dict[Tuple[int, int], ChunkRecord] = {}
+        self.loads: int = 0
+        self.unloads: int = 0
+        self._region: Optional[Tuple[int, int, int, int]] = None
+
+    def __repr__(self) -> str:
+        return (
+            f"<WorldStreamer (Loaded count={len(self.loaded)}) (Saved"
+            f" count={len(self.records)})>"
+        )
+
+    @property
+    def chunk_pixels(self) -> float:
+        """The width and height of each chunk in pixels."""
+        return self.chunk_size * SPRITE_SIZE
+
+    def chunk_at(self, x: float, y: float) -> Tuple[int, int]:
+        """
+        Gets the chunk which contains a point.
+
+        Parameters
+        ----------
+        x: float
+            The x position of the point.
+        y: float
+            The y position of the point.
+
+        Returns
+        -------
+        Tuple[int, int]
+            The column and row of the chunk.
+        """
+        return int(x // self.chunk_pixels), int(y // self.chunk_pixels)
+
+    def _chunk_range(
+        self, region: Tuple[float, float, float, float], margin: int
+    ) -> Tuple[int, int, int, int]:
+        """
+        Gets the chunks which overlap a region grown by a number of chunks. This is
+        clamped to the map.
+
+        Parameters
+        ----------
+        region: Tuple[float, float, float, float]
+            The left, bottom, right and top of the region.
+        margin: int
+            How many chunks to grow the region by.
+
+        Returns
+        -------
+        Tuple[int, int, int, int]
+            The first column, first row, last column and last row (all inclusive).
+        """
+        left, bottom, right, top = region
+        first_column, first_row = self.chunk_at(left, bottom)
+        last_column, last_row = self.chunk_at(right, top)
+        return (
+            max(first_column - margin, 0),
+            max(first_row - margin, 0),
+            min(last_column + margin, self.columns - 1),
+            min(last_row + margin, self.rows - 1),
+        )
+
+    def _cells(
+        self, chunk_range: Tuple[int, int, int, int]
+    ) -> Iterator[Tuple[int, int]]:
+        """
+        Gets every chunk inside a chunk range.
+
+        Parameters
+        ----------
+        chunk_range: Tuple[int, int, int, int]
+            The first column, first row, last column and last row (all inclusive).
+
+        Returns
+        -------
+        Iterator[Tuple[int, int]]
+            The column and row of each chunk.
+        """
+        first_column, first_row, last_column, last_row = chunk_range
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                yield column, row
+
+    def update(self, region: Tuple[float, float, float, float]) -> None:
+        """
+        Loads the chunks near a region and unloads the ones which are far from it.
+        This only does any work when the region crosses into another chunk.
+
+        Parameters
+        ----------
+        region: Tuple[float, float, float, float]
+            The left, bottom, right and top of the physics activation region.
+        """
+        chunk_range = self._chunk_range(region, 0)
+        if chunk_range == self._region:
+            return
+        self._region = chunk_range
+
+        # Unload the far chunks first, so the enemies leaving them are saved before
+        # any new ones are created
+        first_column, first_row, last_column, last_row = self._chunk_range(
+            region, STREAM_UNLOAD_MARGIN
+        )
+        for cell in list(self.loaded):
+            column, row = cell
+            if not (
+                first_column <= column <= last_column and first_row <= row <= last_row
+            ):
+                self.unload(cell)
+        for cell in self._cells(self._chunk_range(region, STREAM_MARGIN)):
+            if cell not in self.loaded:
+                self.load(cell)
+
+    def load(self, cell: Tuple[int, int]) -> None:
+        """
+        Creates a chunk's walls, coins and enemies and adds them to the game. A chunk
+        which was unloaded before is restored from its record.
+
+        Parameters
+        ----------
+        cell: Tuple[int, int]
+            The column and row of the chunk.
+        """
+        game = self.game
+        assert game.physics_engine is not None
+        assert game.occluders is not None
+        assert game.coin_list is not None
+        assert game.ai_scheduler is not None
+        record = self.records.pop(cell, None)
+        chunk = StreamedChunk(cell)
+        column, row = cell
+
+        # Add the walls as one merged static group
+        chunk.walls.extend(
+            self.tilemap.chunk_sprites("Platforms", column, row, self.chunk_size)
+        )
+        game.physics_engine.add_static_group(chunk.walls, "wall")
+        game.occluders.add_blocker(chunk.walls)
+        if game.wall_cache is not None:
+            game.wall_cache.add_layer(chunk.walls)
+
+        # Add the coins which haven't been collected
+        chunk.coins = self.tilemap.chunk_sprites("Coins", column, row, self.chunk_size)
+        for index, coin in enumerate(chunk.coins):
+            if record is not None and not record.coins[index]:
+                continue
+            game.coin_list.append(coin)
+            game.physics_engine.add_sprite(
+                coin,
+                friction=FRICTION,
+                body_type=game.physics_engine.KINEMATIC,
+                collision_type="coin",
+            )
+            if game.coin_chunks is not None:
+                game.coin_chunks.append(coin)
+
+        # Add the enemies from the map the first time and from the record afterwards
+        if record is None:
+            for spawn in self.tilemap.chunk_sprites(
+                "Enemies", column, row, self.chunk_size
+            ):
+                enemy = Enemy(
+                    spawn.center_x,
+                    spawn.center_y,
+                    moving_textures["enemy"],
+                    10,
+                    ENEMY_BULLET_DAMAGE,
+                )
+                enemy.set_cooldown(
+                    game.rng.uniform(
+                        ENEMY_ATTACK_COOLDOWN_MIN, ENEMY_ATTACK_COOLDOWN_MAX
+                    )
+                )
+                self._add_enemy(enemy)
+        else:
+            for x, y, health, cooldown, counter in record.enemies:
+                enemy = Enemy(
+                    x, y, moving_textures["enemy"], int(health), ENEMY_BULLET_DAMAGE
+                )
+                enemy.set_cooldown(cooldown)
+                self._add_enemy(enemy, counter)
+        self.loaded[cell] = chunk
+        self.loads += 1
+
+    def _add_enemy(self, enemy: Enemy, counter: float = 0) -> None:
+        """
+        Adds a streamed enemy to the game, the physics engine and the AI.
+
+        Parameters
+        ----------
+        enemy: Enemy
+            The enemy to add. Its attack cooldown should already be set.
+        counter: float
+            How long it has been since the enemy last attacked.
+        """
+        game = self.game
+        assert game.physics_engine is not None
+        assert game.ai_scheduler is not None
+        game.enemy_list.append(enemy)
+        game.physics_engine.add_sprite(
+            enemy,
+            mass=MASS,
+            friction=FRICTION,
+            moment_of_inertia=game.physics_engine.MOMENT_INF,
+            collision_type="enemy",
+        )
+        game.physics_engine.sleepable.add(enemy)
+        game.ai_scheduler.add(enemy, counter)
+        if game.enemy_chunks is not None:
+            game.enemy_chunks.append(enemy)
+
+    def unload(self, cell: Tuple[int, int]) -> None:
+        """
+        Saves a chunk's state and removes its walls, coins and enemies from the game.
+        The enemies are the ones which are currently inside the chunk, not the ones
+        which were created by it.
+
+        Parameters
+        ----------
+        cell: Tuple[int, int]
+            The column and row of the chunk.
+        """
+        game = self.game
+        assert game.physics_engine is not None
+        assert game.occluders is not None
+        assert game.enemy_ai is not None
+        chunk = self.loaded.pop(cell)
+
+        # Save and remove the enemies before their floor disappears
+        enemies: List[Enemy] = [
+            enemy  # type: ignore
+            for enemy in game.enemy_list
+            if self.chunk_at(enemy.center_x, enemy.center_y) == cell
+        ]
+        rows = [game.enemy_ai.indices[enemy] for enemy in enemies]
+        saved = np.array(
+            [
+                (enemy.center_x, enemy.center_y, enemy.health, enemy.attack_cooldown, 0)
+                for enemy in enemies
+            ],
+            dtype=float,
+        ).reshape(-1, 5)
+        saved[:, 4] = game.enemy_ai.counters[rows]
+        # (removing a sprite from its lists removes it from the physics engine too)
+        for enemy in enemies:
+            game.physics_engine.sleepable.discard(enemy)
+            game.enemy_ai.remove(enemy)
+            enemy.remove_from_sprite_lists()
+
+        # Save which coins are left and remove them
+        remaining = np.array([bool(coin.sprite_lists) for coin in chunk.coins])
+        for coin in chunk.coins:
+            coin.remove_from_sprite_lists()
+
+        # Remove the walls
+        game.physics_engine.remove_static_group(chunk.walls)
+        game.occluders.remove_blocker(chunk.walls)
+        if game.wall_cache is not None:
+            game.wall_cache.remove_layer(chunk.walls)
+        self.records[cell] = ChunkRecord(remaining, saved)
+        self.unloads += 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Gets the streaming counters.
+
+        Returns
+        -------
+        Dict[str, int]
+            The loaded and saved chunks, total loads and unloads and the wall and coin
+            sprites which currently exist.
+        """
+        return {
+            "loaded_chunks": len(self.loaded),
+            "saved_chunks": len(self.records),
+            "loads": self.loads,
+            "unloads": self.unloads,
+            "walls": sum(len(chunk.walls) for chunk in self.loaded.values()),
+            "coins": sum(len(chunk.coins) for chunk in self.loaded.values()),
+        }
@@ -2,16 +2,35 @@ from __future__ import annotations
 
 # Builtin
 import pathlib
-from typing import Dict, List
+import threading
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
 
 # Pip
 import arcade
 
+# Custom
+from atlas import BakedAtlas, load_atlas
+
+if TYPE_CHECKING:
+    from arcade import ArcadeContext
+
 # Create the texture path
 texture_path = (
     pathlib.Path(__file__).resolve().parent.joinpath("resources").joinpath("textures")
 )
 
+# Create the paths to the baked texture atlas
+atlas_image_path = texture_path.joinpath("atlas.rgba")
+atlas_index_path = texture_path.joinpath("atlas.json")
+
+# Create the texture dictionaries (these are filled in by the asset loader)
+non_moving_textures: Dict[str, arcade.Texture] = {}
+moving_textures: Dict[str, Dict[str, List[List[arcade.Texture]]]] = {}
+
+# The baked atlas the textures were loaded from (this is None if it was stale)
+baked_atlas: Optional[BakedAtlas] = None
+
 # Create a dictionary to hold all the filenames for the non-moving textures
 non_moving_filenames = {
     "background": "background.png",
@@ -65,20 +84,131 @@ moving_filenames = {
         ],
     },
 }
-# Create the non-moving textures
-non_moving_textures: Dict[str, arcade.Texture] = {
-    key: arcade.load_texture(str(texture_path.joinpath(value)))
-    for key, value in non_moving_filenames.items()
-}
 
-# Create the moving textures
-moving_textures: Dict[str, Dict[str, List[List[arcade.Texture]]]] = {
-    key: {
-        animation_type: [
-            arcade.load_texture_pair(texture_path.joinpath(filename))
-            for filename in sublist
-        ]
-        for animation_type, sublist in value.items()
-    }
-    for key, value in moving_filenames.items()
-}
+
+def texture_filenames() -> List[str]:
+    """
+    Gets the filename of every texture used by the game.
+
+    Returns
+    -------
+    List[str]
+        The filenames of the moving and non-moving textures.
+    """
+    filenames = list(non_moving_filenames.values())
+    for animations in moving_filenames.values():
+        for sublist in animations.values():
+            filenames.extend(sublist)
+    return filenames
+
+
+# The functions which load a single texture and a texture pair
+TextureLoaders = Tuple[
+    Callable[[str], arcade.Texture], Callable[[str], List[arcade.Texture]]
+]
+
+
+def get_texture_loaders() -> TextureLoaders:
+    """
+    Gets the functions which load a single texture and a texture pair. The baked atlas
+    is used if it is up to date, otherwise each image is decoded separately.
+
+    Returns
+    -------
+    TextureLoaders
+        The single texture and texture pair loaders.
+    """
+    global baked_atlas
+    baked_atlas = load_atlas(
+        texture_path, texture_filenames(), atlas_image_path, atlas_index_path
+    )
+    if baked_atlas is not None:
+        return baked_atlas.texture, baked_atlas.texture_pair
+
+    def load_single(filename: str) -> arcade.Texture:
+        return arcade.load_texture(str(texture_path.joinpath(filename)))
+
+    def load_pair(filename: str) -> List[arcade.Texture]:
+        return arcade.load_texture_pair(texture_path.joinpath(filename))
+
+    return load_single, load_pair
+
+
+def texture_tasks() -> List[Callable[[], None]]:
+    """
+    Creates a task for each texture which decodes it and stores it in the texture
+    dictionaries. The first task to run checks whether the baked atlas is up to date
+    and maps it, so this doesn't block the thread creating the tasks.
+
+    Returns
+    -------
+    List[Callable[[], None]]
+        The tasks which can be run on any thread.
+    """
+    loaders: List[TextureLoaders] = []
+    lock = threading.Lock()
+
+    def get_loaders() -> TextureLoaders:
+        with lock:
+            if not loaders:
+                loaders.append(get_texture_loaders())
+        return loaders[0]
+
+    def load_non_moving(key: str, filename: str) -> None:
+        load_single, _ = get_loaders()
+        non_moving_textures[key] = load_single(filename)
+
+    def load_moving(
+        animations: List[List[arcade.Texture]], index: int, filename: str
+    ) -> None:
+        _, load_pair = get_loaders()
+        animations[index] = load_pair(filename)
+
+    # Create the non-moving texture tasks
+    tasks: List[Callable[[], None]] = [
+        partial(load_non_moving, key, filename)
+        for key, filename in non_moving_filenames.items()
+    ]
+
+    # Create the moving texture tasks. The animation lists are created up front so
+    # each task only has to fill in its own slot
+    for key, value in moving_filenames.items():
+        moving_textures[key] = {}
+        for animation_type, sublist in value.items():
+            animations: List[List[arcade.Texture]] = [[] for _ in sublist]
+            moving_textures[key][animation_type] = animations
+            tasks.extend(
+                partial(load_moving, animations, index, filename)
+                for index, filename in enumerate(sublist)
+            )
+    return tasks
+
+
+def load_textures() -> None:
+    """Loads every texture on the current thread."""
+    for task in texture_tasks():
+        task()
+
+
+def upload_textures(ctx: ArcadeContext) -> None:
+    """
+    Adds every loaded texture to the context's default texture atlas before the first
+    frame, so sprites don't have to add them mid-game. If the textures came from the
+    baked atlas, it is written into the texture atlas with a single upload.
+
+    Parameters
+    ----------
+    ctx: ArcadeContext
+        The OpenGL context to upload to.
+    """
+    if baked_atlas is not None:
+        baked_atlas.upload(ctx.default_atlas)
+
+    # Add any textures which weren't uploaded with the baked atlas
+    for texture in non_moving_textures.values():
+        ctx.default_atlas.add(texture)
+    for animations in moving_textures.values():
+        for sublist in animations.values():
+            for pair in sublist:
+                for texture in pair:
+                    ctx.default_atlas.add(texture)
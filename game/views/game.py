@@ -2,13 +2,17 @@ from __future__ import annotations
 
 # Builtin
 import random
-from typing import TYPE_CHECKING, List, Optional, Tuple
+import time
+from typing import TYPE_CHECKING, List, Optional, Tuple, Union
 
 # Pip
 import arcade
 
 # Custom
+from ai import AIScheduler, EnemyBatch
+from chunks import ChunkedSpriteList
 from constants import (
+    AI_FIXED_CAPACITY,
     BOSS_ATTACK_COOLDOWN_MAX,
     BOSS_ATTACK_COOLDOWN_MIN,
     BOSS_BULLET_DAMAGE,
@@ -17,22 +21,58 @@ from constants import (
     ENEMY_ATTACK_COOLDOWN_MIN,
     ENEMY_BULLET_DAMAGE,
     GRAVITY,
+    MAX_CATCH_UP_STEPS,
+    PHYSICS_ACTIVATION_MARGIN,
+    PHYSICS_SUBSTEPS,
     PLAYER_ATTACK_COOLDOWN,
     PLAYER_BULLET_DAMAGE,
     PLAYER_JUMP_FORCE,
     PLAYER_MOVE_FORCE,
+    SIMULATION_TIMESTEP,
     SPRITE_SIZE,
 )
 from entities.enemy import Enemy
 from entities.player import Player, ScoreAmount
-from levels import levels
+from levels import levels, load_streamed_level
+from occlusion import OccluderIndex
 from physics import PhysicsEngine
+from profiler import FrameProfiler, PerformanceOverlay
+from projectiles import ProjectileManager
+from renderers import BulletRenderer, StaticLayerCache
+from streaming import WorldStreamer
 from textures import moving_textures
 from views.end_screen import EndScreen
 from views.question import Question
 
+# The phases which Game.on_update and Game.on_draw are split into by the profiler
+UPDATE_PHASES = (
+    "streaming",
+    "enemy deaths",
+    "player input",
+    "enemy ai",
+    "attacks",
+    "projectiles",
+    "physics",
+    "camera",
+)
+DRAW_PHASES = (
+    "clear",
+    "walls",
+    "coins",
+    "enemies",
+    "bullets",
+    "door",
+    "player",
+    "boss",
+    "blockers",
+    "gui",
+)
+
 if TYPE_CHECKING:
+    from headless import HeadlessWindow
     from levels import GameLevel
+    from replay import InputRecorder, InputReplayer
+    from window import Window
 
 
 class Game(arcade.View):
@@ -54,15 +94,44 @@ class Game(arcade.View):
     door_list: Optional[arcade.SpriteList]
         The sprite list for the door sprites.
     boss: Optional[Enemy]
-        The sprite for the boss. This is only used in level 10.
+        The sprite for the boss. This is only used in levels with a Boss layer.
     blocker_list: List[arcade.SpriteList]
         A list containing sprite lists for each of the walls blocking progression.
     enemy_list: arcade.SpriteList
         The sprite list for the enemies.
     bullet_list: arcade.SpriteList
-        The sprite list for the bullets.
+        The sprite list for the active bullets. This is owned by the projectile
+        manager.
     physics_engine: Optional[PhysicsEngine]
         The physics engine which processes collision and gravity.
+    projectiles: Optional[ProjectileManager]
+        The manager which pools, spawns and retires the bullets.
+    bullet_renderer: Optional[BulletRenderer]
+        Draws every bullet with one instanced draw call.
+    wall_cache: Optional[StaticLayerCache]
+        The pre-rendered wall layer.
+    blocker_cache: Optional[StaticLayerCache]
+        The pre-rendered blocker layers. These are drawn last like the blocker sprite
+        lists were.
+    coin_chunks: Optional[ChunkedSpriteList]
+        The coins split into chunks, so only the ones near the camera are drawn.
+    enemy_chunks: Optional[ChunkedSpriteList]
+        The enemies split into chunks, so only the ones near the camera are drawn.
+    occluders: Optional[OccluderIndex]
+        The index of the tiles which block the enemies' line of sight.
+    enemy_ai: Optional[EnemyBatch]
+        The batched AI state for every enemy including the boss.
+    ai_scheduler: Optional[AIScheduler]
+        Spreads the enemies' movement decisions across ticks within a time budget.
+    streamer: Optional[WorldStreamer]
+        Creates the walls, coins and enemies around the player when the level is
+        streamed. This is None when the whole level is loaded up front.
+    update_profiler: FrameProfiler
+        Records how long each phase of on_update takes.
+    draw_profiler: FrameProfiler
+        Records how long each phase of on_draw takes.
+    performance_overlay: Optional[PerformanceOverlay]
+        Shows the frame times recorded by the profilers. This is toggled with F3.
     camera: Optional[arcade.Camera]
         The camera used for moving the viewport around the screen.
     gui_camera: Optional[arcade.Camera]
@@ -83,10 +152,35 @@ class Game(arcade.View):
         Whether the player is touching the door or not.
     level_won: bool
         Whether the player reached the door and won the level or not.
+    level_finished: bool
+        Whether the level has ended either by winning or dying.
+    timestep: float
+        The simulated time in seconds for each fixed step.
+    physics_substeps: int
+        How many physics steps each fixed step is split into.
+    max_catch_up_steps: int
+        The maximum amount of fixed steps which can be simulated in one update. Any
+        time left over after this is dropped, so a long hitch can't stall the game.
+    accumulator: float
+        The time in seconds which has passed but hasn't been simulated yet.
+    tick: int
+        How many fixed steps have been simulated.
+    view_region: Tuple[float, float, float, float]
+        The left, bottom, right and top of the part of the level the camera shows. This
+        is tracked when headless too, so entities off camera animate less often.
+    seed: int
+        The seed for the level's random generator.
+    rng: random.Random
+        The random generator used for the enemy cooldowns. This is seeded, so a level
+        can be replayed exactly.
+    recorder: Optional[InputRecorder]
+        Records the inputs if the level is being recorded.
+    replayer: Optional[InputReplayer]
+        Feeds recorded inputs back if the level is being replayed.
     """
 
-    def __init__(self) -> None:
-        super().__init__()
+    def __init__(self, window: Optional[Union[Window, HeadlessWindow]] = None) -> None:
+        super().__init__(window)  # type: ignore
         self.level_id: int = -1
         self.level_data: Optional[GameLevel] = None
         self.player: Optional[Player] = None
@@ -98,40 +192,83 @@ class Game(arcade.View):
         self.enemy_list: arcade.SpriteList = arcade.SpriteList(use_spatial_hash=True)
         self.bullet_list: arcade.SpriteList = arcade.SpriteList(use_spatial_hash=True)
         self.physics_engine: Optional[PhysicsEngine] = None
+        self.projectiles: Optional[ProjectileManager] = None
+        self.bullet_renderer: Optional[BulletRenderer] = None
+        self.wall_cache: Optional[StaticLayerCache] = None
+        self.blocker_cache: Optional[StaticLayerCache] = None
+        self.coin_chunks: Optional[ChunkedSpriteList] = None
+        self.enemy_chunks: Optional[ChunkedSpriteList] = None
+        self.occluders: Optional[OccluderIndex] = None
+        self.enemy_ai: Optional[EnemyBatch] = None
+        self.ai_scheduler: Optional[AIScheduler] = None
+        self.streamer: Optional[WorldStreamer] = None
+        self.update_profiler: FrameProfiler = FrameProfiler(UPDATE_PHASES)
+        self.draw_profiler: FrameProfiler = FrameProfiler(DRAW_PHASES)
+        self.performance_overlay: Optional[PerformanceOverlay] = None
         self.camera: Optional[arcade.Camera] = None
         self.gui_camera: Optional[arcade.Camera] = None
-        self.player_text: arcade.Text = arcade.Text(
-            "Score: 0  Health: 0",
-            10,
-            10,
-            arcade.color.BLACK,
-            20,
-        )
-        self.blocker_text: arcade.Text = arcade.Text(
-            "Press 'E' to answer a question",
-            self.window.width / 2 - 175,
-            self.window.height / 2 - 200,
-            arcade.color.BLACK,
-            20,
-        )
-        self.door_text: arcade.Text = arcade.Text(
-            "Press 'E' to finish the level",
-            self.window.width / 2 - 175,
-            self.window.height / 2 - 200,
-            arcade.color.BLACK,
-            20,
-        )
+        self.player_text: Optional[arcade.Text] = None
+        self.blocker_text: Optional[arcade.Text] = None
+        self.door_text: Optional[arcade.Text] = None
+        if not self.window.headless:
+            # Text needs a rendering context, so it isn't created when headless
+            self.player_text = arcade.Text(
+                "Score: 0  Health: 0",
+                10,
+                10,
+                arcade.color.BLACK,
+                20,
+            )
+            self.blocker_text = arcade.Text(
+                "Press 'E' to answer a question",
+                self.window.width / 2 - 175,
+                self.window.height / 2 - 200,
+                arcade.color.BLACK,
+                20,
+            )
+            self.door_text = arcade.Text(
+                "Press 'E' to finish the level",
+                self.window.width / 2 - 175,
+                self.window.height / 2 - 200,
+                arcade.color.BLACK,
+                20,
+            )
+            self.performance_overlay = PerformanceOverlay(
+                self.update_profiler, self.draw_profiler, (10, 50)
+            )
         self.left_pressed: bool = False
         self.right_pressed: bool = False
         self.current_question: Tuple[bool, Optional[arcade.SpriteList]] = (False, None)
         self.walls_completed: int = 0
         self.is_touching_door: bool = False
         self.level_won: bool = False
+        self.level_finished: bool = False
+        self.timestep: float = SIMULATION_TIMESTEP
+        self.physics_substeps: int = PHYSICS_SUBSTEPS
+        self.max_catch_up_steps: int = MAX_CATCH_UP_STEPS
+        self.accumulator: float = 0
+        self.tick: int = 0
+        self.view_region: Tuple[float, float, float, float] = (
+            0,
+            0,
+            self.window.width,
+            self.window.height,
+        )
+        self.seed: int = 0
+        self.rng: random.Random = random.Random()
+        self.recorder: Optional[InputRecorder] = None
+        self.replayer: Optional[InputReplayer] = None
 
     def __repr__(self) -> str:
         return f"<Game (Current window={self.window})>"
 
-    def setup(self, level: int) -> None:
+    def setup(
+        self,
+        level: int,
+        seed: Optional[int] = None,
+        streaming: bool = False,
+        fixed_ai_capacity: bool = False,
+    ) -> None:
         """
         Sets up the game based on a specific level.
 
@@ -139,18 +276,43 @@ class Game(arcade.View):
         ----------
         level: int
             The level to load.
+        seed: Optional[int]
+            The seed for the level's random generator. A random seed is used if this is
+            None.
+        streaming: bool
+            Whether to create the walls, coins and enemies a chunk at a time around the
+            player instead of all at once. This is meant for very large maps.
+        fixed_ai_capacity: bool
+            Whether to update a fixed number of enemies each tick instead of adapting
+            to the machine's speed. This is needed when recording or replaying and is
+            always the case when headless.
         """
-        # Load the level data
+        # Seed the random generator so the level can be replayed
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+
+        # Load the level data and start loading the next level in the background
+        # (streamed levels aren't kept in the registry since they can be huge)
         self.level_id = level
-        self.level_data = levels[level]
+        if streaming:
+            self.level_data = load_streamed_level(level)
+        else:
+            self.level_data = levels[level]
+            levels.prefetch(level + 1)
+            if not self.window.headless:
+                # Prefetched levels leave their OpenGL resources to the main thread
+                for sprite_list in self.level_data.tilemap.sprite_lists.values():
+                    sprite_list.initialize()
 
         # Load the floor and coin tilemap layer into its own sprite list
         tile_map = self.level_data.tilemap
         self.wall_list = tile_map.sprite_lists["Platforms"]
         self.coin_list = tile_map.sprite_lists["Coins"]
         self.door_list = tile_map.sprite_lists["Door"]
-        if self.level_id == 10:
-            boss = tile_map.sprite_lists["Boss"].sprite_list[0]
+        boss_tiles = tile_map.sprite_lists.get("Boss")
+        self.boss = None
+        if boss_tiles:
+            boss = boss_tiles[0]
             self.boss = Enemy(
                 boss.center_x,
                 boss.center_y,
@@ -187,8 +349,13 @@ class Game(arcade.View):
             blocker.enable_spatial_hashing()
             self.blocker_list.append(blocker)
 
+        # Build the line of sight index (this only changes when a blocker is removed)
+        self.occluders = OccluderIndex(
+            self.wall_list, self.blocker_list, (tile_map.width, tile_map.height)
+        )
+
         # Set up the physics engine
-        self.physics_engine = PhysicsEngine(GRAVITY, DAMPING)
+        self.physics_engine = PhysicsEngine(GRAVITY, DAMPING, self)
         self.physics_engine.setup(
             self.player,
             self.wall_list,
@@ -197,14 +364,31 @@ class Game(arcade.View):
             self.blocker_list,
             self.door_list,
             self.boss,
+            {
+                tile_map.sprite_lists[name]: colliders
+                for name, colliders in self.level_data.colliders.items()
+            },
         )
 
-        # Set up the Camera
-        self.camera = arcade.Camera(self.window.width, self.window.height)
-        self.gui_camera = arcade.Camera(self.window.width, self.window.height)
+        # Set up the projectile manager
+        self.projectiles = ProjectileManager(
+            self.physics_engine,
+            (tile_map.width * SPRITE_SIZE, tile_map.height * SPRITE_SIZE),
+        )
+        self.bullet_list = self.projectiles.bullet_list
 
-        # Set up the end screen
-        self.window.views["EndScreen"] = EndScreen()
+        # Set up the rendering and the end screen (these aren't needed when headless)
+        if not self.window.headless:
+            self.bullet_renderer = BulletRenderer(
+                self.window.ctx, self.projectiles.pool_size
+            )
+            self.wall_cache = StaticLayerCache(self.window.ctx, [self.wall_list])
+            self.blocker_cache = StaticLayerCache(self.window.ctx, self.blocker_list)
+            self.coin_chunks = ChunkedSpriteList(self.coin_list)
+            self.enemy_chunks = ChunkedSpriteList(self.enemy_list)
+            self.camera = arcade.Camera(self.window.width, self.window.height)
+            self.gui_camera = arcade.Camera(self.window.width, self.window.height)
+            self.window.views["EndScreen"] = EndScreen()
 
         # Set up each enemy's attack cooldown to be a random value between
         # ENEMY_ATTACK_COOLDOWN_MIN and ENEMY_ATTACK_COOLDOWN_MAX seconds
@@ -212,16 +396,34 @@ class Game(arcade.View):
             # Make sure the enemy is valid
             assert isinstance(enemy, Enemy)
             enemy.set_cooldown(
-                random.uniform(ENEMY_ATTACK_COOLDOWN_MIN, ENEMY_ATTACK_COOLDOWN_MAX)
+                self.rng.uniform(ENEMY_ATTACK_COOLDOWN_MIN, ENEMY_ATTACK_COOLDOWN_MAX)
             )
 
-        # Set up the boss' cooldown if we are on level 10
-        if self.level_id == 10:
-            assert self.boss is not None
+        # Set up the boss' cooldown if the level has one
+        if self.boss is not None:
             self.boss.set_cooldown(
-                random.uniform(BOSS_ATTACK_COOLDOWN_MIN, BOSS_ATTACK_COOLDOWN_MAX)
+                self.rng.uniform(BOSS_ATTACK_COOLDOWN_MIN, BOSS_ATTACK_COOLDOWN_MAX)
             )
 
+        # Set up the batched enemy AI (the boss is processed like any other enemy). The
+        # schedule can't depend on the machine's speed when headless, recording or
+        # replaying
+        enemies: List[Enemy] = list(self.enemy_list)  # type: ignore
+        if self.boss is not None:
+            enemies.append(self.boss)
+        self.enemy_ai = EnemyBatch(enemies)
+        self.ai_scheduler = AIScheduler(
+            self.enemy_ai,
+            fixed_capacity=(
+                AI_FIXED_CAPACITY if fixed_ai_capacity or self.window.headless else None
+            ),
+        )
+
+        # Stream in the chunks around the player
+        if streaming:
+            self.streamer = WorldStreamer(self, tile_map)  # type: ignore
+            self.streamer.update(self.activation_region())
+
     def on_show(self) -> None:
         """Called when the view loads."""
         # Set the background color
@@ -234,28 +436,44 @@ class Game(arcade.View):
         assert self.camera is not None
         assert self.gui_camera is not None
         assert self.player_text is not None
-        assert self.wall_list is not None
-        assert self.coin_list is not None
+        assert self.blocker_text is not None
+        assert self.door_text is not None
+        assert self.bullet_renderer is not None
+        assert self.wall_cache is not None
+        assert self.blocker_cache is not None
         assert self.door_list is not None
+        assert self.coin_chunks is not None
+        assert self.enemy_chunks is not None
 
         # Clear the screen
+        profiler = self.draw_profiler
+        profiler.begin_frame()
         self.clear()
 
         # Activate our sprite camera
         self.camera.use()
-
-        # Draw the sprite lists and the player
-        self.wall_list.draw()
-        self.coin_list.draw()
-        self.enemy_list.draw()
-        self.bullet_list.draw()
+        profiler.mark("clear")
+
+        # Draw the sprite lists and the player. The walls and blockers are composited
+        # from their pre-rendered tiles
+        self.wall_cache.draw(self.view_region)
+        profiler.mark("walls")
+        self.coin_chunks.draw(self.view_region)
+        profiler.mark("coins")
+        self.enemy_chunks.update_locations()
+        self.enemy_chunks.draw(self.view_region)
+        profiler.mark("enemies")
+        self.bullet_renderer.draw(self.bullet_list)
+        profiler.mark("bullets")
         self.door_list.draw()
+        profiler.mark("door")
         self.player.draw()
-        if self.level_id == 10:
-            assert self.boss is not None
+        profiler.mark("player")
+        if self.boss is not None:
             self.boss.draw()
-        for blocker in self.blocker_list:
-            blocker.draw()
+        profiler.mark("boss")
+        self.blocker_cache.draw(self.view_region)
+        profiler.mark("blockers")
 
         # Draw the score and health on the screen
         self.gui_camera.use()
@@ -271,10 +489,16 @@ class Game(arcade.View):
         # Draw the key hint on the screen for the door
         if self.is_touching_door:
             self.door_text.draw()
+        profiler.mark("gui")
+        profiler.end_frame()
+
+        # Draw the performance overlay (this isn't included in the frame time)
+        if self.performance_overlay is not None:
+            self.performance_overlay.draw()
 
     def on_update(self, delta_time: float) -> None:
         """
-        Processes movement and game logic.
+        Advances the game by as many fixed steps as the elapsed time covers.
 
         Parameters
         ----------
@@ -282,8 +506,62 @@ class Game(arcade.View):
             Time interval since the last time the function was called.
         """
         # Make sure variables needed are valid
+        assert self.ai_scheduler is not None
+
+        # Simulate the elapsed time in fixed steps
+        self.update_profiler.begin_frame()
+        self.accumulator += delta_time
+        start = time.perf_counter()
+        steps = 0
+        while (
+            self.accumulator >= self.timestep
+            and steps < self.max_catch_up_steps
+            and not self.level_finished
+            and (self.replayer is None or self.tick < self.replayer.tick_count)
+        ):
+            self.simulate(self.timestep)
+            self.accumulator -= self.timestep
+            steps += 1
+
+        # Resize the AI budget based on how long the steps took to simulate
+        if steps:
+            self.ai_scheduler.adapt((time.perf_counter() - start) / steps)
+
+        # Drop the time which can't be caught up
+        if steps == self.max_catch_up_steps:
+            self.accumulator = min(self.accumulator, self.timestep)
+
+        # Position the camera
+        self.center_camera_on_player()
+        self.update_profiler.mark("camera")
+        self.update_profiler.end_frame()
+
+    def simulate(self, timestep: float) -> None:
+        """
+        Processes movement and game logic for one fixed step.
+
+        Parameters
+        ----------
+        timestep: float
+            The simulated time in seconds for this step.
+        """
+        # Make sure variables needed are valid
         assert self.physics_engine is not None
         assert self.player is not None
+        assert self.occluders is not None
+        assert self.enemy_ai is not None
+        assert self.ai_scheduler is not None
+        assert self.projectiles is not None
+
+        # Apply the recorded inputs for this tick
+        if self.replayer is not None:
+            self.replayer.apply(self)
+
+        # Load and unload the chunks around the player
+        profiler = self.update_profiler
+        if self.streamer is not None:
+            self.streamer.update(self.activation_region())
+        profiler.mark("streaming")
 
         # Check if the enemies are dead
         for enemy in self.enemy_list:
@@ -291,25 +569,25 @@ class Game(arcade.View):
             assert isinstance(enemy, Enemy)
             if enemy.health <= 0:
                 enemy.remove_from_sprite_lists()
+                self.enemy_ai.remove(enemy)
                 self.player.update_score(ScoreAmount.ENEMY)
 
         # Check if the player is dead
         if self.player.health <= 0:
             # End the level
-            self.window.show_view(self.window.views["EndScreen"])
+            self.end_level()
 
-        # Check if we can end the game on level 10
-        if self.level_id == 10:
-            assert self.boss is not None
-            if self.boss.health <= 0:
-                # Set level_won since the player won
-                self.level_won = True
+        # Check if the boss has been beaten
+        if self.boss is not None and self.boss.health <= 0:
+            # Set level_won since the player won
+            self.level_won = True
 
-                # Show the end screen
-                self.window.show_view(self.window.views["EndScreen"])
+            # Show the end screen
+            self.end_level()
+        profiler.mark("enemy deaths")
 
         # Update the player's time since last attack
-        self.player.time_since_last_attack += delta_time
+        self.player.time_since_last_attack += timestep
 
         # Calculate the speed and direction of the player based on the keys pressed
         if self.left_pressed and not self.right_pressed:
@@ -323,42 +601,30 @@ class Game(arcade.View):
         else:
             # The player is not moving so increase the friction making the player stop
             self.physics_engine.set_friction(self.player, 1)
+        profiler.mark("player input")
 
-        # Position the camera
-        self.center_camera_on_player()
+        # Work out the scheduled enemies' movement and every enemy's attacks
+        forces, attacks = self.ai_scheduler.update(
+            self.player, self.occluders, timestep
+        )
+        for index in forces.nonzero()[0]:
+            self.physics_engine.apply_force(
+                self.enemy_ai.enemies[index], (forces[index], 0)
+            )
+        profiler.mark("enemy ai")
+        for index in attacks.nonzero()[0]:
+            self.enemy_ai.enemies[index].ranged_attack(self.projectiles)
+        profiler.mark("attacks")
 
-        # Update the enemy's position
-        line_of_sight_list = arcade.SpriteList(use_spatial_hash=True)
-        line_of_sight_list.extend(self.wall_list)
-        for blocker in self.blocker_list:
-            line_of_sight_list.extend(blocker)
-        for enemy in self.enemy_list.sprite_list:
-            # Make sure the enemy is valid
-            assert isinstance(enemy, Enemy)
-            force = enemy.calculate_movement(self.player, line_of_sight_list)
-            self.physics_engine.apply_force(enemy, force)
+        # Retire bullets which have expired or left the tilemap
+        self.projectiles.update(timestep)
+        profiler.mark("projectiles")
 
-        # Check if each enemy should attack
-        for enemy in self.enemy_list:
-            # Make sure the enemy is valid
-            assert isinstance(enemy, Enemy)
-            enemy.attack_counter += delta_time
-            if enemy.attack_counter >= enemy.attack_cooldown:
-                enemy.attack_counter = 0
-                enemy.ranged_attack(self.bullet_list)
-
-        # Do the same for the boss if we are on level 10
-        if self.level_id == 10:
-            assert self.boss is not None
-            force = self.boss.calculate_movement(self.player, line_of_sight_list)
-            self.physics_engine.apply_force(self.boss, force)
-            self.boss.attack_counter += delta_time
-            if self.boss.attack_counter >= self.boss.attack_cooldown:
-                self.boss.attack_counter = 0
-                self.boss.ranged_attack(self.bullet_list)
-
-        # Update the physics engine
-        self.physics_engine.step()
+        # Update the physics engine (only the bodies near the player are simulated)
+        self.physics_engine.update_activation(self.activation_region())
+        self.physics_engine.fixed_step(timestep, self.physics_substeps)
+        profiler.mark("physics")
+        self.tick += 1
 
     def on_key_press(self, key: int, modifiers: int) -> None:
         """
@@ -377,21 +643,34 @@ class Game(arcade.View):
         assert self.physics_engine is not None
         assert self.level_data is not None
 
+        # Toggle the performance overlay (this works while replaying)
+        if key == arcade.key.F3 and self.performance_overlay is not None:
+            self.performance_overlay.toggle()
+            return
+
+        # Ignore the real inputs while replaying
+        if self.replayer is not None and not self.replayer.applying:
+            return
+        if self.recorder is not None:
+            self.recorder.record(self.tick, "press", key)
+
         if key is arcade.key.A:
             self.left_pressed = True
         elif key is arcade.key.D:
             self.right_pressed = True
-        elif key is arcade.key.SPACE and self.physics_engine.is_on_ground(self.player):
+        elif key is arcade.key.SPACE and self.player.is_grounded:
             self.physics_engine.apply_force(self.player, (0, PLAYER_JUMP_FORCE))
         elif key is arcade.key.E:
-            if (
-                self.physics_engine.is_on_ground(self.player)
-                and self.current_question[0]
-            ):
+            if self.player.is_grounded and self.current_question[0]:
                 # Set right_pressed to False to stop the player moving after the
                 # question
                 self.right_pressed = False
 
+                # The question view can't be shown headlessly or answered while
+                # replaying, so only the input state above is changed
+                if self.window.headless or self.replayer is not None:
+                    return
+
                 # Initialise the question view
                 question_view = Question(
                     self.level_data.questions[self.walls_completed]
@@ -408,7 +687,7 @@ class Game(arcade.View):
                 self.level_won = True
 
                 # Show the end screen
-                self.window.show_view(self.window.views["EndScreen"])
+                self.end_level()
 
     def on_key_release(self, key: int, modifiers: int) -> None:
         """
@@ -422,6 +701,12 @@ class Game(arcade.View):
             Bitwise AND of all modifiers (shift, ctrl, num lock) pressed during this
             event.
         """
+        # Ignore the real inputs while replaying
+        if self.replayer is not None and not self.replayer.applying:
+            return
+        if self.recorder is not None:
+            self.recorder.record(self.tick, "release", key)
+
         if key is arcade.key.A:
             self.left_pressed = False
         elif key is arcade.key.D:
@@ -445,17 +730,46 @@ class Game(arcade.View):
         """
         # Make sure variables needed are valid
         assert self.player is not None
+        assert self.projectiles is not None
+
+        # Ignore the real inputs while replaying
+        if self.replayer is not None and not self.replayer.applying:
+            return
 
         if (
             button is arcade.MOUSE_BUTTON_LEFT
             and self.player.time_since_last_attack >= PLAYER_ATTACK_COOLDOWN
         ):
-            self.player.ranged_attack(self.bullet_list)
+            if self.recorder is not None:
+                self.recorder.record(self.tick, "click")
+            self.player.ranged_attack(self.projectiles)
+
+    def activation_region(self) -> Tuple[float, float, float, float]:
+        """
+        Works out the region where physics bodies are kept awake. This is the screen
+        centered on the player plus a margin, and it doesn't depend on the camera, so
+        headless and windowed runs simulate the same bodies.
+
+        Returns
+        -------
+        Tuple[float, float, float, float]
+            The left, bottom, right and top of the region.
+        """
+        # Make sure variables needed are valid
+        assert self.player is not None
+
+        half_width = self.window.width / 2 + PHYSICS_ACTIVATION_MARGIN * SPRITE_SIZE
+        half_height = self.window.height / 2 + PHYSICS_ACTIVATION_MARGIN * SPRITE_SIZE
+        return (
+            self.player.center_x - half_width,
+            self.player.center_y - half_height,
+            self.player.center_x + half_width,
+            self.player.center_y + half_height,
+        )
 
     def center_camera_on_player(self) -> None:
-        """Centers the camera on the player."""
+        """Centers the camera on the player and updates the view region."""
         # Make sure variables needed are valid
-        assert self.camera is not None
         assert self.player is not None
         assert self.level_data is not None
 
@@ -466,12 +780,12 @@ class Game(arcade.View):
         # Calculate upper limits on the camera
         max_x, max_y = (
             self.level_data.tilemap.width * SPRITE_SIZE
-            - self.camera.viewport_width
-            + (self.camera.viewport_width / SPRITE_SIZE)
+            - self.window.width
+            + (self.window.width / SPRITE_SIZE)
             - 15,
             self.level_data.tilemap.height * SPRITE_SIZE
-            - self.camera.viewport_height
-            + (self.camera.viewport_height / SPRITE_SIZE)
+            - self.window.height
+            + (self.window.height / SPRITE_SIZE)
             - 15,
         )
 
@@ -486,17 +800,33 @@ class Game(arcade.View):
             screen_center_y = max_y
 
         # Move the camera to the new position
-        self.camera.move_to((screen_center_x, screen_center_y))  # noqa
+        self.view_region = (
+            screen_center_x,
+            screen_center_y,
+            screen_center_x + self.window.width,
+            screen_center_y + self.window.height,
+        )
+        if self.camera is not None:
+            self.camera.move_to((screen_center_x, screen_center_y))  # noqa
+
+    def end_level(self) -> None:
+        """Finishes the level and shows the end screen if there is one."""
+        self.level_finished = True
+        if not self.window.headless:
+            self.window.show_view(self.window.views["EndScreen"])
 
     def disable_blocker_wall(self) -> None:
         """Disables the current blocker wall stored."""
         # Make sure variables needed are valid
         assert self.physics_engine is not None
+        assert self.occluders is not None
 
         # Remove the stored blocker wall
         blocker_wall: arcade.SpriteList = self.current_question[1]
         self.blocker_list.remove(blocker_wall)
-        for sprite in blocker_wall:
-            self.physics_engine.remove_sprite(sprite)
+        self.occluders.remove_blocker(blocker_wall)
+        self.physics_engine.remove_static_group(blocker_wall)
+        if self.blocker_cache is not None:
+            self.blocker_cache.remove_layer(blocker_wall)
         self.current_question = (False, None)
         self.walls_completed += 1
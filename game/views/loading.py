@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+# Builtin
+from typing import TYPE_CHECKING
+
+# Pip
+import arcade
+
+# Custom
+from textures import upload_textures
+from views.start_menu import StartMenu
+
+if TYPE_CHECKING:
+    from loader import AssetLoader
+    from window import Window
+
+
+class Loading(arcade.View):
+    """
+    Displays the asset loading progress while the assets are decoded in the
+    background, then switches to the start menu.
+
+    Parameters
+    ----------
+    loader: AssetLoader
+        The asset loader to display the progress of.
+
+    Attributes
+    ----------
+    progress_text: arcade.Text
+        The text object used for displaying the progress.
+    """
+
+    def __init__(self, loader: AssetLoader) -> None:
+        super().__init__()
+        self.loader: AssetLoader = loader
+        self.progress_text: arcade.Text = arcade.Text(
+            "Loading 0%",
+            self.window.width / 2,
+            self.window.height / 2 + 40,
+            arcade.color.BLACK,
+            24,
+            anchor_x="center",
+        )
+
+    def __repr__(self) -> str:
+        return f"<Loading (Current window={self.window})>"
+
+    def on_show(self) -> None:
+        """Called when the view loads."""
+        # Set the background color
+        arcade.set_background_color(arcade.color.BABY_BLUE)
+
+    def on_draw(self) -> None:
+        """Render the screen."""
+        # Clear the screen
+        self.clear()
+
+        # Draw the progress text
+        self.progress_text.value = f"Loading {int(self.loader.progress * 100)}%"
+        self.progress_text.draw()
+
+        # Draw the progress bar
+        bar_width = self.window.width / 2
+        left = (self.window.width - bar_width) / 2
+        bottom = self.window.height / 2 - 10
+        arcade.draw_xywh_rectangle_filled(
+            left, bottom, bar_width * self.loader.progress, 20, arcade.color.BLACK
+        )
+        arcade.draw_xywh_rectangle_outline(
+            left, bottom, bar_width, 20, arcade.color.BLACK, 2
+        )
+
+    def on_update(self, delta_time: float) -> None:
+        """
+        Switches to the start menu once every asset has loaded.
+
+        Parameters
+        ----------
+        delta_time: float
+            Time interval since the last time the function was called.
+        """
+        if not self.loader.done:
+            return
+
+        # Upload the textures on the main thread
+        window: Window = self.window
+        window.load_timings = self.loader.finish(lambda: upload_textures(window.ctx))
+
+        # Initialise and load the start menu view
+        new_view = StartMenu()
+        window.views["StartMenu"] = new_view
+        window.show_view(new_view)
+        new_view.manager.enable()
+
+        # Play the start menu music
+        window.current_sound = window.sounds["start menu"]
+        window.player = window.current_sound.play(loop=True)
@@ -35,8 +35,13 @@ class InputButton(arcade.gui.UIFlatButton):
         if current_view.submitted:
             return
 
+        # Record the answer if the level is being recorded
+        correct = self.text == current_view.question["correct"]
+        if game_view.recorder is not None:
+            game_view.recorder.record(game_view.tick, "answer" if correct else "wrong")
+
         # Test if the answer is correct
-        if self.text == current_view.question["correct"]:
+        if correct:
             # Disable the blocker wall
             game_view.disable_blocker_wall()
 
@@ -7,9 +7,13 @@ from typing import TYPE_CHECKING, Dict, Optional
 import arcade
 
 # Custom
+from constants import UPDATE_RATE
 from database import Database
-from sounds import sounds
-from views.start_menu import StartMenu
+from levels import level_tasks
+from loader import AssetLoader
+from sounds import sound_tasks, sounds
+from textures import texture_tasks
+from views.loading import Loading
 
 if TYPE_CHECKING:
     from pyglet.media import Player
@@ -36,19 +40,32 @@ class Window(arcade.Window):
         The pyglet media player which actually plays the music.
     database: Database
         The connection to the sqlite database.
+    load_timings: Dict[str, float]
+        The wall time in seconds taken to load each asset class at startup.
+    headless: bool
+        Whether the window runs without rendering. This is always False for a real
+        window.
     """
 
     def __init__(self, title: str) -> None:
-        super().__init__(title=title)
+        super().__init__(title=title, update_rate=UPDATE_RATE)
         self.views: Dict[str, arcade.View] = {}
         self.sounds: Dict[str, arcade.Sound] = sounds
         self.current_sound: Optional[arcade.Sound] = None
         self.player: Optional[Player] = None
         self.database: Database = Database(self)
+        self.load_timings: Dict[str, float] = {}
+        self.headless: bool = False
 
     def __repr__(self) -> str:
         return f"<Window (Width={self.width}) (Height={self.height})>"
 
+    def on_close(self) -> None:
+        """Called when the window is closed."""
+        # Write any queued scores before the game exits
+        self.database.close()
+        super().on_close()
+
     @staticmethod
     def seconds_to_string(seconds: float) -> str:
         """
@@ -73,15 +90,18 @@ def main() -> None:
     window = Window("Educational Game")
     window.center_window()
 
-    # Initialise and load the start menu view
-    new_view = StartMenu()
-    window.views["StartMenu"] = new_view
-    window.show_view(new_view)
-    new_view.manager.enable()
-
-    # Play the start menu music
-    window.current_sound = window.sounds["start menu"]
-    window.player = window.current_sound.play(loop=True)
+    # Start decoding the assets in the background
+    loader = AssetLoader(
+        {
+            "textures": texture_tasks(),
+            "sounds": sound_tasks(),
+            "levels": level_tasks(),
+        }
+    )
+    loader.start()
+
+    # Show the loading view (this switches to the start menu once loading finishes)
+    window.show_view(Loading(loader))
 
     # Run the game
     window.run()